@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import os
+import time
+import random
+import argparse
+from typing import Any
+
+from modules.ansi_color_funcs import extend_colors
+from modules.color_cache import make_color_cache, get_color_cache_text
+from modules.framebuffer import make_framebuffer, encode_framebuffer
+from modules.row_encoder import MIN_PARALLEL_CELLS, gil_is_enabled, make_row_encoder, encode_bands, stop_row_encoder
+from matrix_rain import CONFIG_FILE, get_config, update_palettes, update_columns, paint_framebuffer
+
+# a lookup is the gradient of one palette and sequence length, like get_gradient() asks for after the colors changed
+COLOR_CACHE_LOOKUPS = 200000
+# frame sizes (rows, columns) of the row encoder benchmark, from a small terminal to a video wall
+ROW_ENCODER_SIZES = ((20, 60), (40, 120), (50, 200), (60, 300), (100, 300), (100, 500), (200, 500))
+ROW_ENCODER_FRAMES = 50
+
+
+# ______________________make_palettes______________________
+def make_palettes(config: dict[str, Any], custom_palettes: int, generator: random.Random) -> list[tuple[str, ...]]:
+    """
+    Make the palettes of the config (colors and backgrounds) and of random custom colors, like update_palettes() does.
+
+    Args:
+        config (dict): Configuration dictionary with colors and background_brightness_reduction.
+        custom_palettes (int): Amount of random color sets that are added, each with the same backgrounds.
+        generator (random.Random): Random numbers of the benchmark.
+
+    Returns:
+        list: The palettes (tuples of ANSI escape codes).
+    """
+    color_sets = [config['colors']]
+    for _ in range(custom_palettes):
+        color_sets.append(tuple(f"\u001b[38;2;{generator.randrange(256)};{generator.randrange(256)};{generator.randrange(256)}m"
+                                for _ in config['colors']))
+    palettes: dict[tuple[str, ...], None] = {}  # in order, without duplicates
+    palette_config = dict(config)
+    for colors in color_sets:
+        palette_config['colors'] = colors
+        update_palettes(palette_config)
+        palettes.update(dict.fromkeys(palette_config['palettes']))
+    return list(palettes)
+
+
+# ______________________benchmark_color_cache______________________
+def benchmark_color_cache(config: dict[str, Any], custom_palettes: int, cache_size: int,
+                          lookups: int = COLOR_CACHE_LOOKUPS) -> dict[str, Any]:
+    """
+    Measure extend_colors() with the color cache against making every gradient again.
+
+    The same random lookups (palette and sequence length between min_sequence_length and max_sequence_length)
+    are made twice: with a cache of cache_size gradients and with a cache that keeps nothing.
+
+    Args:
+        config (dict): Configuration dictionary (its colors, backgrounds and sequence lengths are used).
+        custom_palettes (int): Amount of random color sets besides the config's colors.
+        cache_size (int): The most gradients the cache keeps (the color_cache_size setting).
+        lookups (int): Amount of lookups.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'palettes', 'lengths': amount of different palettes and sequence lengths,
+              - 'cached', 'uncached': microseconds per lookup,
+              - 'cache_text': the counters of the cache after the lookups (see get_color_cache_text()).
+    """
+    generator = random.Random(1)
+    palettes = make_palettes(config, custom_palettes, generator)
+    lengths = range(config['min_sequence_length'], config['max_sequence_length'] + 1)
+    work = [(generator.choice(palettes), generator.choice(lengths)) for _ in range(lookups)]
+
+    def run(cache: dict[str, Any]) -> float:
+        cache_config = {'extended_color_cache': cache}
+        start = time.perf_counter()
+        for palette, length in work:
+            extend_colors(palette, length, cache_config)
+        return (time.perf_counter() - start) / lookups * 1e6
+
+    cache = make_color_cache(cache_size)
+    cached = run(cache)
+    uncached = run(make_color_cache(0))
+    return {'palettes': len(palettes), 'lengths': len(lengths), 'cached': cached, 'uncached': uncached,
+            'cache_text': get_color_cache_text(cache)}
+
+
+# ______________________get_best_time______________________
+def get_best_time(function, calls: int) -> float:
+    """
+    Call a function several times and get the fastest call, which is the least disturbed by other programs.
+
+    Args:
+        function (callable): Function without arguments.
+        calls (int): Amount of calls.
+
+    Returns:
+        float: Milliseconds of the fastest call.
+    """
+    best = float('inf')
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+# ______________________benchmark_row_encoder______________________
+def benchmark_row_encoder(config: dict[str, Any], threads: int, sizes=ROW_ENCODER_SIZES,
+                          frames: int = ROW_ENCODER_FRAMES) -> list[tuple[int, float, float]]:
+    """
+    Measure encoding a frame on one thread against encoding it in bands of rows on several threads.
+
+    Every size gets a framebuffer painted with rain that has been running for a while, which is encoded
+    frames times with encode_framebuffer() and with encode_bands() (the fastest time of each counts).
+    Both give the same bytes.
+
+    Args:
+        config (dict): Configuration dictionary (the size is replaced by every size in sizes).
+        threads (int): Amount of bands (threads) of encode_bands().
+        sizes (tuple): (rows, columns) of the frames.
+        frames (int): Encoded frames of every size and way.
+
+    Returns:
+        list: (cells, milliseconds on one thread, milliseconds on threads) of every size.
+    """
+    results = []
+    row_encoder = make_row_encoder()
+    try:
+        for rows, columns in sizes:
+            size_config = dict(config, amount_of_rows=rows, amount_of_columns=columns)
+            update_palettes(size_config)
+            rain: list[list[dict[str, Any]]] = [[] for _ in range(columns)]
+            for _ in range(rows * 3):  # long enough for sequences to reach the bottom
+                rain, _ = update_columns(rain, size_config, False)
+            framebuffer = make_framebuffer(rows, columns)
+            paint_framebuffer(framebuffer, rain, size_config)
+
+            single = get_best_time(lambda: encode_framebuffer(framebuffer), frames)
+            bands = get_best_time(lambda: encode_bands(row_encoder, framebuffer, threads), frames)
+            results.append((rows * columns, single, bands))
+    finally:
+        stop_row_encoder(row_encoder)
+    return results
+
+
+# ______________________get_crossover______________________
+def get_crossover(results: list[tuple[int, float, float]]) -> int | None:
+    """
+    Find the smallest frame from which on the threads are faster for every bigger frame too.
+
+    Args:
+        results (list): Results of benchmark_row_encoder().
+
+    Returns:
+        int: Amount of cells or None if the threads weren't faster for the biggest frame.
+    """
+    crossover = None
+    for cells, single, bands in sorted(results, reverse=True):
+        if bands >= single:
+            break
+        crossover = cells
+    return crossover
+
+
+# ______________________main______________________
+def main(arguments: list[str] | None = None) -> None:
+    """
+    Run one of the benchmarks and print its results.
+
+    color-cache: hit rate and time per lookup of the color cache against making every gradient again.
+    row-encoder: time to encode frames of different sizes on one thread and on several threads, and the
+    size from which the threads are faster (only with the GIL disabled, see modules/row_encoder.py).
+
+    Args:
+        arguments (list, optional): Arguments to parse. If None, sys.argv is used.
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks of the parts of the rain that have a cache or a threshold.')
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help='name of the config file in the config folder (the default config if left out)')
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+    color_cache = benchmarks.add_parser('color-cache', help='hit rate and speed of the color cache against no cache')
+    color_cache.add_argument('--palettes', type=int, default=0,
+                             help='random custom color sets besides the colors of the config (default: 0)')
+    color_cache.add_argument('--cache-size', type=int, default=None,
+                             help='most gradients that are kept (default: color_cache_size of the config)')
+    row_encoder = benchmarks.add_parser('row-encoder', help='frame size from which encoding on threads is faster')
+    row_encoder.add_argument('--threads', type=int, default=0,
+                             help='amount of threads (default: 0 = one per CPU core, at least 2)')
+    arguments = parser.parse_args(arguments)
+
+    config = get_config(file_name=arguments.config, interactive=False)
+    if arguments.benchmark == 'color-cache':
+        cache_size = config['color_cache_size'] if arguments.cache_size is None else arguments.cache_size
+        result = benchmark_color_cache(config, arguments.palettes, cache_size)
+        print(f"{result['palettes']} palettes x {result['lengths']} lengths, cache size {cache_size}")
+        print(f"cached:   {result['cached']:.2f} us per lookup ({result['cache_text']})")
+        print(f"uncached: {result['uncached']:.2f} us per lookup ({result['uncached'] / result['cached']:.1f}x slower)")
+    elif arguments.benchmark == 'row-encoder':
+        threads = max(arguments.threads or os.cpu_count() or 1, 2)
+        print(f"{threads} threads, GIL {'enabled' if gil_is_enabled() else 'disabled'}")
+        print(f"{'cells':>8}{'1 thread':>11}{'threads':>11}")
+        results = benchmark_row_encoder(config, threads)
+        for cells, single, bands in results:
+            print(f"{cells:>8}{single:>9.2f}ms{bands:>9.2f}ms")
+        crossover = get_crossover(results)
+        if gil_is_enabled():
+            print('the GIL is enabled, so the rain never encodes on threads on this Python build')
+        elif crossover is None:
+            print('the threads are never faster, keep "render_threads": 1')
+        else:
+            print(f'the threads are faster from {crossover} cells on (they are only used from {MIN_PARALLEL_CELLS} '
+                  f'cells on), set "render_threads": {threads} if your frames are that big')
+
+
+if __name__ == '__main__':
+    main()
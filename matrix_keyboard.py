@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import sys
 from typing import Any
 try:
     import keyboard
@@ -6,8 +7,9 @@ try:
 except ImportError:
     KEYBOARD_AVAILABLE = False
 
-from modules.terminal_control_funcs import hide_or_show_cursor, flush_stdin
-from matrix_rain import run_matrix, get_config
+from modules.terminal_control_funcs import hide_or_show_cursor
+from modules.prompt_panel import Flow
+from matrix_rain import run_matrix, get_config, parse_arguments, filler_func, check_allocations
 
 # if you saved your config in a file you can load it by putting the file name here
 # if you want to use the default values, keep this variable as an emtpy string
@@ -17,17 +19,19 @@ CONFIG_DIR_NAME = 'config_keyboard'
 
 
 # ______________________on_key_event______________________
-def on_key_event(currently_pressed: set[str], event: keyboard.KeyboardEvent, lock) -> None:
+def on_key_event(currently_pressed: set[str], event: keyboard.KeyboardEvent, lock, key_events=None) -> None:
     """
     Handle keyboard events to update the set of currently pressed keys.
 
     Depending on the event type ('down' or 'up'), the function adds or removes the key from
-    the currently_pressed set in a thread-safe manner.
+    the currently_pressed set in a thread-safe manner. Pressed keys are also added to key_events
+    and released keys wake up code that waits for key events.
 
     Args:
         currently_pressed (set): Set of keys currently pressed.
         event: An event object from the keyboard library.
         lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue of typed characters and key names for the in-frame prompts.
 
     Returns:
         None
@@ -38,13 +42,17 @@ def on_key_event(currently_pressed: set[str], event: keyboard.KeyboardEvent, loc
     with lock:
         if event.event_type == 'down':
             currently_pressed.add(event.name)
+            if key_events is not None:
+                key_events.append(event.name)
         if event.event_type == 'up':
             currently_pressed.discard(event.name.lower())
             currently_pressed.discard(event.name.upper())
+    if event.event_type == 'up' and key_events is not None:
+        key_events.notify()  # wakes up the pause (see wait_while_paused in matrix_rain.py)
 
 
 # ______________________update_pressed_keys______________________
-def update_pressed_keys(currently_pressed: set[str], lock) -> None:
+def update_pressed_keys(currently_pressed: set[str], lock, key_events=None) -> None:
     """
     Register a global keyboard hook using the keyboard library to track pressed keys.
 
@@ -53,12 +61,13 @@ def update_pressed_keys(currently_pressed: set[str], lock) -> None:
     Args:
         currently_pressed (set): Set to store currently pressed keys.
         lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue that gets the typed characters and key names.
 
     Returns:
         None
     """
     if KEYBOARD_AVAILABLE:
-        keyboard.hook(lambda event: on_key_event(currently_pressed, event, lock))
+        keyboard.hook(lambda event: on_key_event(currently_pressed, event, lock, key_events))
     else:
         print("Keyboard module not installed; keyboard functionality is disabled.")
         hide_or_show_cursor(show=True)
@@ -67,23 +76,20 @@ def update_pressed_keys(currently_pressed: set[str], lock) -> None:
 
 
 # ______________________change_controls______________________
-def change_controls(config: dict[str, Any]) -> None:
+def change_controls(config: dict[str, Any]) -> Flow:
     """
-    Interactive function to modify keyboard control mappings.
+    Flow (see modules/prompt_panel.py) to modify keyboard control mappings.
 
-    This function allows the user to view current control mappings, modify them by entering new key combinations,
+    This flow allows the user to view current control mappings, modify them by entering new key combinations,
     and optionally save the changes to the configuration.
 
     Args:
         config (dict): Configuration dictionary containing current control mappings.
 
     Returns:
-        None
+        bool: False (the colors don't need to be updated).
     """
-    flush_stdin()
-    print()
     new_controls: dict[str, list[str]] = {}
-    hide_or_show_cursor(show=True)
     for dict_key in config['controls']:
         try:
             new_controls[dict_key] = config['controls'][dict_key].copy()
@@ -91,22 +97,20 @@ def change_controls(config: dict[str, Any]) -> None:
             new_controls[dict_key] = config['controls'][dict_key]
 
     save = False
-    print('\nYou have chosen to change your controls')
-    print('\nold/o = show controls without new changes')
-    print('new/n = show controls with new changes')
-    print('save/s = save changes')
-    print('exit/e = exit without chaning controls')
+    text = ('You have chosen to change your controls\n\n'
+            'old/o = show controls without new changes\n'
+            'new/n = show controls with new changes\n'
+            'save/s = save changes\n'
+            'exit/e = exit without chaning controls')
     while True:
         go_back = False
-        print('\nEnter the name of the control you would like to change:')
-        control = input('> ').lower().strip()
+        control = (yield f'{text}\n\nEnter the name of the control you would like to change:').lower().strip()
+        text = ''
         if control in ['o', 'old']:
-            for key in config['controls']:
-                print(f"{key}: {' '.join(config['controls'][key])}")
+            text = '\n'.join(f"{key}: {' '.join(config['controls'][key])}" for key in config['controls'])
             continue
         elif control in ['new', 'n']:
-            for key in new_controls:
-                print(f"{key}: {' '.join(new_controls[key])}")
+            text = '\n'.join(f"{key}: {' '.join(new_controls[key])}" for key in new_controls)
             continue
         elif control in ['save', 's']:
             save = True
@@ -114,13 +118,12 @@ def change_controls(config: dict[str, Any]) -> None:
         elif control in ['exit', 'e']:
             break
         elif control in config['controls'].keys():
-            print("\nEnter the keys you would like to use for this control.")
-            print("If you want this control to be activated by multiple keys, separate them by a space: a b ctrl")
-            print('Using shift is allowed but keep in mind that when you enter "shift a" the control will activate only if you press "a" and then "shift".')
-            print('However, if you enter "shift A" the control will be activated if you press "shift" first and then you press "a"')
-            print('Also make sure to add any keys needed to press your desired key (for example if you need to press "shift" to be able to press "+" make it: "shift +")')
-            print(f"To keep the control the same, just enter the old keys ({' '.join(new_controls[control])})")
-            new_keys = input('> ').strip()
+            new_keys = (yield ("\nEnter the keys you would like to use for this control.\n"
+                               "If you want this control to be activated by multiple keys, separate them by a space: a b ctrl\n"
+                               'Using shift is allowed but keep in mind that when you enter "shift a" the control will activate only if you press "a" and then "shift".\n'
+                               'However, if you enter "shift A" the control will be activated if you press "shift" first and then you press "a"\n'
+                               'Also make sure to add any keys needed to press your desired key (for example if you need to press "shift" to be able to press "+" make it: "shift +")\n'
+                               f"To keep the control the same, just enter the old keys ({' '.join(new_controls[control])})")).strip()
             if new_keys:
                 new_keys = new_keys.split(' ')
                 for new_key in new_keys.copy():
@@ -129,24 +132,23 @@ def change_controls(config: dict[str, Any]) -> None:
                         while new_keys.count(new_key) > 1:  # remove duplicates
                             new_keys.remove(new_key)
                     except Exception as e:
-                        print(f'"{new_key}" can not be used because: {e}')
+                        text = f'"{new_key}" can not be used because: {e}'
                         go_back = True
                         break
                 if go_back:
                     continue
                 new_controls[control] = new_keys
 
-                print("""\nControls like "ctrl a" and "a" could both be accidentally used when you press "ctrl" and "a" """)
-                print("If you don't want this to happen, enter at least one other key of the control that has extra keys.")
-                print("Keep this empty if you don't want to add any.")
-                shared_keys = input('> ').strip()
+                shared_keys = (yield ("""\nControls like "ctrl a" and "a" could both be accidentally used when you press "ctrl" and "a" \n"""
+                                      "If you don't want this to happen, enter at least one other key of the control that has extra keys.\n"
+                                      "Keep this empty if you don't want to add any.")).strip()
                 if shared_keys:
                     shared_keys = shared_keys.split(' ')
                     for shared_key in shared_keys.copy():
                         try:
                             keyboard.is_pressed(shared_key)
                         except Exception as e:
-                            print(f'"{shared_key}" can not be used because: {e}')
+                            text = f'"{shared_key}" can not be used because: {e}'
                             go_back = True
                             break
                     if go_back:
@@ -158,10 +160,10 @@ def change_controls(config: dict[str, Any]) -> None:
                             new_controls['check_if_pressed'].remove(key)
 
         else:
-            print("Name wasn't found.")
+            text = "Name wasn't found."
     if save:
         config['controls'] = new_controls
-    hide_or_show_cursor(hide=True)
+    return False
 
 
 # ______________________run_keyboard_matrix______________________
@@ -175,8 +177,14 @@ def run_keyboard_matrix() -> None:
     Returns:
         None
     """
-    config = get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME)
-    run_matrix(update_pressed_keys, change_controls, config)
+    arguments = parse_arguments()
+    config = get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME, interactive=not arguments.non_interactive)
+    if arguments.check_allocations:
+        sys.exit(check_allocations(config))
+    # without the library update_pressed_keys would wait for the user to press enter
+    pressed_keys_func = update_pressed_keys if KEYBOARD_AVAILABLE or not arguments.non_interactive else filler_func
+    run_matrix(pressed_keys_func, change_controls, config, startup_benchmark=arguments.startup_benchmark,
+               profile_frames=arguments.profile)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from typing import Any, Callable
+
+from modules.key_events import KeyEvents
+from matrix_rain import CONFIG_FILE, get_config, run_matrix, filler_func
+import matrix_terminal
+
+# the setting every control changes, a press is seen on screen in the first frame written after it changed
+CONTROL_SETTINGS = {
+    'speed_up': 'time_between_frames',
+    'slow_down': 'time_between_frames',
+    'mode_char': 'mode',
+    'make_space_between_columns': 'space_between_columns',
+    'change_visibility_priority': 'visibility_priority',
+    'more_random_char': 'random_char_change_chance',
+    'less_random_char': 'random_char_change_chance',
+    'less_rows': 'amount_of_rows',
+    'more_rows': 'amount_of_rows',
+    'less_columns': 'amount_of_columns',
+    'more_columns': 'amount_of_columns',
+    'more_new_sequence_chance': 'new_sequence_chance',
+    'less_new_sequence_chance': 'new_sequence_chance',
+    'blue': 'colors',
+    'green': 'colors',
+    'red': 'colors',
+    'chars_01': 'characters',
+    'chars_default': 'characters',
+}
+# pairs undo each other, so the rain stays about the same while measuring
+DEFAULT_CONTROLS = ('mode_char', 'change_visibility_priority', 'speed_up', 'slow_down', 'more_rows', 'less_rows',
+                    'chars_01', 'chars_default')
+
+# direct: the keys are put into currently_pressed like a backend would, terminal: the keys are typed into
+# a pseudo terminal that matrix_terminal.py reads, pynput: the keys are pressed with pynput (needs a display)
+BACKENDS = ('direct', 'terminal', 'pynput')
+
+HOLD_TIME = 0.05  # how long a synthetic key press is held
+PAUSE_BETWEEN = 0.35  # longer than the debounce time of every control
+TIMEOUT = 2.0  # a press that isn't seen after this long is counted as missed
+
+
+# ______________________make_probe______________________
+def make_probe(config: dict[str, Any], controls: list[str], trials: int) -> dict[str, Any]:
+    """
+    Create the state of a latency measurement.
+
+    Args:
+        config (dict): Configuration dictionary the rain runs with.
+        controls (list): Names of the controls to press (keys of CONTROL_SETTINGS).
+        trials (int): How often every control is pressed.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'config', 'controls', 'trials': what is measured,
+              - 'pending': (control, setting, old value, press time) of the press that wasn't seen yet or None,
+              - 'seen': set when the pending press was seen,
+              - 'latencies': seconds from the press to the frame of every seen press, by control,
+              - 'missed': amount of presses that weren't seen, by control.
+    """
+    return {'config': config,
+            'controls': controls,
+            'trials': trials,
+            'pending': None,
+            'seen': threading.Event(),
+            'latencies': {control: [] for control in controls},
+            'missed': {control: 0 for control in controls}}
+
+
+# ______________________FrameDetector______________________
+class FrameDetector(io.RawIOBase):
+    """
+    Output that replaces the terminal and checks every write for the setting of the pending press.
+
+    run_matrix() flushes after every frame, so a write is the moment a frame would reach the terminal.
+    """
+
+    def __init__(self, probe: dict[str, Any]):
+        super().__init__()
+        self.probe = probe
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        now = time.perf_counter()
+        pending = self.probe['pending']
+        if pending is not None:
+            control, setting, old_value, pressed_at = pending
+            if self.probe['config'][setting] != old_value:
+                self.probe['latencies'][control].append(now - pressed_at)
+                self.probe['pending'] = None
+                self.probe['seen'].set()
+        return len(data)
+
+
+# ______________________make_direct_backend______________________
+def make_direct_backend() -> tuple[Callable, Callable]:
+    """
+    Make a backend that puts the keys into currently_pressed and key_events itself, without reading a keyboard.
+
+    Returns:
+        tuple: (update_pressed_keys function for run_matrix(), press function that takes currently_pressed, lock,
+               key_events and the names of the keys).
+    """
+    def press(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents, keys: list[str]) -> None:
+        with lock:
+            currently_pressed.update(keys)
+        for key in keys:
+            key_events.append(key)
+        time.sleep(HOLD_TIME)
+        with lock:
+            currently_pressed.difference_update(keys)
+        key_events.notify()
+
+    return filler_func, press
+
+
+# ______________________make_terminal_backend______________________
+def make_terminal_backend() -> tuple[Callable, Callable]:
+    """
+    Make a backend that types the keys into a pseudo terminal, which matrix_terminal.py reads like a real one.
+
+    Returns:
+        tuple: (update_pressed_keys function for run_matrix(), press function, see make_direct_backend()).
+
+    Raises:
+        OSError: If there are no pseudo terminals (for example on Windows).
+    """
+    import pty
+    master, slave = pty.openpty()
+    # matrix_terminal.update_pressed_keys() reads stdin, the file descriptors stay open until the program ends
+    sys.stdin = open(slave, 'r', closefd=False)
+
+    def press(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents, keys: list[str]) -> None:
+        os.write(master, matrix_terminal.encode_keys(keys).encode('utf-8'))
+
+    return matrix_terminal.update_pressed_keys, press
+
+
+# ______________________make_pynput_backend______________________
+def make_pynput_backend() -> tuple[Callable, Callable]:
+    """
+    Make a backend that presses the keys with pynput, which matrix_pynput.py listens to like to a real keyboard.
+
+    The keys are pressed for the whole system, so the focused window gets them too.
+
+    Returns:
+        tuple: (update_pressed_keys function for run_matrix(), press function, see make_direct_backend()).
+
+    Raises:
+        ImportError: If pynput isn't installed or can't be used (for example without a display).
+    """
+    from pynput import keyboard  # before matrix_pynput, which can only be imported with pynput
+    import matrix_pynput
+    controller = keyboard.Controller()
+
+    def press(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents, keys: list[str]) -> None:
+        pynput_keys = [getattr(keyboard.Key, key) if len(key) > 1 else key for key in keys]
+        for key in pynput_keys:
+            controller.press(key)
+        time.sleep(HOLD_TIME)
+        for key in reversed(pynput_keys):
+            controller.release(key)
+
+    return matrix_pynput.update_pressed_keys, press
+
+
+# ______________________make_key_injector______________________
+def make_key_injector(probe: dict[str, Any], backend: str = 'direct') -> Callable:
+    """
+    Make an update_pressed_keys function for run_matrix() that presses the controls of the probe.
+
+    The keys go through the chosen backend (see BACKENDS) and are held for HOLD_TIME. Every press starts at a
+    random time in the frame, so the latencies include the time until the next frame. At the end ctrl+c is put
+    into currently_pressed (typing it would send a signal), which stops run_matrix().
+
+    Args:
+        probe (dict): Probe created by make_probe().
+        backend (str): One of BACKENDS.
+
+    Returns:
+        callable: The update_pressed_keys function (takes currently_pressed, lock, key_events).
+
+    Raises:
+        ImportError, OSError: If the backend can't be used here.
+    """
+    config = probe['config']
+    generator = random.Random()  # the rain's random numbers stay the same
+    start_backend, press = {'direct': make_direct_backend, 'terminal': make_terminal_backend,
+                            'pynput': make_pynput_backend}[backend]()
+
+    def inject(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents) -> None:
+        time.sleep(0.5)  # the first frames
+        for _ in range(probe['trials']):
+            for control in probe['controls']:
+                setting = CONTROL_SETTINGS[control]
+                if setting == 'time_between_frames' and config['time_based_simulation']:
+                    setting = 'simulation_speed'  # what speed_up and slow_down change in time based simulation
+                time.sleep(generator.uniform(0, config['time_between_frames']))
+                probe['seen'].clear()
+                probe['pending'] = (control, setting, list(config[setting]) if isinstance(config[setting], list)
+                                    else config[setting], time.perf_counter())
+                press(currently_pressed, lock, key_events, config['controls'][control])
+                if not probe['seen'].wait(TIMEOUT):
+                    probe['pending'] = None
+                    probe['missed'][control] += 1
+                time.sleep(PAUSE_BETWEEN)
+        with lock:
+            currently_pressed.update(['ctrl', 'c'])
+        key_events.notify()
+
+    def update_pressed_keys(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents) -> None:
+        start_backend(currently_pressed, lock, key_events)
+        threading.Thread(target=inject, args=(currently_pressed, lock, key_events), daemon=True).start()
+
+    return update_pressed_keys
+
+
+# ______________________get_report______________________
+def get_report(probe: dict[str, Any]) -> str:
+    """
+    Make a table with the latency distribution of every control.
+
+    Args:
+        probe (dict): Probe created by make_probe() after the measurement.
+
+    Returns:
+        str: The table (times in milliseconds).
+    """
+    lines = [f"{'control':<28}{'seen':>6}{'missed':>8}{'min':>9}{'median':>9}{'p90':>9}{'max':>9}"]
+    for control in probe['controls']:
+        latencies = sorted(latency * 1000 for latency in probe['latencies'][control])
+        if latencies:
+            values = (latencies[0], latencies[len(latencies) // 2], latencies[min(int(len(latencies) * 0.9), len(latencies) - 1)], latencies[-1])
+            times = ''.join(f'{value:>9.1f}' for value in values)
+        else:
+            times = f"{'-':>9}" * 4
+        lines.append(f"{control:<28}{len(latencies):>6}{probe['missed'][control]:>8}{times}")
+    return '\n'.join(lines)
+
+
+# ______________________measure_backend______________________
+def measure_backend(arguments: argparse.Namespace, controls: list[str], backend: str) -> tuple[dict[str, Any], float]:
+    """
+    Run the rain with its output going to a FrameDetector and the keys pressed by make_key_injector().
+
+    Args:
+        arguments (argparse.Namespace): The parsed arguments of main().
+        controls (list): Names of the controls to press.
+        backend (str): One of BACKENDS.
+
+    Returns:
+        tuple: (the probe after the measurement, CPU time of the process in percent of the time it ran).
+    """
+    config = get_config(file_name=arguments.config, interactive=False)
+    config['auto_size'] = False  # the rows and columns are changed by the controls
+    if backend == 'terminal':
+        matrix_terminal.remap_controls(config)
+    probe = make_probe(config, controls, arguments.trials)
+    update_pressed_keys = make_key_injector(probe, backend)
+    terminal = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BufferedWriter(FrameDetector(probe)), encoding='utf-8', write_through=True)
+    start, start_cpu = time.perf_counter(), time.process_time()
+    try:
+        run_matrix(update_pressed_keys, filler_func, config)
+    finally:
+        sys.stdout = terminal
+    return probe, (time.process_time() - start_cpu) / (time.perf_counter() - start) * 100
+
+
+# ______________________main______________________
+def main(arguments: list[str] | None = None) -> None:
+    """
+    Measure how long it takes from a key press until the frame that shows its change is written.
+
+    The rain runs like normal, but its output goes to a FrameDetector instead of the terminal and the keys are
+    pressed by make_key_injector() through every chosen backend in turn. A table and the CPU time of the whole
+    process are printed for every backend.
+
+    Args:
+        arguments (list, optional): Arguments to parse. If None, sys.argv is used.
+    """
+    parser = argparse.ArgumentParser(description='Measure the time from a key press to the frame that shows it.')
+    parser.add_argument('--trials', type=int, default=20, help='how often every control is pressed (default: 20)')
+    parser.add_argument('--controls', default=','.join(DEFAULT_CONTROLS),
+                        help=f'comma separated controls to press, any of: {", ".join(CONTROL_SETTINGS)}')
+    parser.add_argument('--backend', default='direct',
+                        help=f'comma separated ways the keys are pressed, any of: {", ".join(BACKENDS)} (default: direct, '
+                             'pynput presses the keys for the whole system)')
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help='name of the config file in the config folder (the default config if left out)')
+    arguments = parser.parse_args(arguments)
+    controls = [control.strip() for control in arguments.controls.split(',') if control.strip()]
+    unknown = [control for control in controls if control not in CONTROL_SETTINGS]
+    if unknown:
+        parser.error(f"unknown controls: {', '.join(unknown)}")
+    backends = [backend.strip() for backend in arguments.backend.split(',') if backend.strip()]
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+
+    for backend in backends:
+        try:
+            probe, cpu = measure_backend(arguments, controls, backend)
+        except (ImportError, OSError) as e:
+            print(f"{backend}: can't be used here ({e})\n")
+            continue
+        print(f'{backend}: {cpu:.1f}% CPU')
+        print(get_report(probe) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
+import sys
 from typing import Any
-import time
 try:
     from pynput import keyboard
     PYNPUT_AVAILABLE = True
 except ImportError:
     PYNPUT_AVAILABLE = False
 
-from modules.terminal_control_funcs import hide_or_show_cursor, flush_stdin
-from matrix_rain import run_matrix, get_config
+from modules.terminal_control_funcs import hide_or_show_cursor
+from modules.prompt_panel import Flow, KeyRequest
+from matrix_rain import run_matrix, get_config, parse_arguments, filler_func, check_allocations, message_flow
 
 # if you saved your config in a file you can load it by putting the file name here
 # if you want to use the default values, keep this variable as an emtpy string
@@ -60,39 +61,52 @@ def key_to_str(key: keyboard.Key | keyboard.KeyCode) -> str:
 
 
 # ______________________on_press______________________
-def on_press(key: keyboard.Key | keyboard.KeyCode, currently_pressed: set[str], lock) -> None:
+def on_press(key: keyboard.Key | keyboard.KeyCode, currently_pressed: set[str], lock, key_events=None, typed_key=None) -> None:
     """
     Callback function for key press events.
 
-    When a key is pressed, its string representation is added to the currently_pressed set.
+    When a key is pressed, its string representation is added to the currently_pressed set
+    and the typed character (or the key's name) is added to key_events.
 
     Args:
         key: The key event.
         currently_pressed (set): Set to store currently pressed keys.
         lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue of typed characters and key names for the in-frame prompts.
+        typed_key: The key event before it was made canonical (keeps the case of typed characters).
     """
     with lock:
         currently_pressed.add(key_to_str(key))
+    if key_events is not None:
+        typed_key = typed_key if typed_key is not None else key
+        if getattr(typed_key, 'char', None):
+            key_events.append(typed_key.char)
+        else:
+            key_events.append(key_to_str(key))
 
 
 # ______________________on_release______________________
-def on_release(key: keyboard.Key | keyboard.KeyCode, currently_pressed: set[str], lock) -> None:
+def on_release(key: keyboard.Key | keyboard.KeyCode, currently_pressed: set[str], lock, key_events=None) -> None:
     """
     Callback function for key release events.
 
-    When a key is released, its string representation is removed from the currently_pressed set.
+    When a key is released, its string representation is removed from the currently_pressed set
+    and code waiting for key events is woken up.
 
     Args:
         key: The key event.
         currently_pressed (set): Set containing keys that are currently pressed.
         lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue of typed characters and key names for the in-frame prompts.
     """
     with lock:
         currently_pressed.discard(key_to_str(key))
+    if key_events is not None:
+        key_events.notify()
 
 
 # ______________________update_pressed_keys______________________
-def update_pressed_keys(currently_pressed: set[str], lock) -> None:
+def update_pressed_keys(currently_pressed: set[str], lock, key_events=None) -> None:
     """
     Set up the pynput keyboard listener to update the set of currently pressed keys.
 
@@ -102,14 +116,15 @@ def update_pressed_keys(currently_pressed: set[str], lock) -> None:
     Args:
         currently_pressed (set): Set to store currently pressed keys.
         lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue that gets the typed characters and key names.
 
     Returns:
         None
     """
     if PYNPUT_AVAILABLE:
         listener = keyboard.Listener(
-            on_press=lambda key: on_press(make_canonical(key, listener), currently_pressed, lock),
-            on_release=lambda key: on_release(make_canonical(key, listener), currently_pressed, lock)
+            on_press=lambda key: on_press(make_canonical(key, listener), currently_pressed, lock, key_events, key),
+            on_release=lambda key: on_release(make_canonical(key, listener), currently_pressed, lock, key_events)
         )
         listener.start()
     else:
@@ -120,44 +135,39 @@ def update_pressed_keys(currently_pressed: set[str], lock) -> None:
 
 
 # ______________________change_controls______________________
-def change_controls(config: dict[str, Any]) -> None:
+def change_controls(config: dict[str, Any]) -> Flow:
     """
-    Interactive function to modify the control key mappings.
+    Flow (see modules/prompt_panel.py) to modify the control key mappings.
 
-    This function prompts the user to view, change, or save control mappings for the Matrix rain animation.
-    It allows capturing new key combinations via the pynput listener and updating the configuration accordingly.
+    This flow asks the user to view, change, or save control mappings for the Matrix rain animation.
+    New key combinations are captured from the pressed keys while the rain keeps running.
 
     Args:
         config (dict): Configuration dictionary containing current control mappings.
 
     Returns:
-        None
+        bool: False (the colors don't need to be updated).
     """
-    flush_stdin()
-    print()
     new_controls: dict[str, list[str]] = {}
-    hide_or_show_cursor(show=True)
     for dict_key in config['controls']:
         try:
             new_controls[dict_key] = config['controls'][dict_key].copy()
         except AttributeError:
             new_controls[dict_key] = config['controls'][dict_key]
     save = False
-    print('\nYou have chosen to change your controls')
-    print('\nold/o = show controls without new changes')
-    print('new/n = show controls with new changes')
-    print('save/s = save changes')
-    print('exit/e = exit without chaning controls')
+    text = ('You have chosen to change your controls\n\n'
+            'old/o = show controls without new changes\n'
+            'new/n = show controls with new changes\n'
+            'save/s = save changes\n'
+            'exit/e = exit without chaning controls')
     while True:
-        print('\nEnter the name of the control you would like to change:')
-        control = input('> ').lower().strip()
+        control = (yield f'{text}\n\nEnter the name of the control you would like to change:').lower().strip()
+        text = ''
         if control in ['o', 'old']:
-            for key in config['controls']:
-                print(f"{key}: {' '.join(config['controls'][key])}")
+            text = '\n'.join(f"{key}: {' '.join(config['controls'][key])}" for key in config['controls'])
             continue
         elif control in ['new', 'n']:
-            for key in new_controls:
-                print(f"{key}: {' '.join(new_controls[key])}")
+            text = '\n'.join(f"{key}: {' '.join(new_controls[key])}" for key in new_controls)
             continue
         elif control in ['save', 's']:
             save = True
@@ -166,32 +176,19 @@ def change_controls(config: dict[str, Any]) -> None:
             break
 
         elif control in config['controls'].keys():
-            print("\nlisten/l = let the program register any keys pressed until a cutoff key is pressed")
-            print("exit/e = choose a different control")
-            command = input('> ').strip().lower()
+            command = (yield ("\nlisten/l = let the program register any keys pressed until a cutoff key is pressed\n"
+                              "exit/e = choose a different control")).strip().lower()
             if command in ['exit', 'e']:
                 continue
 
             elif command in ['listen', 'l']:
-                def listen_for_stop(key: keyboard.Key | keyboard.KeyCode, stop_key: list[str]) -> False:
-                    stop_key.append(key_to_str(key))
-                    return False
-
                 while True:
-                    stop_key: list[str] = []
-                    print("\nPress the key that will stop the listening.")
-                    time.sleep(0.3)
-                    with keyboard.Listener(on_press=lambda key: listen_for_stop(listen_stop.canonical(key) if isinstance(key, keyboard.KeyCode) else key, stop_key)) as listen_stop:
-                        listen_stop.join()
-
-                    stop_key: str = stop_key[0]
-                    flush_stdin()
-                    print(f'\n"{stop_key}" will be used to stop listening for keys.')
-                    print("again/a = choose a different key to stop")
-                    print("continue/c = start listening for keys for the controls")
-
+                    stop_key = yield KeyRequest("\nPress the key that will stop the listening.")
+                    command_text = (f'\n"{stop_key}" will be used to stop listening for keys.\n'
+                                    "again/a = choose a different key to stop\n"
+                                    "continue/c = start listening for keys for the controls")
                     while True:
-                        command = input('> ').strip().lower()
+                        command = (yield command_text).strip().lower()
                         if command in ['again', 'a']:
                             listen_again = True
                             break
@@ -199,33 +196,24 @@ def change_controls(config: dict[str, Any]) -> None:
                             listen_again = False
                             break
                         else:
-                            print("Unknown command\n")
+                            command_text = "Unknown command\n"
                     if not listen_again:
                         break
 
                 while True:
                     captured_keys: set[str] = set()
-
-                    def on_press_with_stop(key: keyboard.Key | keyboard.KeyCode):
-                        key: str = key_to_str(key)
-                        if key == stop_key:
-                            return False
+                    key = yield KeyRequest("\nListening for keys")
+                    while key != stop_key:
                         captured_keys.add(key)
-                        print(f"keys pressed so far: {', '.join(captured_keys)}")
-
-                    time.sleep(0.2)
-                    print("\nListening for keys")
-                    with keyboard.Listener(on_press=lambda key: on_press_with_stop(make_canonical(key, listen))) as listen:
-                        listen.join()
+                        key = yield KeyRequest(f"keys pressed so far: {', '.join(captured_keys)}")
 
-                    flush_stdin()
                     replace = True
                     if control == "check_if_pressed":
-                        print('\nYou have chosen the control "check_if_pressed".')
-                        print('Therefore you can replace it or just append to it.')
-                        print('Enter "append/a" or "replace/r"')
+                        request_text = ('\nYou have chosen the control "check_if_pressed".\n'
+                                        'Therefore you can replace it or just append to it.\n'
+                                        'Enter "append/a" or "replace/r"')
                         while True:
-                            request = input('> ').strip().lower()
+                            request = (yield request_text).strip().lower()
                             if request in ['append', 'a']:
                                 replace = False
                                 break
@@ -233,12 +221,11 @@ def change_controls(config: dict[str, Any]) -> None:
                                 replace = True
                                 break
                             else:
-                                print('\nUnknown command')
-
-                    print(f"\nDo you want to use these keys for the control? ({', '.join(captured_keys)})")
+                                request_text = '\nUnknown command'
 
+                    command_text = f"\nDo you want to use these keys for the control? ({', '.join(captured_keys)})"
                     while True:
-                        command = input('> ').strip().lower()
+                        command = (yield command_text).strip().lower()
                         if command in ['yes', 'y']:
                             use_keys = True
                             break
@@ -246,27 +233,27 @@ def change_controls(config: dict[str, Any]) -> None:
                             use_keys = False
                             break
                         else:
-                            print("\nPlease enter yes/y or no/n")
+                            command_text = "\nPlease enter yes/y or no/n"
                     if use_keys:
                         if captured_keys:
                             if replace:
                                 new_controls[control] = list(captured_keys)
                             else:
                                 new_controls[control].extend(list(captured_keys))
-                            print("""\nControls like "ctrl a" and "a" could both be accidentally used when you press "ctrl" and "a" """)
-                            print('''If you don't want this to happen, make sure to change "check_if_pressed"''')
-                            print("so that at least one extra key of the control that has extra keys is there.")
+                            text = ("""\nControls like "ctrl a" and "a" could both be accidentally used when you press "ctrl" and "a" \n"""
+                                    '''If you don't want this to happen, make sure to change "check_if_pressed"\n'''
+                                    "so that at least one extra key of the control that has extra keys is there.")
                             break
                         else:
-                            print("No keys have been registered.")
+                            yield from message_flow("No keys have been registered.")
                             continue
             else:
-                print("\nUnknown command. Try again.")
+                text = "\nUnknown command. Try again."
         else:
-            print("Name wasn't found.")
+            text = "Name wasn't found."
     if save:
         config['controls'] = new_controls
-    hide_or_show_cursor(hide=True)
+    return False
 
 
 # ______________________run_pynput_matrix______________________
@@ -280,8 +267,14 @@ def run_pynput_matrix() -> None:
     Returns:
         None
     """
-    config = get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME)
-    run_matrix(update_pressed_keys, change_controls, config)
+    arguments = parse_arguments()
+    config = get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME, interactive=not arguments.non_interactive)
+    if arguments.check_allocations:
+        sys.exit(check_allocations(config))
+    # without the library update_pressed_keys would wait for the user to press enter
+    pressed_keys_func = update_pressed_keys if PYNPUT_AVAILABLE or not arguments.non_interactive else filler_func
+    run_matrix(pressed_keys_func, change_controls, config, startup_benchmark=arguments.startup_benchmark,
+               profile_frames=arguments.profile)
 
 
 if __name__ == '__main__':
@@ -4,8 +4,14 @@ import time
 import os
 import sys
 import json
-import collections
+import copy
+import math
 import threading
+import argparse
+import signal
+import array
+import operator
+import tracemalloc
 from typing import Any, Callable
 try:
     import pathvalidate
@@ -14,7 +20,25 @@ except ImportError:
     PATHVALIDATE_AVAILABLE = False
 
 from modules.terminal_control_funcs import hide_or_show_cursor, flush_stdin
-from modules.ansi_color_funcs import parse_ansi_color, extend_colors
+from modules.key_events import KeyEvents
+from modules.ansi_color_funcs import parse_ansi_color, extend_colors, quantize_colors
+from modules.color_cache import make_color_cache, get_palette_id, resize_color_cache, get_color_cache_text
+from modules.config_cache import get_user_cache_dir, load_cached_config, save_cached_config
+from modules.snapshot import save_snapshot, load_snapshot
+from modules.config_watcher import make_config_watcher, config_file_changed, stop_config_watcher
+from modules.framebuffer import HIDDEN_COLOR, make_framebuffer, resize_framebuffer, set_palette
+from modules.row_encoder import gil_is_enabled, make_row_encoder, encode_frame, stop_row_encoder
+from modules.frame_export import update_frame_export, stop_frame_export
+from modules.metrics import make_metrics, record_frame, update_metrics_server, stop_metrics_server
+from modules.frame_profiler import (make_frame_profiler, start_frame_profile, update_frame_profile, pause_frame_profile,
+                                   resume_frame_profile, stop_frame_profile)
+from modules.overlay import make_overlay, update_overlay, paint_overlay, sparse_overlay_output
+from modules.prompt_panel import (Flow, make_prompt_panel, start_flow, panel_is_open, take_result, handle_key_event,
+                                  get_panel_cells, run_flow_blocking)
+from modules.sequence_pool import make_sequence_pool, take_sequence, release_sequence, recycle_sequences
+from modules.glyph_stream import take_glyphs
+from modules.settings import Settings, validate_setting, validate_config, get_settings
+from modules.quality_governor import QUALITY_LEVELS, make_governor, update_governor, apply_quality_level, should_render
 
 # if you saved your config in a file you can load it by putting the file name here
 # if you want to use the default values, keep this variable as an emtpy string
@@ -22,37 +46,242 @@ CONFIG_FILE = ''
 
 CONFIG_DIR_NAME = 'config'
 
+# settings that were added later, config files saved before they existed get these values
+ADDED_SETTINGS = {
+    "quality_governor": False,
+    "time_based_simulation": False,
+    "simulation_step": 0.045,
+    "simulation_speed": 1.0,
+    "warm_start": False,
+    "prewarm_seconds": 0,
+    "watch_config_file": False,
+    "background_layer_speeds": [],
+    "background_layer_densities": [],
+    "render_mode": "full",
+    "sparse_color_steps": 3,
+    "trail_length": 0,
+    "overlays": [],
+    "color_cache_size": 1024,
+    "render_threads": 1,
+    "shared_memory_name": "",
+    "metrics_port": 0,
+    "profile_frames": 100
+}
+
+# controls that were added later, config files saved before they existed get these keys
+ADDED_CONTROLS = {
+    "profile": "shift p"
+}
+
+# the most backgrounds that can be made with the controls (the palette tables are always made for at least this many)
+MAX_BACKGROUND_LAYERS = 8
+
+# values that are only used while the program is running: they aren't saved and loading a config file keeps them
+# (except the name of the file), so caches, the governor and the sequence pool survive a load
+RUNTIME_VALUES = ('extended_color_cache', 'governor', 'interactive', 'startup_time', 'palettes', 'palette_ids',
+                  'palette_brightness', 'palette_gradients', 'file_name', 'dir_name', 'folder_is_valid', 'file_is_valid',
+                  'paused', 'profile_request', 'settings_cache', 'sequence_pool')
+LOADED_FILE_VALUES = ('file_name', 'file_is_valid')
+
+# settings that need the colors to be remade or the screen to be cleared when they are reloaded
+COLOR_SETTINGS = ('colors', 'background_brightness_reduction', 'render_mode', 'sparse_color_steps', 'trail_length',
+                  'color_cache_size')
+LAYOUT_SETTINGS = ('amount_of_rows', 'amount_of_columns', 'space_between_columns', 'auto_size')
+# with auto_size the size comes from the terminal, so these settings of a file are ignored
+SIZE_SETTINGS = ('amount_of_rows', 'amount_of_columns')
+
+# the rain is saved to this file in the user's cache directory (see modules/config_cache.py) when it stops and
+# restored when it starts if "warm_start" is True
+SNAPSHOT_FILE_NAME = 'snapshot'
+
+# the profiles of the profile control and --profile are written to this folder (next to this file)
+PROFILE_DIR_NAME = 'profiles'
+
+# used if the time the process started can't be found
+IMPORT_TIME = time.time()
+
+# in time based simulation, the most seconds the simulation can fall behind before that time is dropped
+MAX_SIMULATION_LAG = 1.0
+
+# frames measure_allocations() runs before it starts tracing (until the sequence pool is full enough) and traces
+ALLOCATION_WARMUP_FRAMES = 1500
+ALLOCATION_CHECK_FRAMES = 500
+# the most memory blocks a frame may leave allocated once the rain has been running for a while (the chars lists
+# still grow now and then when a longer sequence reuses them, which is about 0.3 blocks per frame)
+MAX_BLOCKS_PER_FRAME = 4
+
+
+# ______________________choose_level______________________
+def choose_level(settings: Settings) -> int:
+    """
+    Choose the palette level of a new sequence (0 = foreground, otherwise a background layer).
+
+    Args:
+        settings (Settings): Settings made by get_settings().
+
+    Returns:
+        int: The level.
+    """
+    if random.random() > settings.background_chance or not settings.background_layers:
+        return 0
+    if settings.layer_cum_weights:
+        return random.choices(settings.layer_levels, cum_weights=settings.layer_cum_weights)[0]
+    return random.randint(1, settings.background_layers)
+
+
+# ______________________choose_speed______________________
+def choose_speed(settings: Settings, level: int) -> float:
+    """
+    Choose the speed of a new sequence.
+
+    Args:
+        settings (Settings): Settings made by get_settings().
+        level (int): Palette level of the sequence (see choose_level()).
+
+    Returns:
+        float: Rows per frame.
+    """
+    if 0 < level <= len(settings.layer_speeds):
+        # each background layer can have its own speed range (for example slower layers further back)
+        min_speed, max_speed = settings.layer_speeds[level - 1]
+    else:
+        min_speed, max_speed = settings.min_sequence_speed, settings.max_sequence_speed
+    return random.uniform(min_speed, max_speed)
+
 
 # ______________________make_sequence______________________
-def make_sequence(config: dict[str, Any]) -> dict[str, Any]:
+def make_sequence(settings: Settings, seq_length: int | None = None, speed: float | None = None,
+                  pool: dict[str, Any] | None = None, level: int | None = None) -> dict[str, Any]:
     """
     Create a new falling character sequence for a column.
 
     A sequence consists of a list of random characters, a speed, and color information.
-    The sequence length, speed, and characters are determined based on the provided configuration.
+    The sequence length, speed, and characters are determined based on the provided settings.
+    If the pool has a removed sequence, its dictionary and 'chars' list are reused instead of making new ones.
 
     Args:
-        config (dict): Configuration dictionary containing parameters such as sequence length,
-                       speed, characters, and colors.
+        settings (Settings): Settings made by get_settings() containing parameters such as sequence length,
+                             speed and characters.
+        seq_length (int, optional): Length of the sequence. If None, a random length is chosen.
+        speed (float, optional): Speed of the sequence (rows per update). If None, a random speed is chosen.
+        pool (dict, optional): Pool of removed sequences (see modules/sequence_pool.py).
+        level (int, optional): Palette level of the sequence. If None, a random level is chosen.
 
     Returns:
         dict: A dictionary representing a sequence with keys:
               - 'chars': list of characters,
               - 'final_char': current bottom position (as float),
-              - 'speed': falling speed,
-              - 'colors': base color tuple,
-              - 'colors_extended': extended color gradient (initially empty).
+              - 'speed': falling speed (rows per update: per frame, or per simulation_step in time based simulation,
+                         see update_column()),
+              - 'level': index of the sequence's palette in config['palettes'] (0 = config['colors'],
+                         otherwise the background with that number).
     """
-    seq_length = random.randint(config["min_sequence_length"], config["max_sequence_length"])
-    if random.random() > config['background_chance']:
-        colors: tuple[str] = config['colors']
-    else:
-        colors: tuple[str] = random.choice(tuple(config['background_colors'].keys()))
-    return {'chars': [random.choice(config["characters"]) for _ in range(seq_length)],
-            'final_char': 0,
-            'speed': random.uniform(config["min_sequence_speed"], config["max_sequence_speed"]),
-            'colors': colors,
-            'colors_extended': []}
+    if seq_length is None:
+        seq_length = random.randint(settings.min_sequence_length, settings.max_sequence_length)
+    if level is None:
+        level = choose_level(settings)
+    if speed is None:
+        speed = choose_speed(settings, level)
+    sequence = take_sequence(pool)
+    if sequence is None:
+        return {'chars': list(take_glyphs(settings.glyphs, seq_length)),
+                'final_char': 0,
+                'speed': speed,
+                'level': level}
+
+    chars: list[str] = sequence['chars']
+    chars.clear()
+    chars.extend(take_glyphs(settings.glyphs, seq_length))
+    sequence['final_char'] = 0
+    sequence['speed'] = speed
+    sequence['level'] = level
+    # values of render_sparse(), without 'rendered_bottom' the sequence is drawn as a new one
+    sequence.pop('rendered_bottom', None)
+    if 'mutations' in sequence:
+        sequence['mutations'].clear()
+    return sequence
+
+
+# ______________________get_gradient______________________
+def get_gradient(config: dict[str, Any], level: int, seq_len: int) -> tuple[str]:
+    """
+    Get the colors of every character of a sequence with the given palette level and length.
+
+    Sequences can have different lengths than there are colors, so the palette is extended (or quantized in the
+    sparse render mode). The result is stored in the level's table, which is replaced when the palettes change.
+
+    Args:
+        config (dict): Configuration dictionary containing the palette tables.
+        level (int): Palette level of the sequence.
+        seq_len (int): Length of the sequence.
+
+    Returns:
+        tuple: ANSI escape codes, index 0 is used for the head.
+    """
+    gradients: dict[int, tuple[str]] = config['palette_gradients'][level]
+    colors_extended = gradients.get(seq_len)
+    if colors_extended is None:
+        if config['render_mode'] == 'sparse':
+            colors_extended = quantize_colors(config['palettes'][level], seq_len, config['sparse_color_steps'], config)
+        else:
+            colors_extended = extend_colors(config['palettes'][level], seq_len, config, config['palette_ids'][level])
+        gradients[seq_len] = colors_extended
+    return colors_extended
+
+
+# ______________________columns_to_cells______________________
+def columns_to_cells(columns: list[list[dict[str, Any]]], config: dict[str, Any]) -> list[list[str]]:
+    """
+    Convert column sequences into a list of cells (a colored character or a space) for every column.
+
+    Each column is drawn separately with a depth buffer: every sequence only visits the rows it covers and
+    replaces a cell if it is brighter (closer) than what is already in the cell.
+    This way the cost per cell stays the same no matter how many background layers there are.
+
+    Args:
+        columns (list): List of columns, where each column is a list of sequences.
+        config (dict): Configuration dictionary containing display settings.
+
+    Returns:
+        list: A list with a list of cells (one for every row) for every column. Empty columns share the same list.
+    """
+    settings = get_settings(config)
+    amount_of_rows = settings.amount_of_rows
+    brightness: tuple[float] = config['palette_brightness']
+    empty_column = [' '] * amount_of_rows
+    column_cells: list[list[str]] = []
+
+    for i, column in enumerate(columns):
+        if not column or (settings.space_between_columns and i % 2 == 1):
+            column_cells.append(empty_column)
+            continue
+
+        cells = empty_column.copy()
+        # brightness of the sequence shown in each row, if sequences have the same brightness the first one is used
+        depth = [0.0] * amount_of_rows
+        for sequence in column:
+            chars: list[str] = sequence['chars']
+            seq_len = len(chars)
+            # final_char is a float because of different speeds, this is the same as round()
+            seq_bottom = int(sequence['final_char'] + 0.5)
+            first_row = max(seq_bottom - seq_len + 1, 0)
+            last_row = min(seq_bottom, amount_of_rows - 1)
+            if first_row > last_row:
+                continue
+
+            seq_brightness = brightness[sequence['level']]
+            colors_extended = get_gradient(config, sequence['level'], seq_len)
+            color_scale = (len(colors_extended) - 1) / max(seq_len - 1, 1)
+
+            for row_index in range(first_row, last_row + 1):
+                if seq_brightness > depth[row_index]:
+                    depth[row_index] = seq_brightness
+                    # Calculate display_index so that the head (index 0) is at the bottom.
+                    display_index = seq_bottom - row_index
+                    color = colors_extended[int(color_scale * display_index)]
+                    cells[row_index] = f"{color}{chars[display_index]}\u001b[0m"  # \u001b[0m just resets the color (it isn't visible in the rain)
+        column_cells.append(cells)
+    return column_cells
 
 
 # ______________________columns_to_rows______________________
@@ -60,8 +289,7 @@ def columns_to_rows(columns: list[list[dict[str, Any]]], config: dict[str, Any])
     """
     Convert column sequences into a list of strings representing terminal rows.
 
-    This function iterates over each row and column to build a string for display,
-    taking into account sequence positions, visibility, spacing between columns, and color gradients.
+    The cells of every column are made by columns_to_cells() and then joined into rows.
 
     Args:
         columns (list): List of columns, where each column is a list of sequences.
@@ -70,122 +298,412 @@ def columns_to_rows(columns: list[list[dict[str, Any]]], config: dict[str, Any])
     Returns:
         list: A list of strings, each representing a row to be displayed in the terminal.
     """
-    rows: list[str] = []
-    for row_index in range(config["amount_of_rows"]):
-        row: list[str] = []
-        for i, column in enumerate(columns):
-            if not column:
-                row.append(' ')
-                continue
+    column_cells = columns_to_cells(columns, config)
+    if not column_cells:
+        return [''] * get_settings(config).amount_of_rows
+    return [''.join(row) for row in zip(*column_cells)]
+
+
+# ______________________get_trail_ids______________________
+def get_trail_ids(framebuffer: dict[str, Any], config: dict[str, Any], trail_length: int) -> list[list[int]]:
+    """
+    Get the color ids of the fading trail for every palette level, by trail intensity.
+
+    The trail starts with the last color of the level's palette and fades to black over trail_length steps
+    (made with extend_colors). Intensity 0 is HIDDEN_COLOR, so a cell without trail is drawn as a space.
 
-            if config['space_between_columns'] and i % 2 == 1:
-                row.append(' ')
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer() (with the current palette set).
+        config (dict): Configuration dictionary containing the palettes.
+        trail_length (int): Amount of frames it takes the trail to fade out.
+
+    Returns:
+        list: A list of trail_length + 1 color ids for every palette level.
+    """
+    if framebuffer.get('trail_ids_key') != (config['palette_gradients'], trail_length):
+        trail_ids: list[list[int]] = []
+        for palette in config['palettes']:
+            # index 0 is the color right behind the sequence, trail_length is black
+            fade = extend_colors((palette[-1], "\u001b[38;2;0;0;0m"), trail_length + 1, config)
+            trail_ids.append([HIDDEN_COLOR] + [framebuffer['color_ids'][fade[trail_length - intensity]]
+                                               for intensity in range(1, trail_length + 1)])
+        framebuffer['trail_ids'] = trail_ids
+        # palette_gradients is compared with "is", so it is kept in a tuple instead of being compared by value
+        framebuffer['trail_ids_key'] = (config['palette_gradients'], trail_length)
+    return framebuffer['trail_ids']
+
+
+# ______________________paint_framebuffer______________________
+def paint_framebuffer(framebuffer: dict[str, Any], columns: list[list[dict[str, Any]]], config: dict[str, Any]) -> None:
+    """
+    Paint column sequences into a framebuffer (see modules/framebuffer.py).
+
+    Gives the same result as the depth buffer of columns_to_cells(), but the sequences of a column are painted
+    from the darkest to the brightest with slice assignments, so no Python code runs per cell.
+    Glyphs and colors are written as ids into the framebuffer's arrays instead of making a string for every cell.
+    The framebuffer is only reallocated if the size changed.
+
+    If trail_length is set, cells keep showing their last glyph after a sequence passed and fade out over
+    trail_length frames. For this the framebuffer stores the glyph, palette level and intensity of every cell
+    (column by column); the intensities are decayed with one bytearray.translate() per frame and turned into
+    colors with map(), so the trail doesn't add Python code per cell either.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        columns (list): List of columns, where each column is a list of sequences.
+        config (dict): Configuration dictionary containing display settings.
+    """
+    settings = get_settings(config)
+    amount_of_rows = settings.amount_of_rows
+    amount_of_columns = len(columns)
+    resize_framebuffer(framebuffer, amount_of_rows, amount_of_columns)
+    set_palette(framebuffer, config['palette_gradients'])
+    # color ids of every gradient (from the last character to the head), by level and sequence length
+    gradient_ids: dict[tuple[int, int], list[int]] = framebuffer.setdefault('gradient_ids', {})
+    if framebuffer.get('gradient_ids_palette') is not config['palette_gradients']:
+        gradient_ids.clear()
+        framebuffer['gradient_ids_palette'] = config['palette_gradients']
+
+    brightness: tuple[float] = config['palette_brightness']
+    get_glyph_id = framebuffer['glyph_ids'].__getitem__
+    color_ids = framebuffer['color_ids']
+    empty_glyphs = [' '] * amount_of_rows
+    empty_colors = [0] * amount_of_rows
+    # the cells are collected in lists and copied into the arrays at once, which is a lot faster than per column
+    # (the lists are kept in the framebuffer, so they aren't allocated every frame)
+    if len(framebuffer.get('frame_glyphs', ())) != amount_of_rows * amount_of_columns:
+        framebuffer['frame_glyphs'] = [' '] * (amount_of_rows * amount_of_columns)
+        framebuffer['frame_colors'] = [0] * (amount_of_rows * amount_of_columns)
+    frame_glyphs: list[str] = framebuffer['frame_glyphs']
+    frame_colors: list[int] = framebuffer['frame_colors']
+
+    trail_length = settings.trail_length
+    if trail_length:
+        trail_ids = get_trail_ids(framebuffer, config, trail_length)
+        size = amount_of_rows * amount_of_columns
+        if len(framebuffer.get('trail_glyphs', ())) != size or framebuffer['trail_length'] != trail_length:
+            framebuffer['trail_glyphs'] = [' '] * size
+            framebuffer['trail_levels'] = bytearray(size)
+            framebuffer['trail_intensity'] = bytearray(size)
+            framebuffer['trail_length'] = trail_length
+            # lowers every intensity by one, without going below 0
+            framebuffer['trail_decay'] = bytes([max(intensity - 1, 0) for intensity in range(256)])
+        trail_glyphs: list[str] = framebuffer['trail_glyphs']
+        trail_levels: bytearray = framebuffer['trail_levels']
+        trail_intensity: bytearray = framebuffer['trail_intensity'].translate(framebuffer['trail_decay'])
+        framebuffer['trail_intensity'] = trail_intensity
+        no_trail = bytes(amount_of_rows)
+        full_intensity = bytes([trail_length]) * amount_of_rows
+
+    space_between_columns = settings.space_between_columns
+    for i, column in enumerate(columns):
+        if space_between_columns and i % 2 == 1:
+            frame_glyphs[i::amount_of_columns] = empty_glyphs
+            frame_colors[i::amount_of_columns] = empty_colors
+            continue
+        if trail_length:
+            base = i * amount_of_rows
+            column_intensity = trail_intensity[base:base + amount_of_rows]
+            if not column and column_intensity == no_trail:
+                frame_glyphs[i::amount_of_columns] = empty_glyphs
+                frame_colors[i::amount_of_columns] = empty_colors
+                continue
+            # the trail is the background of the column
+            column_glyphs = trail_glyphs[base:base + amount_of_rows]
+            level_ids = map(trail_ids.__getitem__, trail_levels[base:base + amount_of_rows])
+            column_colors = list(map(operator.getitem, level_ids, column_intensity))
+        elif not column:
+            frame_glyphs[i::amount_of_columns] = empty_glyphs
+            frame_colors[i::amount_of_columns] = empty_colors
+            continue
+        else:
+            column_glyphs = empty_glyphs.copy()
+            column_colors = empty_colors.copy()
+        # painting the brighter sequences last has the same result as the depth buffer,
+        # the column is reversed so the first of the sequences with the same brightness is painted last
+        for sequence in sorted(reversed(column), key=lambda seq: brightness[seq['level']]):
+            chars: list[str] = sequence['chars']
+            seq_len = len(chars)
+            seq_bottom = int(sequence['final_char'] + 0.5)
+            first_row = max(seq_bottom - seq_len + 1, 0)
+            last_row = min(seq_bottom, amount_of_rows - 1)
+            if first_row > last_row:
                 continue
 
-            # Find the sequence in the column covering this row based on the highest visibility.
-            seq_to_display = None
-            seq_to_display_brightness = None
-            for sequence in column:
-                seq_len = len(sequence['chars'])
-                # final_char is a float because of different speeds, this is the same as round()
-                seq_bottom = int(sequence['final_char'] + 0.5)
-                seq_top = seq_bottom - seq_len + 1
-                if seq_top <= row_index <= seq_bottom:  # sequence covers this row
-                    if sequence['colors'] == config['colors']:  # after finding first fully bright sequence, use it
-                        seq_to_display = sequence
-                        break
+            reversed_colors = gradient_ids.get((sequence['level'], seq_len))
+            if reversed_colors is None:
+                colors_extended = get_gradient(config, sequence['level'], seq_len)
+                color_scale = (len(colors_extended) - 1) / max(seq_len - 1, 1)
+                reversed_colors = [color_ids[colors_extended[int(color_scale * display_index)]]
+                                   for display_index in range(seq_len - 1, -1, -1)]
+                gradient_ids[(sequence['level'], seq_len)] = reversed_colors
+
+            # row r shows display index seq_bottom - r, which is index r + offset when the sequence is reversed
+            offset = seq_len - 1 - seq_bottom
+            column_glyphs[first_row:last_row + 1] = chars[seq_bottom - last_row:seq_bottom - first_row + 1][::-1]
+            column_colors[first_row:last_row + 1] = reversed_colors[first_row + offset:last_row + offset + 1]
+            if trail_length:
+                trail_glyphs[base + first_row:base + last_row + 1] = column_glyphs[first_row:last_row + 1]
+                trail_levels[base + first_row:base + last_row + 1] = bytes([sequence['level']]) * (last_row - first_row + 1)
+                trail_intensity[base + first_row:base + last_row + 1] = full_intensity[:last_row - first_row + 1]
+        frame_glyphs[i::amount_of_columns] = column_glyphs
+        frame_colors[i::amount_of_columns] = column_colors
+
+    framebuffer['glyphs'][:] = array.array('I', map(get_glyph_id, frame_glyphs))
+    framebuffer['colors'][:] = array.array('I', frame_colors)
+
+
+# ______________________find_cell______________________
+def find_cell(column: list[dict[str, Any]], row_index: int, config: dict[str, Any]) -> str:
+    """
+    Find what a single cell of a column shows (the same result as columns_to_cells() for that cell).
+
+    Args:
+        column (list): The sequences of the column.
+        row_index (int): Row of the cell.
+        config (dict): Configuration dictionary containing display settings.
+
+    Returns:
+        str: The colored character of the brightest sequence covering the cell or a space.
+    """
+    brightness: tuple[float] = config['palette_brightness']
+    seq_to_display = None
+    seq_to_display_brightness = 0.0
+    for sequence in column:
+        seq_bottom = int(sequence['final_char'] + 0.5)
+        if seq_bottom - len(sequence['chars']) < row_index <= seq_bottom and brightness[sequence['level']] > seq_to_display_brightness:
+            seq_to_display = sequence
+            seq_to_display_brightness = brightness[sequence['level']]
+    if seq_to_display is None:
+        return ' '
+
+    seq_len = len(seq_to_display['chars'])
+    display_index = int(seq_to_display['final_char'] + 0.5) - row_index
+    colors_extended = get_gradient(config, seq_to_display['level'], seq_len)
+    color = colors_extended[int((len(colors_extended) - 1) / max(seq_len - 1, 1) * display_index)]
+    return f"{color}{seq_to_display['chars'][display_index]}\u001b[0m"
+
+
+# ______________________get_band_starts______________________
+def get_band_starts(seq_len: int, steps: int) -> list[int]:
+    """
+    Find where the color bands made by quantize_colors() start in a sequence.
 
-                    seq_brightness = config['background_colors'][sequence['colors']]
+    Args:
+        seq_len (int): Length of the sequence.
+        steps (int): Number of bands after the head.
 
-                    if not seq_to_display:
-                        seq_to_display = sequence
-                        seq_to_display_brightness = seq_brightness
-                    else:
-                        if seq_brightness > seq_to_display_brightness:  # if a sequence with higher brightness is found, use it
-                            seq_to_display = sequence
-                            seq_to_display_brightness = config['background_colors'][seq_to_display['colors']]
+    Returns:
+        list: Display indexes (0 = head) of the first character of every band after the head.
+    """
+    steps = max(steps, 1)
+    starts = [1] if seq_len > 1 else []
+    for display_index in range(2, seq_len):
+        if (display_index - 1) * steps // (seq_len - 1) != (display_index - 2) * steps // (seq_len - 1):
+            starts.append(display_index)
+    return starts
 
-            if seq_to_display is None:
-                row.append(' ')
-            else:
-                seq_len = len(seq_to_display['chars'])
-                seq_bottom = int(seq_to_display['final_char'] + 0.5)
-                # seq_top = seq_bottom - seq_len + 1 # this isn't used
-
-                # Calculate display_index so that the head (index 0) is at the bottom.
-                display_index = seq_bottom - row_index
-
-                # prevents constant lookups if the extended color has already been found/made
-                if not seq_to_display['colors_extended']:
-                    # sequences can have different lengths than there are colors, so we need to extend the colors
-                    colors_extended = extend_colors(seq_to_display["colors"], seq_len, config)
-                    seq_to_display['colors_extended'] = colors_extended
+
+# ______________________render_sparse______________________
+def render_sparse(columns: list[list[dict[str, Any]]], config: dict[str, Any], state: dict[str, Any], redraw: bool,
+                  masked: dict[tuple[int, int], Any] | None = None) -> str:
+    """
+    Make the output that updates the terminal to the current frame by only writing the cells that changed.
+
+    Sequences only move down, so with the quantized colors of the sparse render mode and "mode" turned on
+    (characters stay on their row), a moving sequence only changes its new head cells, the cells where a color
+    band starts and the cells its tail left. Together with the characters changed by update_column() (stored
+    in the sequence's 'mutations') these cells are checked and the ones that differ from what was written
+    before are written with cursor movements. The cost depends on the amount of sequences and changed
+    characters instead of the amount of cells.
+
+    Args:
+        columns (list): List of columns, where each column is a list of sequences.
+        config (dict): Configuration dictionary containing display settings.
+        state (dict): State of the renderer between frames (an empty dictionary the first time):
+                      - 'shadow': the cells that are on the screen, for every column,
+                      - 'layout': the settings the shadow was drawn with,
+                      - 'gradients': the palette tables the shadow was drawn with,
+                      - 'rendered': the sequences of every column that were drawn last time,
+                      - 'band_starts': get_band_starts() results by sequence length,
+                      - 'redrawn': True if the last call wrote the whole frame.
+        redraw (bool): If True, the whole frame is written (for example after the screen was cleared).
+        masked (dict, optional): Cells (row, column) that are covered by something else (the overlay) and are
+                                 skipped, except when the whole frame is written.
+
+    Returns:
+        str: Text to write to the terminal.
+    """
+    settings = get_settings(config)
+    amount_of_rows = settings.amount_of_rows
+    layout = (amount_of_rows, len(columns), settings.space_between_columns, settings.mode,
+              settings.visibility_priority, settings.sparse_color_steps)
+
+    if redraw or state.get('shadow') is None or state['layout'] != layout or state['gradients'] is not config['palette_gradients']:
+        column_cells = columns_to_cells(columns, config)
+        state['shadow'] = [cells.copy() for cells in column_cells]  # empty columns share a list
+        state['layout'] = layout
+        state['gradients'] = config['palette_gradients']
+        state['rendered'] = [column.copy() for column in columns]
+        state['band_starts'] = {}
+        for column in columns:
+            for sequence in column:
+                sequence['rendered_bottom'] = int(sequence['final_char'] + 0.5)
+                sequence.setdefault('mutations', []).clear()
+        rows = [''.join(row) for row in zip(*column_cells)] if column_cells else [''] * amount_of_rows
+        state['redrawn'] = True
+        return "\u001b[H" + "\n".join(rows) + "\n"  # \u001b[H moves the cursor to row and column 0
+
+    state['redrawn'] = False
+    masked = masked or {}
+    shadow: list[list[str]] = state['shadow']
+    band_starts: dict[int, list[int]] = state['band_starts']
+    mode = settings.mode
+    speed_scale = settings.speed_scale  # a sequence moves speed * speed_scale rows per update
+    output: list[str] = []
+    for i, column in enumerate(columns):
+        rendered: list[dict[str, Any]] = state['rendered'][i]
+        if not column and not rendered:
+            continue
+        if settings.space_between_columns and i % 2 == 1:
+            continue
+
+        rows_to_check: set[int] = set()
+        # sequences that were removed since the last frame (normally already below the last row)
+        if rendered:
+            current = set(map(id, column))
+            for sequence in rendered:
+                if id(sequence) not in current:
+                    bottom = sequence['rendered_bottom']
+                    rows_to_check.update(range(bottom - len(sequence['chars']) + 1, bottom + 1))
+
+        for sequence in column:
+            seq_len = len(sequence['chars'])
+            bottom = int(sequence['final_char'] + 0.5)
+            rendered_bottom = sequence.get('rendered_bottom')
+            if rendered_bottom is None:  # new sequence
+                rows_to_check.update(range(bottom - seq_len + 1, bottom + 1))
+            elif rendered_bottom != bottom:
+                if not mode or sequence['speed'] * speed_scale > 1:
+                    # the characters move with the sequence (in "mode" they only shift one row per update), so every cell changes
+                    rows_to_check.update(range(rendered_bottom - seq_len + 1, bottom + 1))
                 else:
-                    colors_extended: tuple[str] = seq_to_display['colors_extended']
+                    moved = bottom - rendered_bottom
+                    rows_to_check.update(range(rendered_bottom + 1, bottom + 1))  # new head cells
+                    rows_to_check.update(range(rendered_bottom - seq_len + 1, bottom - seq_len + 1))  # cells the tail left
+                    if seq_len not in band_starts:
+                        band_starts[seq_len] = get_band_starts(seq_len, settings.sparse_color_steps)
+                    for start in band_starts[seq_len]:
+                        rows_to_check.update(range(bottom - start - moved + 1, bottom - start + 1))
+            mutations: list[int] | None = sequence.get('mutations')
+            if mutations:
+                rows_to_check.update(mutations)
+                mutations.clear()
+            elif mutations is None:
+                sequence['mutations'] = []
+            sequence['rendered_bottom'] = bottom
+
+        column_shadow = shadow[i]
+        for row_index in rows_to_check:
+            if 0 <= row_index < amount_of_rows:
+                cell = find_cell(column, row_index, config)
+                if cell != column_shadow[row_index] and (row_index, i) not in masked:
+                    column_shadow[row_index] = cell
+                    output.append(f"\u001b[{row_index + 1};{i + 1}H{cell}")
+        state['rendered'][i][:] = column  # the columns are changed in place, so a copy is kept
+    return ''.join(output)
+
+
+# ______________________restore_sparse_cell______________________
+def restore_sparse_cell(columns: list[list[dict[str, Any]]], config: dict[str, Any], state: dict[str, Any], row_index: int, column_index: int) -> str:
+    """
+    Get what the rain shows in a cell that was masked in render_sparse() and store it as written.
 
-                # Map display_index to the gradient.
-                color_index = int((len(colors_extended) - 1) * (display_index / max(seq_len - 1, 1)))
+    Args:
+        columns (list): List of columns, where each column is a list of sequences.
+        config (dict): Configuration dictionary containing display settings.
+        state (dict): State of render_sparse().
+        row_index (int): Row of the cell.
+        column_index (int): Column of the cell.
 
-                color = colors_extended[color_index]
-                char: str = seq_to_display['chars'][display_index]
-                row.append(f"{color}{char}\u001b[0m")  # \u001b[0m just resets the color (it isn't visible in the rain)
-        rows.append(''.join(row))
-    return rows
+    Returns:
+        str: The colored character or a space.
+    """
+    if get_settings(config).space_between_columns and column_index % 2 == 1:
+        cell = ' '
+    else:
+        cell = find_cell(columns[column_index], row_index, config)
+    if state.get('shadow') is not None:
+        state['shadow'][column_index][row_index] = cell
+    return cell
 
 
 # ______________________update_column______________________
-def update_column(column: list[dict[str, Any]], config: dict[str, Any]) -> list[dict[str, Any]]:
+def update_column(column: list[dict[str, Any]], settings: Settings, pool: dict[str, Any] | None = None) -> list[dict[str, Any]]:
     """
     Update the falling sequences within a single column.
 
-    Each sequence's position is advanced based on its speed. Sequences that move completely
+    Each sequence's position is advanced based on its speed (in time based simulation the speed is multiplied by
+    simulation_speed, which speed_up/slow_down change instead of time_between_frames). Sequences that move completely
     off the display are removed. New sequences may be added based on a random chance.
+    The column list is changed in place, so no new list is made every frame.
 
     Args:
         column (list): A list of sequence dictionaries in a column.
-        config (dict): Configuration dictionary with parameters for sequence behavior.
+        settings (Settings): Settings made by get_settings() with parameters for sequence behavior.
+        pool (dict, optional): Pool that gets the removed sequences and gives new sequences (see modules/sequence_pool.py).
 
     Returns:
-        list: The updated list of sequences for the column.
+        list: The same column list.
     """
-    new_column: list[dict[str, Any]] = []
     if len(column) == 0:  # if the column is empty, create a new sequence with some probability
-        return [make_sequence(config)] if random.random() < config["new_sequence_chance"] else []
-
+        if random.random() < settings.new_sequence_chance:
+            column.append(make_sequence(settings, pool=pool))
+        return column
+
+    amount_of_rows = settings.amount_of_rows
+    mode = settings.mode
+    next_glyph = settings.glyphs.__next__  # random characters
+    random_char_change_chance = settings.random_char_change_chance
+    speed_scale = settings.speed_scale
+    kept = 0  # the sequences that stay are moved to the start of the column
     for sequence in column:
-        # if the sequence is fully below the last row, we don't want to append it to the new column list
-        if sequence['final_char'] > (config["amount_of_rows"] + len(sequence['chars'])):
+        # if the sequence is fully below the last row, we don't want to keep it in the column
+        if sequence['final_char'] > (amount_of_rows + len(sequence['chars'])):
+            release_sequence(pool, sequence)
             continue
 
-        new_final_char: int = sequence['final_char'] + sequence['speed']
+        new_final_char: int = sequence['final_char'] + sequence['speed'] * speed_scale
 
-        if config["mode"] and int(sequence['final_char'] + 0.5) != int(new_final_char + 0.5):
+        if mode and int(sequence['final_char'] + 0.5) != int(new_final_char + 0.5):
             # Shift the sequence chars if it moves down this frame. (final_char from 2.3 to 2.4 would not move down)
             sequence['chars'].pop()
-            sequence['chars'].insert(0, random.choice(config["characters"]))
+            sequence['chars'].insert(0, next_glyph())
 
         # chance to change a character that is not the first/lowest one to a new random character
-        if config["random_char_change_chance"]:
+        if random_char_change_chance:
+            mutations: list[int] | None = sequence.get('mutations')  # rows of changed characters for render_sparse()
             for idx in range(len(sequence['chars'])):
-                if random.random() < config["random_char_change_chance"] and idx != 0:
-                    sequence['chars'][idx] = random.choice(config["characters"])
+                if random.random() < random_char_change_chance and idx != 0:
+                    sequence['chars'][idx] = next_glyph()
+                    if mutations is not None:
+                        mutations.append(int(new_final_char + 0.5) - idx)
 
         sequence['final_char'] = new_final_char
-        new_column.append(sequence)
+        column[kept] = sequence
+        kept += 1
+    del column[kept:]
 
     # if the highest sequence is fully visible, create a new sequence with some chance
-    if new_column:
-        if config['visibility_priority'] == 'higher':
-            first_sequence = new_column[0]
-        elif config['visibility_priority'] == 'lower':
-            first_sequence = new_column[-1]
-        if first_sequence['final_char'] >= len(first_sequence["chars"]) and random.random() < config["new_sequence_chance"]:
+    if column:
+        first_sequence = column[0] if settings.new_first else column[-1]
+        if first_sequence['final_char'] >= len(first_sequence["chars"]) and random.random() < settings.new_sequence_chance:
             # changes the order in which valid sequences are checked in columns_to_rows
-            if config['visibility_priority'] == 'higher':
-                new_column.insert(0, make_sequence(config))
-            elif config['visibility_priority'] == 'lower':
-                new_column.append(make_sequence(config))
-    return new_column
+            if settings.new_first:
+                column.insert(0, make_sequence(settings, pool=pool))
+            else:
+                column.append(make_sequence(settings, pool=pool))
+    return column
 
 
 # ______________________update_columns______________________
@@ -195,6 +713,7 @@ def update_columns(columns: list[list[dict[str, Any]]], config: dict[str, Any],
 
     This function updates each column's sequences and adds or removes columns if the configuration
     for the number of columns has changed. It also determines whether a full screen clear is required.
+    The columns are updated in place and removed sequences go to config['sequence_pool'].
 
     Args:
         columns (list): List of columns (each a list of sequences).
@@ -206,45 +725,144 @@ def update_columns(columns: list[list[dict[str, Any]]], config: dict[str, Any],
                - new_columns is the updated list of columns,
                - clear is a boolean indicating if a screen clear is needed.
     """
+    # the settings are only made again when a setting changed, so the columns don't have to look them up
+    settings = get_settings(config)
+    pool: dict[str, Any] = config['sequence_pool']
     # remove or add columns if config["amount_of_columns"] changed
-    if len(columns) > config["amount_of_columns"]:
-        columns = columns[:config["amount_of_columns"]]
+    if len(columns) > settings.amount_of_columns:
+        for column in columns[settings.amount_of_columns:]:
+            for sequence in column:
+                release_sequence(pool, sequence)
+        columns = columns[:settings.amount_of_columns]
         clear = True
-    elif len(columns) < config["amount_of_columns"]:
-        columns.extend([[] for _ in range(config["amount_of_columns"] - len(columns))])
+    elif len(columns) < settings.amount_of_columns:
+        columns.extend([[] for _ in range(settings.amount_of_columns - len(columns))])
         clear = True
 
-    if config['space_between_columns']:
-        new_columns: list[list[dict[str, Any]]] = []
-        for i, column in enumerate(columns):
-            if i % 2 == 1:  # there is no need to update sequences if they aren't visible
-                new_columns.append(column)
+    # there is no need to update sequences if they aren't visible
+    step = 2 if settings.space_between_columns else 1
+    for i in range(0, len(columns), step):
+        update_column(columns[i], settings, pool)
+    return columns, clear
+
+
+# ______________________frames_until_chance______________________
+def frames_until_chance(chance: float) -> int | float:
+    """
+    Find how many frames pass before something with the given chance per frame happens.
+
+    This gives the same result as checking random.random() < chance every frame, but with only one random number.
+
+    Args:
+        chance (float): Chance for the event to happen in a frame.
+
+    Returns:
+        int: Number of frames without the event before the frame with the event (math.inf if it never happens).
+    """
+    if chance >= 1:
+        return 0
+    if chance <= 0:
+        return math.inf
+    return int(math.log(1.0 - random.random()) / math.log(1.0 - chance))
+
+
+# ______________________prewarm_columns______________________
+def prewarm_columns(columns: list[list[dict[str, Any]]], config: dict[str, Any], seconds: float) -> None:
+    """
+    Fill empty columns as if the rain had already been running for the given time.
+
+    Instead of calling update_column() for every frame, only the frames where something happens are visited:
+    the frame a new sequence starts is drawn directly (see frames_until_chance()) and the frame a sequence
+    becomes fully visible or falls out of the display is calculated from its speed. Nothing is rendered and
+    sequences are only made for the ones that are still visible at the end, so even long prewarms are fast.
+    Random character changes are skipped because the characters are random anyway.
+
+    Args:
+        columns (list): List of columns (each a list of sequences). Only empty columns are filled.
+        config (dict): Configuration dictionary with display and sequence settings.
+        seconds (float): How many seconds of rain to simulate.
+
+    Returns:
+        None
+    """
+    settings = get_settings(config)
+    # the speeds are rows per update, which is a frame or a simulation_step (see update_column())
+    update_time = config['simulation_step'] if config['time_based_simulation'] else config['time_between_frames']
+    frames = int(seconds / update_time)
+    rows = config["amount_of_rows"]
+    chance = settings.new_sequence_chance
+    speed_scale = settings.speed_scale
+
+    for i, column in enumerate(columns):
+        if column or (config['space_between_columns'] and i % 2 == 1):
+            continue
+
+        # (start frame, speed, length, frame it gets removed in, level) for every sequence, in the order they started
+        started: list[tuple[int, float, int, int, int]] = []
+        frame = 0
+        while frame < frames:
+            started = [sequence for sequence in started if sequence[3] >= frame]
+            newest = None
+            for sequence in reversed(started):
+                if sequence[3] > frame:
+                    newest = sequence
+                    break
+
+            if newest is None:
+                # if a sequence was removed in this frame, the column only counts as empty from the next frame
+                if started:
+                    frame += 1
+                start = frame + frames_until_chance(chance)
+                window_end = frames
             else:
-                new_columns.append(update_column(column, config))
-    else:
-        new_columns = [update_column(column, config) for column in columns]
-    return new_columns, clear
+                start_frame, speed, length, removed, _ = newest
+                # new sequences can only start once the newest one is fully visible (final_char >= length)
+                start = max(frame, start_frame + math.ceil(length / speed)) + frames_until_chance(chance)
+                window_end = min(removed, frames)
+
+            if start >= window_end:
+                if newest is None:
+                    break
+                frame = window_end
+                continue
+
+            length = random.randint(settings.min_sequence_length, settings.max_sequence_length)
+            # the level is chosen first, so background layers get their own speeds like in make_sequence()
+            level = choose_level(settings)
+            speed = choose_speed(settings, level) * speed_scale
+            # a sequence is removed in the update where it is already more than rows + length below the top
+            started.append((start, speed, length, start + int((rows + length) / speed) + 2, level))
+            frame = start + 1
+
+        for start_frame, speed, length, removed, level in started:
+            if removed < frames:
+                continue
+            sequence = make_sequence(settings, seq_length=length, speed=speed / speed_scale, level=level)
+            sequence['final_char'] = (frames - 1 - start_frame) * speed
+            if config['visibility_priority'] == 'higher':
+                column.insert(0, sequence)
+            else:
+                column.append(sequence)
 
 
-# ______________________update_sequence_and_background_colors______________________
-def update_sequence_and_background_colors(config: dict[str, Any], columns: list[list[dict[str, Any]]]) -> None:
+# ______________________update_palettes______________________
+def update_palettes(config: dict[str, Any]) -> None:
     """
-    Update the colors of sequences and background based on the current configuration.
+    Remake the palettes used by sequences based on the current colors and background settings.
 
-    This function recalculates background colors by reducing brightness and applies changes to
-    existing sequences, updating their extended color gradients if necessary.
+    Sequences only store the index (level) of their palette, so changing the colors only replaces these small
+    tables and doesn't need to touch any sequence. Level 0 is config['colors'] and level n is the background made
+    with the n-th value of background_brightness_reduction. The tables always have at least
+    MAX_BACKGROUND_LAYERS + 1 levels and never get shorter; if there are fewer backgrounds than levels, the
+    extra levels reuse the existing backgrounds, so sequences made with more backgrounds stay in the background.
 
     Args:
         config (dict): Configuration dictionary containing color settings.
-        columns (list): List of columns with sequences to update.
 
     Returns:
         None
     """
-    old_background_colors: tuple[str] = list(config['background_colors'].keys())
-    config['background_colors'] = {}
-    make_random = False
-
+    backgrounds: list[tuple[str]] = []
     # create a background color by reducing all colors' rgb values using reduction_rate
     for reduction_rate in config['background_brightness_reduction']:
         new_colors: list[str] = []
@@ -255,25 +873,31 @@ def update_sequence_and_background_colors(config: dict[str, Any], columns: list[
                 new_colors.append(f"\u001b[1;38;2;{r};{g};{b}m")
             else:
                 new_colors.append(f"\u001b[38;2;{r};{g};{b}m")
+        backgrounds.append(tuple(new_colors))
+
+    levels = max(len(config['palettes']), MAX_BACKGROUND_LAYERS + 1, len(backgrounds) + 1)
+    palettes: list[tuple[str]] = [config['colors']]
+    # the brightness is used in columns_to_rows to determine which sequence to display
+    brightness: list[float] = [1.0]
+    gradients: list[dict[int, tuple[str]]] = [{}]
+    background_gradients: list[dict[int, tuple[str]]] = [{} for _ in backgrounds]
+    for level in range(1, levels):
+        if backgrounds:
+            index = (level - 1) % len(backgrounds)
+            palettes.append(backgrounds[index])
+            brightness.append(config['background_brightness_reduction'][index])
+            gradients.append(background_gradients[index])
+        else:
+            palettes.append(config['colors'])
+            brightness.append(1.0)
+            gradients.append(gradients[0])
 
-        # reduction_rate is used in columns_to_rows to determine which sequence to display
-        config['background_colors'][tuple(new_colors)] = reduction_rate
-
-    if len(config['background_colors']) != len(old_background_colors):
-        make_random = True
-
-    for column in columns:
-        for sequence in column:
-            sequence['colors_extended'] = []
-            if sequence['colors'] in old_background_colors:  # sequence was a background color before color change
-                if make_random:
-                    sequence['colors'] = random.choice(tuple(config['background_colors'].keys()))
-                else:
-                    # if possible keep the background color's brightness the same
-                    index = old_background_colors.index(sequence['colors'])
-                    sequence['colors'] = tuple(config['background_colors'].keys())[index]
-            else:
-                sequence['colors'] = config['colors']  # update the sequences colors if it isn't a background color
+    cache: dict[str, Any] = config['extended_color_cache']
+    resize_color_cache(cache, config['color_cache_size'])
+    config['palettes'] = tuple(palettes)
+    config['palette_ids'] = tuple(get_palette_id(cache, palette) for palette in palettes)  # ids in the color cache
+    config['palette_brightness'] = tuple(brightness)
+    config['palette_gradients'] = gradients  # extended colors for each level by sequence length
 
 
 # ______________________keys_are_pressed______________________
@@ -305,8 +929,549 @@ def keys_are_pressed(currently_pressed: set[str], lock: threading.Lock, config:
         return True
 
 
+# ______________________get_current_values_text______________________
+def get_current_values_text(config: dict[str, Any]) -> str:
+    """
+    Make the text that shows the current values.
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Returns:
+        str: The text.
+    """
+    return f'''
+new_sequence_chance = {round(config["new_sequence_chance"], 4)} (Chance for a new sequence to start if there is space; range: 0 to 1)
+random_char_change_chance = {round(config["random_char_change_chance"], 4)} (Chance for characters to change mid-sequence)
+
+time_between_frames = {round(config["time_between_frames"], 4)} (Delay between frame updates) --> FPS = {round(1/config["time_between_frames"], 1)}
+
+min_sequence_speed = {round(config["min_sequence_speed"], 4)} (Rows per frame, 1/sequence_speed = frames to move the sequence)
+max_sequence_speed = {round(config["max_sequence_speed"], 4)} (range(speed): MIN_SEQUENCE_SPEED to MAX_SEQUENCE_SPEED)
+render_mode = {config['render_mode']} ("full" writes every cell, "sparse" only writes changed cells with quantized colors)
+sparse_color_steps = {config['sparse_color_steps']} (Number of color bands after the head in the sparse render mode)
+trail_length = {config['trail_length']} (Frames it takes the glyphs behind a sequence to fade out, 0 = no trail)
+color_cache_size = {config['color_cache_size']} (Most color gradients that are kept for reuse)
+color_cache = {get_color_cache_text(config['extended_color_cache'])}
+metrics_port = {config['metrics_port']} (Port of the Prometheus metrics at http://127.0.0.1:<port>/metrics, 0 = off)
+shared_memory_name = {config['shared_memory_name'] or '""'} (Name of the shared memory every frame is published in, "" = off)
+profile_frames = {config['profile_frames']} (Frames captured by the profile control, written to the "{PROFILE_DIR_NAME}" folder)
+render_threads = {config['render_threads']} (Threads that encode the rows of big frames on free-threaded Python, 0 = one per CPU core, 1 = no threads (default); GIL {'enabled' if gil_is_enabled() else 'disabled'})
+time_based_simulation = {config['time_based_simulation']} (Sequences move by the time passed instead of once per frame; slow frames are skipped)
+simulation_step = {config['simulation_step']} (Seconds simulated by one update in time based simulation)
+simulation_speed = {round(config['simulation_speed'], 4)} (How fast the rain falls in time based simulation, changed by speed up/slow down; 1 = the sequence speeds per simulation_step)
+
+min_sequence_length = {config["min_sequence_length"]}
+max_sequence_length = {config["max_sequence_length"]}
+
+AMOUNT_OF_COLUMNS = {config["amount_of_columns"]}
+AMOUNT_OF_ROWS = {config["amount_of_rows"]}
+
+mode = {config["mode"]} (Toggle for sequence update behavior)
+auto_size = {config["auto_size"]} (Toggle for automatic resizing of columns and rows)
+space_between_columns = {config['space_between_columns']}
+visibility_priority = {config['visibility_priority']}
+quality_governor = {config['quality_governor']} (Automatically lowers the quality when frames take longer than time_between_frames)
+quality_level = {config['governor']['level']} ({QUALITY_LEVELS[config['governor']['level']]})
+startup_time = {round(config['startup_time'], 3) if config['startup_time'] is not None else None} (Seconds from the process start to the first frame)
+
+background_brightness_reduction = {config['background_brightness_reduction']}
+background_layer_speeds = {config['background_layer_speeds']} (Min and max speed of each background layer, the other layers use the normal speeds)
+background_layer_densities = {config['background_layer_densities']} (How often each background layer is chosen compared to the others)
+characters = {config["characters"]}
+colors = {config["colors"]}
+background_colors = {config['palettes'][1:len(config['background_brightness_reduction']) + 1]}
+'''
+
+
+# ______________________get_help_text______________________
+def get_help_text(config: dict[str, Any]) -> str:
+    """
+    Make the help text with the current controls.
+
+    Args:
+        config (dict): Configuration dictionary containing the controls.
+
+    Returns:
+        str: The text.
+    """
+    return f'''Controls:
+
+    {', '.join(config['controls']['show_help_message'])} = show help message
+    {', '.join(config['controls']['cur_values'])} = display current values
+
+    {', '.join(config['controls']['speed_up'])} = speed up (relative to current speed)
+    {', '.join(config['controls']['slow_down'])} = slow down (relative to current speed)
+
+    {', '.join(config['controls']['change_speed_diff'])} = make some sequences move slower or faster (for example once every 3 frames)
+    {', '.join(config['controls']['change_seq_length'])} = set a new min and max length for sequences
+
+    {', '.join(config['controls']['pause'])} = (un)pause
+    {', '.join(config['controls']['mode_char'])} = toggles if the first letter of a sequence is random and the rest follow or if the sequence remains unchanged
+    {', '.join(config['controls']['auto_size_char'])} = adjusts matrix length and width based on the terminal's size
+    {', '.join(config['controls']['make_space_between_columns'])} = create a space in between all columns
+    {', '.join(config['controls']['change_visibility_priority'])} = changes priority of displaying sequences on the same row if the sequences have the same brightness
+
+    {', '.join(config['controls']['more_random_char'])} = increase chance for characters to change mid-sequence
+    {', '.join(config['controls']['less_random_char'])} = decrease chance for characters to change mid-sequence
+
+    {', '.join(config['controls']['less_rows'])} = shorten matrix length (rows)
+    {', '.join(config['controls']['more_rows'])} = increase matrix length (rows)
+    {', '.join(config['controls']['less_columns'])} = reduce number of columns
+    {', '.join(config['controls']['more_columns'])} = increase number of columns
+
+    {', '.join(config['controls']['more_new_sequence_chance'])} = increase the chance of a new sequence starting (relative to current chance)
+    {', '.join(config['controls']['less_new_sequence_chance'])} = decrease the chance of a new sequence starting (relative to current chance)
+
+    {', '.join(config['controls']['first_bold'])} = make the first character bold
+    {', '.join(config['controls']['first_white'])} = make first character white
+    {', '.join(config['controls']['first_bright'])} = make first character white but in the shade of the other colors (doesn't work for custom colors)
+    {', '.join(config['controls']['blue'])} = change color to blue
+    {', '.join(config['controls']['green'])} = change color to green
+    {', '.join(config['controls']['red'])} = change color to red
+    {', '.join(config['controls']['create_color'])} = create a new color or use your created colors
+    {', '.join(config['controls']['change_background_brightness'])} = create a background by making some sequences less bright
+
+    {', '.join(config['controls']['chars_01'])} = change characters to "01"
+    {', '.join(config['controls']['chars_default'])} = reset characters to default set
+    {', '.join(config['controls']['set_any_chars'])} = prompt for input to add or replace characters
+
+    {', '.join(config['controls']['save_config'])} = save current values and controls (rows, color...)
+    {', '.join(config['controls']['load_config'])} = load values and controls from a file
+
+    {', '.join(config['controls']['profile'])} = profile the next {config['profile_frames']} frames (written to the "{PROFILE_DIR_NAME}" folder)
+
+    {', '.join(config['controls']['change_controls'])} = change your controls
+    {', '.join(config['controls']['disable_controls'])} = disable keyboard controls temporarily
+    {', '.join(config['controls']['enable_controls'])} = re-enable keyboard controls
+
+    ctrl+c = stop matrix rain
+    esc = close this panel (up, down = scroll)
+
+    quality governor: {'on' if config['quality_governor'] else 'off'}, level {config['governor']['level']} ({QUALITY_LEVELS[config['governor']['level']]})
+'''
+
+
+# ______________________message_flow______________________
+def message_flow(text: str) -> Flow:
+    """
+    Flow that shows a text until enter is pressed.
+
+    Args:
+        text (str): The text to show.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    yield f'{text}\nPress enter to continue...'
+    return False
+
+
+# ______________________save_flow______________________
+def save_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that asks where the current config should be saved and saves it.
+
+    Args:
+        config (dict): Configuration dictionary to save.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    if not config['folder_is_valid']:
+        yield from message_flow(f'''The folder "{config['dir_name']}" isn't valid.\nYou won't be able to save your config''')
+        return False
+
+    text = ("You have chosen to save your current config.\n\n"
+            "new/n = save to a new file\n"
+            f"update/u = update \"{config['file_name']}\"\n"
+            "exit/e = leave without saving your config")
+    while True:
+        command = (yield text).lower().strip()
+
+        if command in ['exit', 'e']:
+            return False
+        elif command in ['new', 'n']:
+            yield from save_config_flow(config, update=False)
+            return False
+        elif command in ['update', 'u']:
+            if not config['file_is_valid']:
+                text = f"\nThe file you have entered ({config['file_name']}) isn't valid.\nPlease save to a new file or exit."
+                continue
+            yield from save_config_flow(config, update=True)
+            return False
+        else:
+            text = 'Please enter one of the given commands: new/e, update/u, exit/e'
+
+
+# ______________________load_flow______________________
+def load_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that asks for a config file and loads it into config.
+
+    Args:
+        config (dict): Configuration dictionary that gets the loaded values.
+
+    Returns:
+        bool: True if a config was loaded (the colors have to be updated).
+    """
+    if not config['folder_is_valid']:
+        yield from message_flow(f'''The folder "{config['dir_name']}" isn't valid.\nYou won't be able to load your config from any file''')
+        return False
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, config['dir_name'])
+    os.makedirs(config_dir, exist_ok=True)
+    file_names = [f for f in os.listdir(config_dir) if os.path.isfile(os.path.join(config_dir, f))]
+    text = ("You have chosen to load a config from a file\n\n"
+            "show/s = show all available files\n"
+            "exit/e = keep current config\n"
+            "Enter the name of the file you want to load your config from.")
+    while True:
+        load_file = (yield text).strip()
+
+        if load_file.lower() in ['exit', 'e']:
+            return False
+
+        if load_file.lower() in ['show', 's']:
+            if len(file_names) == 0:
+                text = 'No files have been found.\n'
+                continue
+
+            lines = ['\nFiles:']
+            line = file_names[0]
+            i = 2
+            for file_name in file_names[1:]:
+                if i <= 3:
+                    line += ', ' + file_name
+                else:
+                    i = 1
+                    lines.append(line + ',')
+                    line = file_name
+                i += 1
+            lines.append(line + '\n')
+            text = '\n'.join(lines)
+            continue
+
+        if not load_file.endswith('.json'):
+            load_file += '.json'
+
+        if load_file not in file_names:
+            text = "File wasn't found.\n"
+        else:
+            # get_config() can't print or ask anything while the rain is running, its messages are shown here
+            messages: list[str] = []
+            new_config = get_config(file_name=load_file, dir_name=config['dir_name'], interactive=False,
+                                    messages=messages)
+            if not new_config['file_is_valid']:
+                # the default values aren't loaded in place of a file that isn't valid
+                text = '\n'.join(messages) + '\n'
+                continue
+            if messages:
+                yield from message_flow('\n'.join(messages))
+            for key in config:
+                # the running caches, governor and sequence pool are kept, the palettes are remade from the new colors
+                if key not in RUNTIME_VALUES or key in LOADED_FILE_VALUES:
+                    config[key] = new_config[key]
+            return True
+
+
+# ______________________create_color_flow______________________
+def create_color_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that creates, uses or deletes custom colors.
+
+    Args:
+        config (dict): Configuration dictionary containing the custom colors.
+
+    Returns:
+        bool: True (the colors have to be updated).
+    """
+    text = ("You have chosen to create a new color or use your created colors.\n\n"
+            "new/n = create a new color\n"
+            "use/u = use a previously created color\n"
+            "delete/d = delete a previous created color\n"
+            "exit/e = leave without doing anything\n")
+    while True:
+        command = (yield text).strip().lower()
+        if command in ['new', 'n', 'use', 'u', 'delete', 'd', 'exit', 'e']:
+            break
+        text = "Please enter a valid command"
+
+    if command in ['new', 'n']:
+        if len(config['custom_colors']) >= 10:
+            yield from message_flow('You can only create 10 custom colors.')
+            return True
+
+        text = "show/s = show current color names\n\nEnter a name for your color:"
+        while True:
+            name = (yield text).strip()
+
+            text = "\nEnter a name for your color:"
+            if name.lower() in ['show', 's']:
+                text = f"\nNames:\n{', '.join(config['custom_colors'].keys())}\n" + text
+                continue
+            if name:
+                if name in config['custom_colors']:
+                    text = 'Name is already in use.' + text
+                elif len(name) >= 30:
+                    text = "Name is too long" + text
+                else:
+                    break
+
+        text = ("\nTo create a new list of colors you will enter each colors' RGB values like this: R, G, B.\n"
+                "exit/e = leave when you are done creating individual colors\n\nColor 1:")
+        i = 1
+        colors: list[str] = []
+        make_color = True
+        while True:
+            user_input = (yield text).replace(' ', '').lower()
+            text = f'\nColor {i}:'
+
+            if user_input in ['e', 'exit']:
+                if len(colors) == 0:
+                    make_color = False
+                if len(colors) == 1:  # if color length were 1, it would cause indexing issues in some places
+                    colors.append(colors[0])
+                break
+
+            rgb = user_input.split(',')
+            if len(rgb) != 3:
+                text = "Please enter 3 values: R, G, B (for example: 150, 255, 0)" + text
+                continue
+
+            try:
+                if not all(0 <= float(value) <= 255 for value in rgb):
+                    text = 'Values have to range from 0 to 255' + text
+                    continue
+            except ValueError:
+                text = "RGB values have to be numbers" + text
+                continue
+
+            r, g, b = rgb
+            colors.append(f"\u001b[38;2;{r};{g};{b}m")
+            i += 1
+            text = f'\nColor {i}:'
+
+            if i > 12:
+                yield from message_flow("Maximum number of colors reached (12).")
+                break
+        if make_color:
+            config['custom_colors'][name] = tuple(colors)
+            yield from message_flow('Color has been added successfully.')
+
+    elif command in ['delete', 'd']:
+        text = ("show/s = show current color names\n"
+                "exit/e = leave without deleting a color\n\n"
+                "Enter the name of the color you want to delete:")
+        while True:
+            name = (yield text).strip()
+            text = "\nEnter the name of the color you want to delete:"
+
+            if name.lower() in ['exit', 'e']:
+                break
+            if name.lower() in ['show', 's']:
+                text = f"\nNames:\n{', '.join(config['custom_colors'].keys())}\n" + text
+                continue
+            if name in config['custom_colors']:
+                config['custom_colors'].pop(name)
+                yield from message_flow('Color has been deleted successfully.')
+                break
+            else:
+                text = "Color wasn't found" + text
+
+    elif command in ['use', 'u']:
+        text = ("show/s = show current color names\n"
+                "exit/e = keep current color\n\n"
+                "Enter the name of the color you want to use:")
+        while True:
+            name = (yield text).strip()
+            text = "\nEnter the name of the color you want to use:"
+
+            if name.lower() in ['show', 's']:
+                text = f"\nNames:\n{', '.join(config['custom_colors'].keys())}\n" + text
+                continue
+            if name.lower() in ['exit', 'e']:
+                break
+            if name in config['custom_colors']:
+                config['colors'] = config['custom_colors'][name]
+                break
+            else:
+                text = "Color wasn't found" + text
+    return True
+
+
+# ______________________background_flow______________________
+def background_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that asks for new background brightness reductions and the background chance.
+
+    Args:
+        config (dict): Configuration dictionary containing the background settings.
+
+    Returns:
+        bool: True (the colors have to be updated).
+    """
+    old_values = config['background_brightness_reduction']
+    new_values: list[float] = []
+
+    text = ("You have chosen to change the background.\n\n"
+            f"Old background brightness multipliers: {', '.join([str(value) for value in old_values])}\n"
+            "Enter the value for reduction in brightness for each background color from 0 to 1 (0.6 --> brightness will reduce to 60%)\n"
+            "exit/e = if you dont't want to make any more backgrounds (if you haven't entered any new values, the old values will be kept)\n\n"
+            "Background 1 reduction rate:")
+    i = 1
+    while True:
+        reduction_rate = (yield text).strip().lower()
+        text = f'\nBackground {i} reduction rate:'
+        if reduction_rate in ['e', 'exit']:
+            text = ''
+            break
+
+        try:
+            reduction_rate = float(reduction_rate)
+        except ValueError:
+            text = 'Reduction rate has to be a number.' + text
+            continue
+
+        if not 0 < reduction_rate < 1:
+            text = 'Reduction rate has to be between 0 and 1.' + text
+            continue
+        new_values.append(reduction_rate)
+        i += 1
+        text = f'\nBackground {i} reduction rate:'
+
+        if i > MAX_BACKGROUND_LAYERS:
+            text = f"You have entered all {MAX_BACKGROUND_LAYERS} available background colors.\n"
+            break
+
+    # the values are only changed at the end, so the rain keeps using complete settings while the user types
+    config['background_brightness_reduction'] = new_values if new_values else old_values
+    # the layer speeds and densities have one value per layer (see validate_config()), new layers get the normal ones
+    layers = len(config['background_brightness_reduction'])
+    if config['background_layer_speeds']:
+        speeds = config['background_layer_speeds'][:layers]
+        config['background_layer_speeds'] = speeds + [[config['min_sequence_speed'], config['max_sequence_speed']]
+                                                      for _ in range(layers - len(speeds))]
+    if config['background_layer_densities']:
+        densities = config['background_layer_densities'][:layers]
+        config['background_layer_densities'] = densities + [1] * (layers - len(densities))
+
+    text += f"\nEnter the chance for a sequence to become part of the background(previous: {config['background_chance']}): "
+    while True:
+        try:
+            background_chance = float((yield text))
+        except ValueError:
+            text = 'Background chance has to be a number.'
+            continue
+        if not 0 <= background_chance <= 1:
+            text = 'Background chance has to be from 0 to 1.'
+            continue
+        config['background_chance'] = background_chance
+        return True
+
+
+# ______________________set_chars_flow______________________
+def set_chars_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that adds characters to the character set or replaces it.
+
+    Args:
+        config (dict): Configuration dictionary containing the characters.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    text = "Enter the characters you want to use (keep it empty and add them if you don't want to change anything)"
+    while True:
+        chars = yield text
+        if len(chars) > 100:
+            text = "The maximum amount of characters is 100.\n\n" + text
+            continue
+        while True:
+            add = (yield '\nadd/a = add the chosen characters to the current character set\nreplace/r = use only chosen characters').lower().strip()
+            if add in ["a", "add", "r", "replace"]:
+                break
+        if add in ["a", "add"]:
+            if len(chars + config["characters"]) > 100:
+                text = 'The combined number of characters would exceed 100.\n\n' + text
+                continue
+            config["characters"] += chars
+        elif add == 'r':
+            config["characters"] = chars if chars else ' '
+        return False
+
+
+# ______________________sequence_speed_flow______________________
+def sequence_speed_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that asks for a new min and max sequence speed.
+
+    Args:
+        config (dict): Configuration dictionary containing the sequence speeds.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    text = 'You have chosen to change individual sequence speeds (rows per frame, or per simulation_step in time based simulation).\n'
+    text += "It is recommended not to go over 1\n"
+    while True:
+        try:
+            min_speed = float((yield f'{text}\nNew min speed for sequences (previous: {config["min_sequence_speed"]}):'))
+            max_speed = float((yield f'\nNew max speed for sequences (previous: {config["max_sequence_speed"]}):'))
+        except ValueError:
+            text = 'Min and max speed have to be numbers.\n'
+            continue
+
+        if min_speed > max_speed:
+            text = "Min speed can't be more than max speed.\n"
+        elif min_speed <= 0 or max_speed <= 0:
+            text = "Min and max speed have to be greater than 0.\n"
+        else:
+            break
+
+    config["min_sequence_speed"] = min_speed
+    config["max_sequence_speed"] = max_speed
+    return False
+
+
+# ______________________sequence_length_flow______________________
+def sequence_length_flow(config: dict[str, Any]) -> Flow:
+    """
+    Flow that asks for a new min and max sequence length.
+
+    Args:
+        config (dict): Configuration dictionary containing the sequence lengths.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    text = 'You have chosen to change individual sequence lengths\n'
+    while True:
+        try:
+            min_length = int((yield f'{text}\nNew min length for sequences (previous: {config["min_sequence_length"]}):'))
+            max_length = int((yield f'\nNew max length for sequences (previous: {config["max_sequence_length"]}):'))
+        except ValueError:
+            text = 'Min and max length have to be whole numbers.\n'
+            continue
+
+        if min_length > max_length:
+            text = "Min length can't be more than max length.\n"
+        elif min_length <= 0 or max_length <= 0:
+            text = "Min and max length have to be greater than 0.\n"
+        elif max_length > 40:
+            text = "Max length can't exceed 40.\n"
+        else:
+            break
+
+    config["min_sequence_length"] = min_length
+    config["max_sequence_length"] = max_length
+    return False
+
+
 # ______________________check_keys______________________
-def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[float], columns: list[list[dict[str, Any]]], config: dict[str, Any], change_controls: Callable):
+def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[float], columns: list[list[dict[str, Any]]], config: dict[str, Any], change_controls: Callable,
+               prompt_panel: dict[str, Any] | None = None):
     """
     Process keyboard input and update configuration and sequences accordingly.
 
@@ -320,7 +1485,9 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
         count (list): List of timestamp counters for debouncing key presses.
         columns (list): List of columns containing sequences.
         config (dict): Configuration dictionary with various settings.
-        change_controls (callable): Function to change control key mappings. (requires "config" as a parameter)
+        change_controls (callable): Function that returns a flow to change control key mappings. (requires "config" as a parameter)
+        prompt_panel (dict, optional): Panel (see modules/prompt_panel.py) that runs the flows of the controls that
+                                       ask something (save, load, create color...). Without it these controls are ignored.
 
     Returns:
         tuple: A tuple (count, columns, clear, update_colors) where:
@@ -329,6 +1496,8 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
                - clear (bool): Flag indicating if the screen should be cleared.
                - update_colors (bool): Flag indicating if color updates are required.
     """
+    if prompt_panel is None:
+        prompt_panel = make_prompt_panel()  # nothing will show the flows
     cur_time = time.time()
     time_passed = [cur_time - t for t in count]
     time_used = 0
@@ -338,27 +1507,29 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
     if keys_are_pressed(currently_pressed, lock, config, ['ctrl', 'c']):
         raise KeyboardInterrupt
 
+    # the limits of the changed values are checked by validate_setting() (see modules/settings.py)
     # more speed:
-    if time_passed[time_used] > 0.08 and config['time_between_frames'] > 0.001 and keys_are_pressed(currently_pressed, lock, config, config['controls']['speed_up']):
+    if time_passed[time_used] > 0.08 and keys_are_pressed(currently_pressed, lock, config, config['controls']['speed_up']):
         count[time_used] = cur_time
-        config["time_between_frames"] /= 1.03
+        if config['time_based_simulation']:  # time_between_frames only sets how often the rain is drawn
+            config["simulation_speed"] = validate_setting("simulation_speed", config["simulation_speed"] * 1.03)
+        else:
+            config["time_between_frames"] = validate_setting("time_between_frames", config["time_between_frames"] / 1.03)
     time_used += 1
 
     # less speed
     if time_passed[time_used] > 0.08 and keys_are_pressed(currently_pressed, lock, config, config['controls']['slow_down']):
         count[time_used] = cur_time
-        config["time_between_frames"] *= 1.03
+        if config['time_based_simulation']:
+            config["simulation_speed"] = validate_setting("simulation_speed", config["simulation_speed"] / 1.03)
+        else:
+            config["time_between_frames"] = validate_setting("time_between_frames", config["time_between_frames"] * 1.03)
     time_used += 1
 
-    # pause:
+    # pause (the waiting is done by wait_while_paused):
     if time_passed[time_used] > 0.3 and keys_are_pressed(currently_pressed, lock, config, config['controls']['pause']):
-        while keys_are_pressed(currently_pressed, lock, config, config['controls']['pause']):
-            time.sleep(0.01)
-        while True:
-            time.sleep(0.01)
-            if keys_are_pressed(currently_pressed, lock, config, config['controls']['pause']):
-                count[time_used] = time.time()
-                break
+        count[time_used] = cur_time
+        config['paused'] = True
     time_used += 1
 
     # mode:
@@ -391,43 +1562,43 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
     time_used += 1
 
     # less rows:
-    if time_passed[time_used] > 0.09 and config["amount_of_rows"] > 0 and keys_are_pressed(currently_pressed, lock, config, config['controls']['less_rows']):
+    if time_passed[time_used] > 0.09 and keys_are_pressed(currently_pressed, lock, config, config['controls']['less_rows']):
         count[time_used] = cur_time
-        config["amount_of_rows"] -= 1
+        config["amount_of_rows"] = validate_setting("amount_of_rows", config["amount_of_rows"] - 1)
         clear = True
     time_used += 1
 
     # more rows
-    if time_passed[time_used] > 0.09 and config["amount_of_rows"] < 100 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_rows']):
+    if time_passed[time_used] > 0.09 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_rows']):
         count[time_used] = cur_time
-        config["amount_of_rows"] += 1
+        config["amount_of_rows"] = validate_setting("amount_of_rows", config["amount_of_rows"] + 1)
         clear = True
     time_used += 1
 
     # less columns:
-    if time_passed[time_used] > 0.05 and config["amount_of_columns"] > 0 and keys_are_pressed(currently_pressed, lock, config, config['controls']['less_columns']):
+    if time_passed[time_used] > 0.05 and keys_are_pressed(currently_pressed, lock, config, config['controls']['less_columns']):
         count[time_used] = cur_time
-        config["amount_of_columns"] -= 1
+        config["amount_of_columns"] = validate_setting("amount_of_columns", config["amount_of_columns"] - 1)
         clear = True
     time_used += 1
 
     # more columns:
-    if time_passed[time_used] > 0.05 and config["amount_of_columns"] < 220 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_columns']):
+    if time_passed[time_used] > 0.05 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_columns']):
         count[time_used] = cur_time
-        config["amount_of_columns"] += 1
+        config["amount_of_columns"] = validate_setting("amount_of_columns", config["amount_of_columns"] + 1)
         clear = True
     time_used += 1
 
     # less sequence chance:
     if time_passed[time_used] > 0.1 and keys_are_pressed(currently_pressed, lock, config, config['controls']['less_new_sequence_chance']):
         count[time_used] = cur_time
-        config["new_sequence_chance"] /= 1.045
+        config["new_sequence_chance"] = validate_setting("new_sequence_chance", config["new_sequence_chance"] / 1.045)
     time_used += 1
 
     # more sequence chance:
-    if time_passed[time_used] > 0.1 and config["new_sequence_chance"] <= 1 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_new_sequence_chance']):
+    if time_passed[time_used] > 0.1 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_new_sequence_chance']):
         count[time_used] = cur_time
-        config["new_sequence_chance"] *= 1.045
+        config["new_sequence_chance"] = validate_setting("new_sequence_chance", config["new_sequence_chance"] * 1.045)
     time_used += 1
 
     # less random char change:
@@ -436,119 +1607,29 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
         config["random_char_change_chance"] /= 1.05
         if config["random_char_change_chance"] < 0.005:
             config["random_char_change_chance"] = 0
-        time_used += 1
+    time_used += 1
 
     # more random char change
-    if time_passed[time_used] > 0.15 and config["random_char_change_chance"] <= 1 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_random_char']):
+    if time_passed[time_used] > 0.15 and keys_are_pressed(currently_pressed, lock, config, config['controls']['more_random_char']):
         count[time_used] = cur_time
         if config["random_char_change_chance"] == 0:
             config["random_char_change_chance"] = 0.005
-        config["random_char_change_chance"] *= 1.05
+        config["random_char_change_chance"] = validate_setting("random_char_change_chance", config["random_char_change_chance"] * 1.05)
     time_used += 1
 
-    # save:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['save_config']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        save_to_new = False
-        update = False
-        if not config['folder_is_valid']:
-            print(f'''\nThe folder "{config['dir_name']}" isn't valid.''')
-            print("You won't be able to save your config")
-            input('Press enter to continue...')
-            hide_or_show_cursor(hide=True)
-        else:
-            print("\nYou have chosen to save your current config.\n")
-            print('new/n = save to a new file')
-            print(f'update/u = update "{config['file_name']}"')
-            print('exit/e = leave without saving your config')
-
-            while True:
-                command = input('> ').lower().strip()
-
-                if command in ['exit', 'e']:
-                    break
-                elif command in ['new', 'n']:
-                    save_to_new = True
-                    break
-                elif command in ['update', 'u']:
-                    if not config['file_is_valid']:
-                        print(f"\nThe file you have entered ({config['file_name']}) isn't valid.")
-                        print('Please save to a new file or exit.')
-                        continue
-                    update = True
-                    break
-                else:
-                    print('Please enter one of the given commands: new/e, update/u, exit/e')
-
-            hide_or_show_cursor(hide=True)
+    # profile (run_matrix starts the capture):
+    if time_passed[time_used] > 0.3 and keys_are_pressed(currently_pressed, lock, config, config['controls']['profile']):
+        count[time_used] = cur_time
+        config['profile_request'] = config['profile_frames']
+    time_used += 1
 
-            if save_to_new:
-                save_config(config, update=False)
-            elif update:
-                save_config(config, update=True)
-        clear = True
+    # save:
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['save_config']):
+        start_flow(prompt_panel, save_flow(config))
 
     # load:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['load_config']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-
-        if not config['folder_is_valid']:
-            print(f'''\nThe folder "{config['dir_name']}" isn't valid.''')
-            print("You won't be able to load your config from any file")
-            input('Press enter to continue...')
-            hide_or_show_cursor(hide=True)
-        else:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            config_dir = os.path.join(script_dir, config['dir_name'])
-            os.makedirs(config_dir, exist_ok=True)
-            file_names = [f for f in os.listdir(config_dir) if os.path.isfile(os.path.join(config_dir, f))]
-            print("\nYou have chosen to load a config from a file\n")
-            print('show/s = show all available files')
-            print('exit/e = keep current config')
-            print('Enter the name of the file you want to load your config from.')
-            while True:
-                load_file = input('> ').strip()
-
-                if load_file.lower() in ['exit', 'e']:
-                    break
-
-                if load_file.lower() in ['show', 's']:
-                    if len(file_names) == 0:
-                        print('No files have been found.\n')
-                        continue
-
-                    print('\nFiles:')
-
-                    line = file_names[0]
-                    i = 2
-                    for file_name in file_names[1:]:
-                        if i <= 3:
-                            line += ', ' + file_name
-                        else:
-                            i = 1
-                            print(line + ',')
-                            line = file_name
-                        i += 1
-                    print(line + '\n')
-                    continue
-
-                if not load_file.endswith('.json'):
-                    load_file += '.json'
-
-                if load_file not in file_names:
-                    print("File wasn't found.\n")
-                else:
-                    new_config = get_config(file_name=load_file, dir_name=config['dir_name'])
-                    for key in config:
-                        config[key] = new_config[key]
-                    break
-        hide_or_show_cursor(hide=True)
-        clear = True
-        update_colors = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['load_config']):
+        start_flow(prompt_panel, load_flow(config))
 
     # first bold:
     if keys_are_pressed(currently_pressed, lock, config, config['controls']['first_bold']):
@@ -619,198 +1700,17 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
                             "\u001b[38;2;0;144;144m",
                             "\u001b[38;2;0;112;112m",
                             "\u001b[38;2;0;80;80m",
-                            "\u001b[38;2;0;48;48m",
-                            "\u001b[38;2;0;24;24m")
-        update_colors = True
-
-    # create color:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['create_color']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        print("\nYou have chosen to create a new color or use your created colors.")
-        print('\nnew/n = create a new color')
-        print('use/u = use a previously created color')
-        print('delete/d = delete a previous created color')
-        print('exit/e = leave without doing anything\n')
-
-        while True:
-            command = input('> ').strip().lower()
-            print()
-
-            if command in ['new', 'n', 'use', 'u', 'delete', 'd', 'exit', 'e']:
-                break
-            else:
-                print("Please enter a valid command")
-
-        if command in ['new', 'n'] and command not in ['exit', 'e']:
-            if len(config['custom_colors']) >= 10:
-                print('You can only create 10 custom colors.')
-                input('Press enter to continue...')
-            else:
-                print('show/s = show current color names')
-                while True:
-                    print("\nEnter a name for your color:")
-                    name = input('> ').strip()
-
-                    if name.lower() in ['show', 's']:
-                        print('\nNames:')
-                        print(', '.join(config['custom_colors'].keys()))
-                        continue
-                    if name:
-                        if name in config['custom_colors']:
-                            print('Name is already in use.')
-                        elif len(name) >= 30:
-                            print("Name is too long")
-                        else:
-                            break
-
-                print("\nTo create a new list of colors you will enter each colors' RGB values like this: R, G, B.")
-                print('exit/e = leave when you are done creating individual colors')
-                i = 1
-                colors: list[str] = []
-                make_color = True
-                while True:
-                    print(f'\nColor {i}:')
-                    user_input = input('> ').replace(' ', '').lower()
-
-                    if user_input in ['e', 'exit']:
-                        if len(colors) == 0:
-                            make_color = False
-                        if len(colors) == 1:  # if color length were 1, it would cause indexing issues in some places
-                            colors.append(colors[0])
-                        break
-
-                    rgb = user_input.split(',')
-                    if len(rgb) != 3:
-                        print("Please enter 3 values: R, G, B (for example: 150, 255, 0)")
-                        continue
-                    go_back = False
-
-                    try:
-                        for value in rgb:
-                            value = float(value)
-                            if not 0 <= value <= 255:
-                                print('Values have to range from 0 to 255')
-                                go_back = True
-                                break
-                    except ValueError:
-                        print("RGB values have to be numbers")
-                        continue
-                    if go_back:
-                        continue
-
-                    r, g, b = rgb
-                    colors.append(f"\u001b[38;2;{r};{g};{b}m")
-                    i += 1
-
-                    if i > 12:
-                        print("Maximum number of colors reached (12).")
-                        break
-                if make_color:
-                    config['custom_colors'][name] = tuple(colors)
-                    print('Color has been added successfully.')
-                    input('Press enter to continue...')
-
-        elif command in ['delete', 'd'] and command not in ['exit', 'e']:
-            print('show/s = show current color names')
-            print('exit/e = leave without deleting a color')
-            while True:
-                print("\nEnter the name of the color you want to delete:")
-                name = input('> ').strip()
-
-                if name.lower() in ['exit', 'e']:
-                    break
-                if name.lower() in ['show', 's']:
-                    print('\nNames:')
-                    print(', '.join(config['custom_colors'].keys()))
-                    continue
-                if name in config['custom_colors']:
-                    config['custom_colors'].pop(name)
-                    print('Color has been deleted successfully.')
-                    input('Press enter to continue...')
-                    break
-                else:
-                    print("Color wasn't found")
-
-        elif command in ['use', 'u'] and command not in ['exit', 'e']:
-            print('show/s = show current color names')
-            print('exit/e = keep current color')
-            while True:
-                print("\nEnter the name of the color you want to use:")
-                name = input('> ').strip()
-
-                if name.lower() in ['show', 's']:
-                    print('\nNames:')
-                    print(', '.join(config['custom_colors'].keys()))
-                    continue
-                if name.lower() in ['exit', 'e']:
-                    break
-                if name in config['custom_colors']:
-                    config['colors'] = config['custom_colors'][name]
-                    break
-                else:
-                    print("Color wasn't found")
-
-        update_colors = True
-        hide_or_show_cursor(hide=True)
-        clear = True
-
-    # background:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['change_background_brightness']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        old_values = config['background_brightness_reduction']
-        config['background_brightness_reduction'] = []
-
-        print('\nYou have chosen to change the background.\n')
-        print(f"Old background brightness multipliers: {', '.join([str(value) for value in old_values])}")
-        print('Enter the value for reduction in brightness for each background color from 0 to 1 (0.6 --> brightness will reduce to 60%)')
-        print("exit/e = if you dont't want to make any more backgrounds (if you haven't entered any new values, the old values will be kept)")
-        i = 1
-        while True:
-            print(f'\nBackground {i} reduction rate:')
-            reduction_rate = input('> ').strip().lower()
-            if reduction_rate in ['e', 'exit']:
-                if len(config['background_brightness_reduction']) != 0:
-                    break
-                else:
-                    config['background_brightness_reduction'] = old_values
-                    break
-
-            try:
-                reduction_rate = float(reduction_rate)
-            except ValueError:
-                print('Reduction rate has to be a number.')
-                continue
-
-            if not 0 < reduction_rate < 1:
-                print('Reduction rate has to be between 0 and 1.')
-                continue
-            config['background_brightness_reduction'].append(reduction_rate)
-            i += 1
-
-            if i > 3:
-                print("You have entered all 3 available background colors.")
-                break
-
-        while True:
-            print(f"\nEnter the chance for a sequence to become part of the background(previous: {config['background_chance']}): ")
-            try:
-                background_chance = float(input('> '))
-            except ValueError:
-                print('Background chance has to be a number.')
-                continue
-            if not 0 <= background_chance <= 1:
-                print('Background chance has to be from 0 to 1.')
-                continue
-            config['background_chance'] = background_chance
-            break
-
-        hide_or_show_cursor(hide=True)
+                            "\u001b[38;2;0;48;48m",
+                            "\u001b[38;2;0;24;24m")
         update_colors = True
-        clear = True
+
+    # create color:
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['create_color']):
+        start_flow(prompt_panel, create_color_flow(config))
+
+    # background:
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['change_background_brightness']):
+        start_flow(prompt_panel, background_flow(config))
 
     # chars 01
     if keys_are_pressed(currently_pressed, lock, config, config['controls']['chars_01']):
@@ -821,189 +1721,28 @@ def check_keys(currently_pressed: set[str], lock: threading.Lock, count: list[fl
         config["characters"] = "ﾊﾐﾋｰｳｼﾅﾓﾆｻﾜﾂｵﾘｱﾎﾃﾏｹﾒｴｶｷﾑﾕﾗｾﾈｽﾀﾇﾍｦｲｸｺｿﾁﾄﾉﾌﾤﾨﾛﾝ012345789:.=*+-<>"
 
     # chars any
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['set_any_chars']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        while True:
-            print("\nEnter the characters you want to use (keep it empty and add them if you don't want to change anything)")
-            chars = input('> ')
-            if len(chars) > 100:
-                print("The maximum amount of characters is 100.")
-                continue
-            while True:
-                print('\nadd/a = add the chosen characters to the current character set')
-                print('replace/r = use only chosen characters')
-                add = input('> ').lower().strip()
-                if add in ["a", "add", "r", "replace"]:
-                    break
-            if add in ["a", "add"]:
-                if len(chars + config["characters"]) > 100:
-                    print('The combined number of characters would exceed 100.')
-                    continue
-                config["characters"] += chars
-            elif add == 'r':
-                config["characters"] = chars if chars else ' '
-            break
-
-        hide_or_show_cursor(hide=True)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['set_any_chars']):
+        start_flow(prompt_panel, set_chars_flow(config))
 
     # sequence speed:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['change_speed_diff']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        print('\nYou have chosen to change individual sequence speeds.')
-        print("It is recommended not to go over 1")
-        while True:
-            try:
-                print(f'\nNew min speed for sequences (previous: {config["min_sequence_speed"]}):')
-                min_speed = float(input('> '))
-                print(f'\nNew max speed for sequences (previous: {config["max_sequence_speed"]}):')
-                max_speed = float(input('> '))
-            except ValueError:
-                print('Min and max speed have to be numbers.')
-                continue
-
-            if min_speed > max_speed:
-                print("Min speed can't be more than max speed.")
-            elif min_speed <= 0 or max_speed <= 0:
-                print("Min and max speed have to be greater than 0.")
-            else:
-                break
-
-        config["min_sequence_speed"] = min_speed
-        config["max_sequence_speed"] = max_speed
-        hide_or_show_cursor(hide=True)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['change_speed_diff']):
+        start_flow(prompt_panel, sequence_speed_flow(config))
 
     # sequence length:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['change_seq_length']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        print('\nYou have chosen to change individual sequence lengths')
-        while True:
-            try:
-                print(f'\nNew min length for sequences (previous: {config["min_sequence_length"]}):')
-                min_length = int(input('> '))
-                print(f'\nNew max length for sequences (previous: {config["max_sequence_length"]}):')
-                max_length = int(input('> '))
-            except ValueError:
-                print('Min and max length have to be whole numbers.')
-                continue
-
-            if min_length > max_length:
-                print("Min length can't be more than max length.")
-            elif min_length <= 0 or max_length <= 0:
-                print("Min and max length have to be greater than 0.")
-            elif max_length > 40:
-                print("Max length can't exceed 40.")
-            else:
-                break
-
-        config["min_sequence_length"] = min_length
-        config["max_sequence_length"] = max_length
-        hide_or_show_cursor(hide=True)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['change_seq_length']):
+        start_flow(prompt_panel, sequence_length_flow(config))
 
     # change controls
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['change_controls']):
-        change_controls(config)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['change_controls']):
+        start_flow(prompt_panel, change_controls(config))
 
     # print values:
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['cur_values']):
-        flush_stdin()
-        hide_or_show_cursor(show=True)
-        print(f'''
-new_sequence_chance = {round(config["new_sequence_chance"], 4)} (Chance for a new sequence to start if there is space; range: 0 to 1)
-random_char_change_chance = {round(config["random_char_change_chance"], 4)} (Chance for characters to change mid-sequence)
-
-time_between_frames = {round(config["time_between_frames"], 4)} (Delay between frame updates) --> FPS = {round(1/config["time_between_frames"], 1)}
-
-min_sequence_speed = {round(config["min_sequence_speed"], 4)} (1/sequence_speed = frames to move the sequence)
-max_sequence_speed = {round(config["max_sequence_speed"], 4)} (range(speed): MIN_SEQUENCE_SPEED to MAX_SEQUENCE_SPEED)
-
-min_sequence_length = {config["min_sequence_length"]}
-max_sequence_length = {config["max_sequence_length"]}
-
-AMOUNT_OF_COLUMNS = {config["amount_of_columns"]}
-AMOUNT_OF_ROWS = {config["amount_of_rows"]}
-
-mode = {config["mode"]} (Toggle for sequence update behavior)
-auto_size = {config["auto_size"]} (Toggle for automatic resizing of columns and rows)
-space_between_columns = {config['space_between_columns']}
-visibility_priority = {config['visibility_priority']}
-
-background_brightness_reduction = {config['background_brightness_reduction']}
-characters = {config["characters"]}
-colors = {config["colors"]}
-background_colors = {config["background_colors"]}
-''')
-        input('Press enter to continue...')
-        hide_or_show_cursor(hide=True)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['cur_values']):
+        start_flow(prompt_panel, message_flow(get_current_values_text(config)))
 
     # print help
-    if keys_are_pressed(currently_pressed, lock, config, config['controls']['show_help_message']):
-        flush_stdin()
-        print()
-        hide_or_show_cursor(show=True)
-        print(f'''Controls:
-
-    {', '.join(config['controls']['show_help_message'])} = show help message
-    {', '.join(config['controls']['cur_values'])} = display current values
-
-    {', '.join(config['controls']['speed_up'])} = speed up (relative to current speed)
-    {', '.join(config['controls']['slow_down'])} = slow down (relative to current speed)
-
-    {', '.join(config['controls']['change_speed_diff'])} = make some sequences move slower or faster (for example once every 3 frames)
-    {', '.join(config['controls']['change_seq_length'])} = set a new min and max length for sequences
-
-    {', '.join(config['controls']['pause'])} = (un)pause
-    {', '.join(config['controls']['mode_char'])} = toggles if the first letter of a sequence is random and the rest follow or if the sequence remains unchanged
-    {', '.join(config['controls']['auto_size_char'])} = adjusts matrix length and width based on the terminal's size
-    {', '.join(config['controls']['make_space_between_columns'])} = create a space in between all columns
-    {', '.join(config['controls']['change_visibility_priority'])} = changes priority of displaying sequences on the same row if the sequences have the same brightness
-
-    {', '.join(config['controls']['more_random_char'])} = increase chance for characters to change mid-sequence
-    {', '.join(config['controls']['less_random_char'])} = decrease chance for characters to change mid-sequence
-
-    {', '.join(config['controls']['less_rows'])} = shorten matrix length (rows)
-    {', '.join(config['controls']['more_rows'])} = increase matrix length (rows)
-    {', '.join(config['controls']['less_columns'])} = reduce number of columns
-    {', '.join(config['controls']['more_columns'])} = increase number of columns
-
-    {', '.join(config['controls']['more_new_sequence_chance'])} = increase the chance of a new sequence starting (relative to current chance)
-    {', '.join(config['controls']['less_new_sequence_chance'])} = decrease the chance of a new sequence starting (relative to current chance)
-
-    {', '.join(config['controls']['first_bold'])} = make the first character bold
-    {', '.join(config['controls']['first_white'])} = make first character white
-    {', '.join(config['controls']['first_bright'])} = make first character white but in the shade of the other colors (doesn't work for custom colors)
-    {', '.join(config['controls']['blue'])} = change color to blue
-    {', '.join(config['controls']['green'])} = change color to green
-    {', '.join(config['controls']['red'])} = change color to red
-    {', '.join(config['controls']['create_color'])} = create a new color or use your created colors
-    {', '.join(config['controls']['change_background_brightness'])} = create a background by making some sequences less bright
-
-    {', '.join(config['controls']['chars_01'])} = change characters to "01"
-    {', '.join(config['controls']['chars_default'])} = reset characters to default set
-    {', '.join(config['controls']['set_any_chars'])} = prompt for input to add or replace characters
-
-    {', '.join(config['controls']['save_config'])} = save current values and controls (rows, color...)
-    {', '.join(config['controls']['load_config'])} = load values and controls from a file
-
-    {', '.join(config['controls']['change_controls'])} = change your controls
-    {', '.join(config['controls']['disable_controls'])} = disable keyboard controls temporarily
-    {', '.join(config['controls']['enable_controls'])} = re-enable keyboard controls
-
-    ctrl+c = stop matrix rain
-''')
-        input('Press enter to continue...')
-        hide_or_show_cursor(hide=True)
-        clear = True
+    if config['interactive'] and keys_are_pressed(currently_pressed, lock, config, config['controls']['show_help_message']):
+        start_flow(prompt_panel, message_flow(get_help_text(config)))
 
     # remove controls:
     if keys_are_pressed(currently_pressed, lock, config, config['controls']['disable_controls']):
@@ -1013,7 +1752,7 @@ background_colors = {config["background_colors"]}
 
 
 # ______________________clear_if_necessary______________________
-def clear_if_necessary(clear: bool, config: dict[str, Any], terminal_size=None, old_terminal_size=None) -> None:
+def clear_if_necessary(clear: bool, config: dict[str, Any], terminal_size=None, old_terminal_size=None) -> bool:
     """
     Clear the terminal screen if conditions indicate that a refresh is needed.
 
@@ -1027,10 +1766,10 @@ def clear_if_necessary(clear: bool, config: dict[str, Any], terminal_size=None,
         old_terminal_size (os.terminal_size, optional): Previous terminal size.
 
     Returns:
-        None
+        bool: True if the screen was cleared.
     """
     if not (terminal_size and old_terminal_size):
-        return
+        return False
 
     if old_terminal_size != terminal_size:
         clear = True
@@ -1043,6 +1782,7 @@ def clear_if_necessary(clear: bool, config: dict[str, Any], terminal_size=None,
 
     if clear:
         os.system('cls' if os.name == 'nt' else 'clear')
+    return clear
 
 
 # ______________________adjust_size______________________
@@ -1066,89 +1806,206 @@ def adjust_size(config: dict[str, Any], terminal_size=None) -> None:
         config["amount_of_columns"] = terminal_size.columns
 
 
+# ______________________normalize_config______________________
+def normalize_config(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert the values of a configuration loaded from JSON to the types used while running.
+
+    Colors become tuples (so they can be used as dictionary keys) and controls become lists of keys.
+    The settings are checked with validate_config() (see modules/settings.py).
+
+    Args:
+        config (dict): Configuration loaded from a JSON file.
+
+    Returns:
+        dict: The same configuration dictionary.
+
+    Raises:
+        ValueError: If a setting has the wrong type or isn't one of the allowed values.
+    """
+    validate_config(config)
+    config['colors'] = tuple(config['colors'])
+    config['custom_colors'] = {key: tuple(value) for key, value in config['custom_colors'].items()}
+
+    for control in config['controls'].copy():
+        try:
+            config['controls'][control] = config['controls'][control].split(' ')
+        except AttributeError:
+            pass
+    for control, keys in ADDED_CONTROLS.items():
+        config['controls'].setdefault(control, keys.split(' '))
+    return config
+
+
+# ______________________reload_config______________________
+def reload_config(config: dict[str, Any], columns: list[list[dict[str, Any]]], file_path: str) -> tuple[bool, bool]:
+    """
+    Apply the settings of a changed configuration file to the running configuration.
+
+    Only settings that differ are changed and the columns are kept, so the rain continues as it was.
+    If the file can't be read (for example because it is still being written), nothing is changed.
+    If the file has auto_size turned on, its amount_of_rows and amount_of_columns are ignored, since they
+    never match the size made for the terminal.
+
+    Args:
+        config (dict): Configuration dictionary that is being used.
+        columns (list): List of columns (reversed in place if visibility_priority changed).
+        file_path (str): Path of the configuration file.
+
+    Returns:
+        tuple: A tuple (clear, update_colors) where:
+               - clear (bool): Flag indicating if the screen should be cleared.
+               - update_colors (bool): Flag indicating if color updates are required.
+    """
+    try:
+        with open(file_path, 'r', encoding="utf-8") as file:
+            new_config = normalize_config(json.load(file))
+    except (OSError, ValueError, KeyError, AttributeError, TypeError):
+        return False, False
+    for key, value in ADDED_SETTINGS.items():
+        new_config.setdefault(key, copy.deepcopy(value))
+
+    clear = False
+    update_colors = False
+    for key, value in new_config.items():
+        if key not in config or config[key] == value or (new_config['auto_size'] and key in SIZE_SETTINGS):
+            continue
+        if key == 'visibility_priority':
+            for i in range(len(columns)):
+                columns[i] = columns[i][::-1]
+        config[key] = value
+        if key in COLOR_SETTINGS:
+            update_colors = True
+        elif key in LAYOUT_SETTINGS:
+            clear = True
+    return clear, update_colors
+
+
+# ______________________add_runtime_values______________________
+def add_runtime_values(config: dict[str, Any], file_name: str, dir_name: str, interactive: bool) -> dict[str, Any]:
+    """
+    Add the values to a configuration loaded from a file that are only used while the program is running.
+
+    Settings from ADDED_SETTINGS that the file doesn't have are added as well.
+
+    Args:
+        config (dict): Configuration loaded from a file.
+        file_name (str): Name of the configuration file.
+        dir_name (str): Name of the directory of the configuration file.
+        interactive (bool): If False, never wait for the user to type anything.
+
+    Returns:
+        dict: The same configuration dictionary.
+    """
+    for key, value in ADDED_SETTINGS.items():
+        config.setdefault(key, copy.deepcopy(value))
+    config["extended_color_cache"] = make_color_cache(config['color_cache_size'])
+    config['governor'] = make_governor()
+    config['file_is_valid'] = True
+    config['folder_is_valid'] = True
+    config['file_name'] = file_name
+    config['dir_name'] = dir_name
+    config['interactive'] = interactive
+    config['startup_time'] = None
+    config['palettes'] = ()
+    config['palette_ids'] = ()
+    config['palette_brightness'] = ()
+    config['palette_gradients'] = []
+    config['paused'] = False
+    config['profile_request'] = 0
+    config['settings_cache'] = {}
+    config['sequence_pool'] = make_sequence_pool()
+    return config
+
+
 # ______________________get_config______________________
-def get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME) -> dict[str, Any]:
+def get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME, interactive=True,
+               messages: list[str] | None = None) -> dict[str, Any]:
     """
     Load the configuration from a JSON file, or return the default configuration if the file is not found.
 
     The function validates the folder and file names if the pathvalidate module is available.
     If the file is found and valid, its contents are loaded and merged into the configuration; otherwise,
-    default configuration settings are used.
+    default configuration settings are used. Loaded files are cached in their normalized form (see
+    modules/config_cache.py), so as long as a file doesn't change the next start skips parsing and checking its
+    settings (the folder and file names are always validated first).
 
     Args:
         file_name (str): Name of the configuration file (without path).
         dir_name (str): Name of the directory where configuration files are stored.
+        interactive (bool): If False, never wait for the user to press enter (and disable controls that need typing).
+        messages (list, optional): If given, the messages are added to it instead of being printed and the cursor
+                                   isn't changed (for loading a config while the rain is running).
 
     Returns:
         dict: A configuration dictionary with settings for the Matrix rain animation.
     """
-    hide_or_show_cursor(show=True)
+    def report(*lines: str, uses_defaults: bool = False) -> None:
+        if messages is not None:
+            messages.append('\n'.join(lines))
+            return
+        for line in lines:
+            print(line)
+        if uses_defaults:
+            print('The default values will be used instead.')
+        if interactive:
+            input('Press enter to continue...')
+
+    if messages is None:
+        hide_or_show_cursor(show=True)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if file_name and not file_name.endswith(".json"):
+        file_name += ".json"
+
     if PATHVALIDATE_AVAILABLE:
         try:
             pathvalidate.validate_filename(filename=dir_name)
             folder_is_valid = True
         except pathvalidate.ValidationError as e:
             folder_is_valid = False
-            print(f'''\nThe folder "{dir_name}" isn't valid. Reason:''')
-            print(f"{e}\n")
-            print('The default values will be used instead.')
-            input('Press enter to continue...')
+            report(f'''\nThe folder "{dir_name}" isn't valid. Reason:''', f"{e}\n", uses_defaults=True)
     else:
-        print("pathvalidate not installed; skipping folder validation.")
-        input('Press enter to continue...')
+        report("pathvalidate not installed; skipping folder validation.")
         folder_is_valid = True
 
     if file_name and folder_is_valid:
-        if not file_name.endswith(".json"):
-            file_name += ".json"
-
         if PATHVALIDATE_AVAILABLE:
             try:
                 pathvalidate.validate_filename(filename=file_name)
                 file_is_valid = True
             except pathvalidate.ValidationError as e:
-                print("The file you have chosen isn't valid.")
-                print(f"{e}\n")
-                print('The default values will be used instead.')
-                input('Press enter to continue...')
-                file_is_valid = True
+                report("The file you have chosen isn't valid.", f"{e}\n", uses_defaults=True)
+                file_is_valid = False
         else:
-            print("pathvalidate not installed; skipping file validation.")
-            input('Press enter to continue...')
+            report("pathvalidate not installed; skipping file validation.")
             file_is_valid = True
 
         if file_is_valid:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
             config_dir = os.path.join(script_dir, dir_name)
             os.makedirs(config_dir, exist_ok=True)  # make the folder if it doesn't exist
             file_path = os.path.join(config_dir, file_name)
 
+            # only files that were valid are cached, so their settings don't have to be checked again
+            config = load_cached_config(file_path)
+            if config is not None:
+                if messages is None:
+                    hide_or_show_cursor(hide=True)
+                return add_runtime_values(config, file_name, dir_name, interactive)
+
             try:
                 with open(file_path, 'r', encoding="utf-8") as file:
-                    config: dict[str, Any] = json.load(file)
-                    config["extended_color_cache"] = collections.OrderedDict()
-                    config['file_is_valid'] = True
-                    config['folder_is_valid'] = folder_is_valid
-                    config['file_name'] = file_name
-                    config['dir_name'] = dir_name
-                    config['background_colors'] = {}
-                    config['colors'] = tuple(config['colors'])
-                    config['custom_colors'] = {key: tuple(value) for key, value in config['custom_colors'].items()}
-
-                    for control in config['controls'].copy():
-                        try:
-                            config['controls'][control] = config['controls'][control].split(' ')
-                        except AttributeError:
-                            pass
-
-                    hide_or_show_cursor(hide=True)
-                    return config
+                    config: dict[str, Any] = normalize_config(json.load(file))
+                    save_cached_config(file_path, config)
+                    if messages is None:
+                        hide_or_show_cursor(hide=True)
+                    return add_runtime_values(config, file_name, dir_name, interactive)
 
             except FileNotFoundError:
-                print(f'''The file "{file_name}" wasn't found.''')
-                print('The default values will be used instead.')
-                input('Press enter to continue...')
-            hide_or_show_cursor(hide=True)
+                report(f'''The file "{file_name}" wasn't found.''', uses_defaults=True)
+            except ValueError as e:
+                report(f'''The file "{file_name}" isn't valid: {e}''', uses_defaults=True)
+            if messages is None:
+                hide_or_show_cursor(hide=True)
 
     controls = {
         "speed_up": "f",
@@ -1186,7 +2043,8 @@ def get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME) -> dict[str, Any
         "load_config": "l shift",
         "disable_controls": "shift backspace",
         "enable_controls": "ctrl shift enter",
-        "check_if_pressed": "shift ctrl"
+        "check_if_pressed": "shift ctrl",
+        **ADDED_CONTROLS
     }
     for control in controls.copy():
         try:
@@ -1222,21 +2080,51 @@ def get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME) -> dict[str, Any
         ),
         "custom_colors": {},
         'background_brightness_reduction': [0.6],
-        'background_colors': {},
+        'palettes': (),
+        'palette_ids': (),
+        'palette_brightness': (),
+        'palette_gradients': [],
         'background_chance': 0.5,
-        "extended_color_cache": collections.OrderedDict(),
+        "extended_color_cache": make_color_cache(ADDED_SETTINGS['color_cache_size']),
+        'governor': make_governor(),
         'file_is_valid': False,
         'folder_is_valid': folder_is_valid,
         'file_name': file_name,
         'dir_name': dir_name,
-        "controls_activated": True
+        'interactive': interactive,
+        'startup_time': None,
+        'paused': False,
+        'profile_request': 0,
+        'settings_cache': {},
+        'sequence_pool': make_sequence_pool(),
+        "controls_activated": True,
+        **copy.deepcopy(ADDED_SETTINGS)
     }
 
 
 # ______________________save_config______________________
 def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
     """
-    Save the current configuration to a JSON file.
+    Save the current configuration to a JSON file, asking the questions of save_config_flow() with input().
+
+    Args:
+        config (dict): The configuration dictionary to save.
+        update (bool): Whether to update an existing configuration file (True) or create a new one (False).
+        dir_name (str, optional): The directory to save the configuration file in. If None, uses the directory
+                                  specified in the config.
+
+    Returns:
+        None
+    """
+    hide_or_show_cursor(show=True)
+    run_flow_blocking(save_config_flow(config, update, dir_name))
+    hide_or_show_cursor(hide=True)
+
+
+# ______________________save_config_flow______________________
+def save_config_flow(config: dict[str, Any], update=False, dir_name=None) -> Flow:
+    """
+    Flow that saves the current configuration to a JSON file.
 
     If `update` is True, the existing configuration file is overwritten; otherwise, a new file is created.
     The function performs validation on the folder and file names if possible, and excludes transient data
@@ -1249,7 +2137,7 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
                                   specified in the config.
 
     Returns:
-        None
+        bool: False (the colors don't need to be updated).
     """
     if dir_name is None:
         dir_name = config['dir_name']
@@ -1257,17 +2145,11 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
         try:
             pathvalidate.validate_filename(filename=dir_name)
         except pathvalidate.ValidationError as e:
-            print(f'''\nThe folder "{dir_name}" isn't valid. Reason:''')
-            print(f"{e}\n")
-            print("You won't be able to save your config")
-            input('Press enter to continue...')
-            hide_or_show_cursor(hide=True)
-            return
+            yield from message_flow(f'''The folder "{dir_name}" isn't valid. Reason:\n{e}\n\nYou won't be able to save your config''')
+            return False
     else:
-        print("pathvalidate not installed; skipping folder validation.")
-        input('Press enter to continue...')
+        yield from message_flow("pathvalidate not installed; skipping folder validation.")
 
-    hide_or_show_cursor(show=True)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_dir = os.path.join(script_dir, dir_name)
     os.makedirs(config_dir, exist_ok=True)
@@ -1279,12 +2161,8 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
             s_config[key] = config[key].copy()
         except AttributeError:
             s_config[key] = config[key]
-    s_config.pop('extended_color_cache', None)
-    s_config.pop('background_colors', None)
-    s_config.pop('file_name', None)
-    s_config.pop('dir_name', None)
-    s_config.pop('folder_is_valid', None)
-    s_config.pop('file_is_valid', None)
+    for key in RUNTIME_VALUES:
+        s_config.pop(key, None)
     for control in s_config['controls'].copy():
         try:
             s_config['controls'][control] = ' '.join(s_config['controls'][control])
@@ -1318,10 +2196,7 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
         file_name = f'config{new_number}.json'
 
         while True:
-            print(f'\nDo you want to save to "{file_name}"?')
-            print('yes/y = save to this file')
-            print('no/n = create a new name')
-            make_custom_name = input('> ').lower().strip()
+            make_custom_name = (yield f'\nDo you want to save to "{file_name}"?\nyes/y = save to this file\nno/n = create a new name').lower().strip()
 
             if make_custom_name in ['y', 'yes']:
                 make_custom_name = False
@@ -1331,9 +2206,10 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
                 break
 
         if make_custom_name:
+            text = '\nEnter the name you would like to use. '
             while True:
-                print('\nEnter the name you would like to use. ')
-                new_name = input('> ').strip()
+                new_name = (yield text).strip()
+                text = '\nEnter the name you would like to use. '
                 if not new_name.endswith(".json"):
                     new_name += ".json"
 
@@ -1341,18 +2217,15 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
                     try:
                         pathvalidate.validate_filename(filename=new_name)
                     except pathvalidate.ValidationError as e:
-                        print("The name you have entered isn't valid. Reason:")
-                        print(f"{e}\n")
+                        text = f"The name you have entered isn't valid. Reason:\n{e}\n" + text
                         continue
                 else:
-                    print("pathvalidate not installed; skipping file validation.")
-                    input('Press enter to continue...')
+                    yield from message_flow("pathvalidate not installed; skipping file validation.")
 
                 if new_name in file_names:
-                    print(f'\n{new_name} already exists.')
-                    print('You can save to this file but that will cause the current data on this file to be erased.')
-                    print('Do you want to save to this file anyway?')
-                    save_anyway = input('> ').lower().strip()
+                    save_anyway = (yield (f'\n{new_name} already exists.\n'
+                                          'You can save to this file but that will cause the current data on this file to be erased.\n'
+                                          'Do you want to save to this file anyway?')).lower().strip()
                     if save_anyway in ['y', 'yes']:
                         break
                 else:
@@ -1363,7 +2236,167 @@ def save_config(config: dict[str, Any], update=False, dir_name=None) -> None:
 
         with open(file_path, 'w', encoding="utf-8") as file:
             json.dump(s_config, file, indent=4)
-    hide_or_show_cursor(hide=True)
+    return False
+
+
+# ______________________get_process_start_time______________________
+def get_process_start_time() -> float:
+    """
+    Find the time (as returned by time.time()) when the current process was started.
+
+    On Linux this is read from /proc (with a precision of a few milliseconds), otherwise the time
+    this module was imported is used.
+
+    Returns:
+        float: Time the process started in seconds since the epoch.
+    """
+    try:
+        with open('/proc/self/stat', 'r') as file:
+            # the process name can contain spaces, so split after it; starttime is the 22nd field
+            start_ticks = int(file.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as file:
+            uptime = float(file.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return IMPORT_TIME
+
+
+# ______________________measure_allocations______________________
+def measure_allocations(config: dict[str, Any], warmup_frames: int = ALLOCATION_WARMUP_FRAMES,
+                        frames: int = ALLOCATION_CHECK_FRAMES) -> dict[str, Any]:
+    """
+    Measure the memory the rain allocates once it has been running for a while (see modules/sequence_pool.py).
+
+    The rain is updated, painted and encoded like in run_matrix(), but nothing is written to the terminal.
+    After warmup_frames, tracemalloc snapshots are taken before and after the next frames and compared.
+    Every sequence dictionary or 'chars' list in the rain or the pool that tracemalloc has a traceback for
+    was made while tracing, so it wasn't taken from the pool.
+
+    Args:
+        config (dict): Configuration dictionary (auto_size is ignored, the size is amount_of_rows/columns).
+        warmup_frames (int): Frames before the tracing starts.
+        frames (int): Frames that are traced.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'blocks_per_frame': memory blocks that are still allocated after the traced frames, per frame,
+              - 'new_sequences', 'new_chars': sequence dictionaries and chars lists made while tracing,
+              - 'sequences': amount of sequences in the rain and the pool.
+    """
+    update_palettes(config)
+    columns: list[list[dict[str, Any]]] = [[] for _ in range(config['amount_of_columns'])]
+    framebuffer = make_framebuffer(config['amount_of_rows'], config['amount_of_columns'])
+    row_encoder = make_row_encoder()
+
+    def run_frame() -> None:
+        nonlocal columns
+        columns, _ = update_columns(columns, config, False)
+        paint_framebuffer(framebuffer, columns, config)
+        encode_frame(row_encoder, framebuffer, config['render_threads'])
+        recycle_sequences(config['sequence_pool'])
+
+    # the snapshots themselves are allocated by tracemalloc while tracing
+    without_tracemalloc = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    try:
+        for _ in range(warmup_frames):
+            run_frame()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot().filter_traces(without_tracemalloc)
+            for _ in range(frames):
+                run_frame()
+            after = tracemalloc.take_snapshot().filter_traces(without_tracemalloc)
+            sequences = [sequence for column in columns for sequence in column]
+            sequences += config['sequence_pool']['free']
+            new_sequences = sum(tracemalloc.get_object_traceback(sequence) is not None for sequence in sequences)
+            new_chars = sum(tracemalloc.get_object_traceback(sequence['chars']) is not None for sequence in sequences)
+        finally:
+            tracemalloc.stop()
+    finally:
+        stop_row_encoder(row_encoder)
+
+    blocks = sum(statistic.count_diff for statistic in after.compare_to(before, 'filename'))
+    return {'blocks_per_frame': blocks / frames, 'new_sequences': new_sequences, 'new_chars': new_chars,
+            'sequences': len(sequences)}
+
+
+# ______________________check_allocations______________________
+def check_allocations(config: dict[str, Any]) -> int:
+    """
+    Check that the rain doesn't make new sequences and keeps at most MAX_BLOCKS_PER_FRAME memory blocks per frame
+    once it has been running for a while (see measure_allocations()).
+
+    Args:
+        config (dict): Configuration dictionary (auto_size is ignored, the size is amount_of_rows/columns).
+
+    Returns:
+        int: 0 if the check passed, 1 otherwise (the exit status of --check-allocations).
+    """
+    result = measure_allocations(config)
+    print(f"{ALLOCATION_CHECK_FRAMES} frames after {ALLOCATION_WARMUP_FRAMES} frames of warm-up: "
+          f"{result['new_sequences']} new sequence dictionaries and {result['new_chars']} new chars lists out of "
+          f"{result['sequences']} sequences, {result['blocks_per_frame']:.2f} memory blocks kept per frame "
+          f"(at most {MAX_BLOCKS_PER_FRAME})")
+    if result['new_sequences'] or result['new_chars'] or result['blocks_per_frame'] > MAX_BLOCKS_PER_FRAME:
+        return 1
+    return 0
+
+
+# ______________________parse_arguments______________________
+def parse_arguments(arguments: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments shared by all versions of the Matrix rain.
+
+    Args:
+        arguments (list, optional): Arguments to parse. If None, sys.argv is used.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description='Matrix rain animation in the terminal.')
+    parser.add_argument('--non-interactive', action='store_true',
+                        help="never wait for the user to type anything (controls that need typing are disabled)")
+    parser.add_argument('--startup-benchmark', action='store_true',
+                        help='exit after the first frame and print the time from the process start to the first frame')
+    parser.add_argument('--check-allocations', action='store_true',
+                        help="run the rain without a terminal and exit with status 1 if it still makes new sequences "
+                             "once it has been running for a while")
+    parser.add_argument('--profile', type=int, default=0, metavar='FRAMES',
+                        help=f'profile the first FRAMES frames and write the profile to the "{PROFILE_DIR_NAME}" folder')
+    return parser.parse_args(arguments)
+
+
+# ______________________wait_while_paused______________________
+def wait_while_paused(currently_pressed: set[str], lock: threading.Lock, config: dict[str, Any], key_events: KeyEvents, resized: threading.Event) -> None:
+    """
+    Wait without using the CPU until the pause control is pressed and released again or the terminal is resized.
+
+    Instead of checking the pressed keys in a loop, this sleeps until the keyboard backend reports a key
+    event (see modules/key_events.py) or the resize signal handler wakes it up.
+
+    Args:
+        currently_pressed (set): Set of currently pressed keys.
+        lock (threading.Lock): Lock for thread-safe access to currently_pressed.
+        config (dict): Configuration dictionary, 'paused' is set to False when the pause ends.
+        key_events (KeyEvents): Key events of the keyboard backend.
+        resized (threading.Event): Set when the terminal was resized, so the frame can be drawn again.
+    """
+    pause_keys = config['controls']['pause']
+    released = False  # the keys that paused the rain have to be released first
+    pressed_again = False
+    while not resized.is_set():
+        key_events.wake.clear()
+        key_events.clear()
+        if keys_are_pressed(currently_pressed, lock, config, ['ctrl', 'c']):
+            raise KeyboardInterrupt
+        if keys_are_pressed(currently_pressed, lock, config, pause_keys):
+            pressed_again = released
+        elif pressed_again:
+            config['paused'] = False  # unpause on release, so the held keys don't pause again
+            return
+        else:
+            released = True
+        key_events.wake.wait()
 
 
 def filler_func(*args, **kwargs):
@@ -1372,7 +2405,8 @@ def filler_func(*args, **kwargs):
 
 
 # ______________________run_matrix______________________
-def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Callable=filler_func, config=None) -> None:
+def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Callable=filler_func, config=None, startup_benchmark=False,
+               profile_frames=0) -> None:
     """
     Run the Matrix rain animation in the terminal.
 
@@ -1381,37 +2415,91 @@ def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Calla
     can be controlled via various keyboard commands.
 
     Args:
-        update_pressed_keys (callable): Function to update the set of currently pressed keys. (requires "currently_pressed, lock" as parameters)
-        change_controls (callable): Function to change keyboard control mappings. (requires "config" as a parameter)
+        update_pressed_keys (callable): Function to update the set of currently pressed keys. (requires "currently_pressed, lock, key_events" as parameters,
+                                        key_events is a KeyEvents queue that gets the typed characters and names of pressed keys,
+                                        release events call key_events.notify())
+        change_controls (callable): Function that returns a flow to change keyboard control mappings. (requires "config" as a parameter)
         config (dict, optional): Configuration dictionary. If None, the configuration is loaded via get_config().
+        startup_benchmark (bool): If True, stop after the first frame and print the time from the process start to it.
+        profile_frames (int): If not 0, profile the first profile_frames frames (see modules/frame_profiler.py).
 
     Returns:
         None
     """
+    columns = None
+    watcher = None
+    row_encoder = None
+    frame_export = None
+    metrics_server = None
+    profiler = None
+    old_resize_handler = None
+    snapshot_path = os.path.join(get_user_cache_dir(), SNAPSHOT_FILE_NAME)
     try:
         if config is None:
             config = get_config()  # load config from a file or use default config
 
         columns: list[list[dict[str, Any]]] = [[] for _ in range(config["amount_of_columns"])]  # initialize columns
         # intialize count, make sure to update range() when adding new controls that use this
-        count = [time.time() for _ in range(15)]
+        count = [time.time() for _ in range(16)]
         term_size_debounce = time.time()
         try:
             terminal_size = os.get_terminal_size()
             old_terminal_size = terminal_size
         except OSError:
+            terminal_size = None
             old_terminal_size = None
         clear = True
         update_colors = True
         hide_or_show_cursor(hide=True)
 
+        if config['warm_start'] or config['prewarm_seconds'] > 0:
+            if config["auto_size"] and terminal_size:
+                adjust_size(config, terminal_size)
+            columns = [[] for _ in range(config["amount_of_columns"])]
+            if config['warm_start']:
+                columns = load_snapshot(config, snapshot_path) or columns
+            if config['prewarm_seconds'] > 0:
+                prewarm_columns(columns, config, config['prewarm_seconds'])
+
         currently_pressed: set[str] = set()
         lock = threading.Lock()
-        update_pressed_keys(currently_pressed, lock)
+        key_events = KeyEvents()
+        update_pressed_keys(currently_pressed, lock, key_events)
+        resized = threading.Event()
+
+        def wake_on_resize(signum, frame):
+            resized.set()
+            key_events.notify()
+
+        if hasattr(signal, 'SIGWINCH'):
+            try:
+                old_resize_handler = signal.signal(signal.SIGWINCH, wake_on_resize)
+            except ValueError:  # not in the main thread
+                pass
+        prompt_panel = make_prompt_panel()
+        merged_cells = (None, None, {})  # overlay cells, panel cells and both of them together
+        frame_number = 0
+        sparse_state: dict[str, Any] = {}  # used by render_sparse()
+        framebuffer = make_framebuffer(config['amount_of_rows'], config['amount_of_columns'])  # reused by every frame
+        row_encoder = make_row_encoder()  # only uses threads on free-threaded Python
+        metrics = make_metrics()  # served by the metrics server if metrics_port is set
+        profiler = make_frame_profiler(os.path.join(os.path.dirname(os.path.abspath(__file__)), PROFILE_DIR_NAME))
+        if profile_frames:
+            config['profile_request'] = profile_frames
+        overlay = make_overlay()
+        encoding = sys.stdout.encoding or 'utf-8'
+        simulation_time = time.time()  # how far the time based simulation has gotten
 
         while True:
             start_time = time.time()
-
+            written = None  # bytes written to the terminal this frame
+            if config['profile_request']:  # requested by the profile control, the rain keeps running while profiling
+                start_frame_profile(profiler, config['profile_request'])
+                config['profile_request'] = 0
+
+            if resized.is_set():
+                resized.clear()
+                term_size_debounce = 0  # read the new size right away
             if time.time() - term_size_debounce > 0.15:
                 try:
                     terminal_size = os.get_terminal_size()
@@ -1419,31 +2507,115 @@ def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Calla
                 except OSError:
                     terminal_size = None
 
+            if config['watch_config_file'] and config['file_is_valid']:
+                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), config['dir_name'], config['file_name'])
+                if watcher is None or watcher['path'] != config_path:  # a different file could have been loaded
+                    stop_config_watcher(watcher)
+                    watcher = make_config_watcher(config_path)
+                elif config_file_changed(watcher):
+                    reload_clear, reload_update_colors = reload_config(config, columns, config_path)
+                    clear = clear or reload_clear
+                    update_colors = update_colors or reload_update_colors
+
             if update_colors:
-                update_sequence_and_background_colors(config, columns)
+                update_palettes(config)
+                update_colors = False
 
             if config["auto_size"] and terminal_size:
                 adjust_size(config, terminal_size)
 
-            columns, clear = update_columns(columns, config, clear)
-
-            rows = "\n".join(columns_to_rows(columns, config))
-
-            clear_if_necessary(clear, config, terminal_size, old_terminal_size)
-            old_terminal_size = terminal_size
+            # the governor never changes config itself, it only reduces the values used for this frame
+            quality_level = config['governor']['level'] if config['quality_governor'] else 0
+            frame_config = apply_quality_level(config, quality_level)
+
+            skipped_steps = 0  # simulation steps that are never shown, counted as dropped frames by the metrics
+            if config['paused']:
+                pass  # only drawn again because the terminal was resized
+            elif config['time_based_simulation']:
+                # advance the simulation by the time that has passed, if rendering is slow this skips frames instead of slowing the rain
+                if start_time - simulation_time > MAX_SIMULATION_LAG:
+                    # the simulation itself can't keep up
+                    skipped_steps = int((start_time - simulation_time) / config['simulation_step']) - 1
+                    simulation_time = start_time - config['simulation_step']
+                while simulation_time + config['simulation_step'] <= start_time:
+                    columns, clear = update_columns(columns, frame_config, clear)
+                    simulation_time += config['simulation_step']
+                    skipped_steps += 1
+                skipped_steps = max(skipped_steps - 1, 0)  # the last step is shown by this frame
+            else:
+                columns, clear = update_columns(columns, frame_config, clear)
+
+            if clear or should_render(quality_level, frame_number):
+                # the sparse renderer moves the cursor to each cell, which only works if the rows don't wrap
+                overlay_cells = update_overlay(overlay, columns, config, time.time()) if config['overlays'] else {}
+                panel_cells = get_panel_cells(prompt_panel, config)
+                if panel_cells:
+                    if merged_cells[0] is not overlay_cells or merged_cells[1] is not panel_cells:
+                        merged_cells = (overlay_cells, panel_cells, {**overlay_cells, **panel_cells})
+                    overlay_cells = merged_cells[2]
+                if config['render_mode'] == 'sparse' and terminal_size and config["amount_of_columns"] <= terminal_size.columns:
+                    cleared = clear_if_necessary(clear, config, terminal_size, old_terminal_size)
+                    output = render_sparse(columns, frame_config, sparse_state, cleared, overlay_cells)
+                    output += sparse_overlay_output(overlay, overlay_cells, sparse_state['redrawn'],
+                                                    lambda row, column: restore_sparse_cell(columns, frame_config, sparse_state, row, column))
+                    output = output.encode(encoding, errors='replace')
+                    if config['shared_memory_name']:  # the sparse mode doesn't need the framebuffer, except for the export
+                        paint_framebuffer(framebuffer, columns, frame_config)
+                        paint_overlay(framebuffer, overlay_cells)
+                else:
+                    paint_framebuffer(framebuffer, columns, frame_config)
+                    paint_overlay(framebuffer, overlay_cells)
+                    clear_if_necessary(clear, config, terminal_size, old_terminal_size)
+                    output = encode_frame(row_encoder, framebuffer, config['render_threads'], encoding)
+                    sparse_state['shadow'] = None
+                if config['shared_memory_name'] or frame_export is not None:
+                    frame_export = update_frame_export(frame_export, config['shared_memory_name'], framebuffer)
+                old_terminal_size = terminal_size
+                recycle_sequences(config['sequence_pool'])  # the renderer doesn't read the removed sequences anymore
+
+                sys.stdout.flush()  # anything written as text has to be written before the frame
+                sys.stdout.buffer.write(output)
+                sys.stdout.buffer.flush()
+                written = len(output)
+
+                if config['startup_time'] is None:
+                    config['startup_time'] = time.time() - get_process_start_time()
+                    if startup_benchmark:
+                        break
 
-            sys.stdout.write("\u001b[H" + rows + "\n")  # \u001b[H moves the cursor to row and column 0
-            sys.stdout.flush()
+            frame_time = time.time() - start_time
+            if config['quality_governor']:
+                update_governor(config['governor'], frame_time, config["time_between_frames"])
+            if config['metrics_port'] or metrics_server is not None:
+                metrics_server = update_metrics_server(metrics_server, metrics, config)
+                record_frame(metrics, start_time, frame_time, config["time_between_frames"], written,
+                             sum(map(len, columns)), quality_level, skipped_steps)
 
             clear = False
+            frame_number += 1
             end_time = start_time + config["time_between_frames"]
-            while True:
-                if config['controls_activated'] and currently_pressed:
-                    count, columns, check_clear, check_update_colors = check_keys(currently_pressed, lock, count, columns, config, change_controls)
+            while not config['paused']:
+                if panel_is_open(prompt_panel):
+                    # the panel gets all keys while it is open, so typing doesn't trigger any controls
+                    while key_events and panel_is_open(prompt_panel):
+                        handle_key_event(prompt_panel, key_events.popleft())
+                    if keys_are_pressed(currently_pressed, lock, config, ['ctrl', 'c']):
+                        raise KeyboardInterrupt
+                    finished, result = take_result(prompt_panel)
+                    if finished:
+                        key_events.clear()
+                        flush_stdin()  # the typed keys also went to the terminal
+                        if result:
+                            clear = True
+                            update_colors = True
+                elif config['controls_activated'] and currently_pressed:
+                    count, columns, check_clear, check_update_colors = check_keys(currently_pressed, lock, count, columns, config, change_controls, prompt_panel)
                     if check_clear:
                         clear = True
                     if check_update_colors:
                         update_colors = True
+                    if panel_is_open(prompt_panel):
+                        key_events.clear()  # the keys of the control that opened the panel
                 elif currently_pressed and keys_are_pressed(currently_pressed, lock, config, config['controls']['enable_controls']):
                     config['controls_activated'] = True
 
@@ -1452,6 +2624,16 @@ def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Calla
                 if time.time() > end_time:
                     break
 
+            if config['paused']:
+                pause_frame_profile(profiler)  # the sampling timer would wake the program all the time
+                wait_while_paused(currently_pressed, lock, config, key_events, resized)
+                resume_frame_profile(profiler)
+
+            # time spent paused or in a prompt shouldn't be simulated
+            if time.time() - end_time > 0.25:
+                simulation_time = time.time()
+            update_frame_profile(profiler)
+
     except KeyboardInterrupt:
         t = time.time()
         while True:
@@ -1462,10 +2644,34 @@ def run_matrix(update_pressed_keys: Callable=filler_func, change_controls: Calla
             except KeyboardInterrupt:
                 continue
     finally:
+        if old_resize_handler is not None:
+            signal.signal(signal.SIGWINCH, old_resize_handler)
+        stop_config_watcher(watcher)
+        stop_row_encoder(row_encoder)
+        stop_frame_export(frame_export)
+        stop_metrics_server(metrics_server)
+        if profiler is not None:
+            stop_frame_profile(profiler)  # what was captured until now
+        if config and config['warm_start'] and columns is not None:
+            try:
+                save_snapshot(columns, config, snapshot_path)
+            except (OSError, OverflowError, ValueError):
+                pass
         flush_stdin()
         hide_or_show_cursor(show=True)
         print('\nMatrix rain stopped')
+        for path in profiler['written'] if profiler is not None else ():
+            print(f'Profile written to {path}.pstats and {path}.collapsed')
+        if frame_export is not None and frame_export.get('error'):
+            print(f"The frames weren't published: {frame_export['error']}")
+
+    if startup_benchmark and config and config['startup_time'] is not None:
+        print(f"Time from process start to first frame: {config['startup_time'] * 1000:.1f} ms")
 
 
 if __name__ == '__main__':
-    run_matrix()
+    arguments = parse_arguments()
+    config = get_config(interactive=not arguments.non_interactive)
+    if arguments.check_allocations:
+        sys.exit(check_allocations(config))
+    run_matrix(config=config, startup_benchmark=arguments.startup_benchmark, profile_frames=arguments.profile)
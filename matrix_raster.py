@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import sys
+import time
+import argparse
+from typing import Any, BinaryIO
+
+from modules.framebuffer import make_framebuffer
+from modules.overlay import make_overlay, update_overlay, paint_overlay
+from modules.raster import NUMPY_AVAILABLE, PILLOW_AVAILABLE, make_raster, render_raster, write_raster
+from matrix_rain import CONFIG_FILE, get_config, update_palettes, update_columns, prewarm_columns, paint_framebuffer
+
+
+# ______________________parse_size______________________
+def parse_size(text: str) -> tuple[int, int]:
+    """
+    Parse an image size like "1920x1080".
+
+    Args:
+        text (str): The size.
+
+    Returns:
+        tuple: (width, height) in pixels.
+
+    Raises:
+        argparse.ArgumentTypeError: If the text isn't a valid size.
+    """
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'"{text}" isn\'t a size like 1920x1080')
+    if width < 1 or height < 1:
+        raise argparse.ArgumentTypeError(f'"{text}" isn\'t a size like 1920x1080')
+    return width, height
+
+
+# ______________________parse_raster_arguments______________________
+def parse_raster_arguments(arguments: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments of the image exporter.
+
+    Args:
+        arguments (list, optional): Arguments to parse. If None, sys.argv is used.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description='Draw the Matrix rain as RGB images, for example to pipe them into ffmpeg.')
+    parser.add_argument('output', nargs='?', default='-',
+                        help='file the images are written to, "-" writes them to stdout (default)')
+    parser.add_argument('--size', type=parse_size, default=(1920, 1080),
+                        help='size of the images in pixels (default: 1920x1080)')
+    parser.add_argument('--format', choices=('ppm', 'raw'), default='ppm',
+                        help='"ppm" writes a PPM image per frame, "raw" only writes the RGB pixels (rgb24)')
+    parser.add_argument('--frames', type=int, default=0,
+                        help='amount of frames to write, 0 = until stopped (default)')
+    parser.add_argument('--no-wait', action='store_true',
+                        help="don't wait time_between_frames between frames, write them as fast as possible")
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help='name of the config file in the config folder (the default config if left out)')
+    parser.add_argument('--font', default=None,
+                        help='font file the characters are drawn with (needs Pillow), installed fonts are used for '
+                             'the characters it doesn\'t have (default: the built-in 5x7 font, which looks the same '
+                             'on every computer)')
+    return parser.parse_args(arguments)
+
+
+# ______________________run_raster_export______________________
+def run_raster_export(config: dict[str, Any], output: BinaryIO, size: tuple[int, int], image_format: str = 'ppm',
+                      frames: int = 0, wait: bool = True, font_path: str | None = None) -> int:
+    """
+    Run the rain without a terminal and write every frame as an image.
+
+    Frames are painted into a framebuffer like in the "full" render mode (with the trail and the overlay)
+    and drawn by render_raster(). The rain is updated once per frame.
+
+    Args:
+        config (dict): Configuration dictionary (auto_size is ignored, the size is amount_of_rows/columns).
+        output (BinaryIO): File or pipe opened in binary mode.
+        size (tuple): (width, height) of the images in pixels.
+        image_format (str): 'ppm' or 'raw' (see write_raster()).
+        frames (int): Amount of frames to write, 0 = until stopped.
+        wait (bool): If True, wait time_between_frames between frames, so a video encoder gets them in real time.
+        font_path (str, optional): Font file the glyphs are drawn with first (see make_raster()).
+
+    Returns:
+        int: Amount of frames that were written.
+
+    Raises:
+        FileNotFoundError: If font_path doesn't exist.
+        RuntimeError: If font_path is given and Pillow isn't installed.
+    """
+    update_palettes(config)
+    columns: list[list[dict[str, Any]]] = [[] for _ in range(config['amount_of_columns'])]
+    if config['prewarm_seconds'] > 0:
+        prewarm_columns(columns, config, config['prewarm_seconds'])
+    framebuffer = make_framebuffer(config['amount_of_rows'], config['amount_of_columns'])
+    overlay = make_overlay()
+    raster = make_raster(*size, font_path)
+
+    frame_number = 0
+    try:
+        while not frames or frame_number < frames:
+            start_time = time.time()
+            columns, _ = update_columns(columns, config, False)
+            paint_framebuffer(framebuffer, columns, config)
+            if config['overlays']:
+                paint_overlay(framebuffer, update_overlay(overlay, columns, config, start_time))
+            write_raster(render_raster(raster, framebuffer), output, image_format)
+            frame_number += 1
+            if wait:
+                time.sleep(max(start_time + config['time_between_frames'] - time.time(), 0))
+        output.flush()
+    except (KeyboardInterrupt, BrokenPipeError):  # stopped or the encoder closed the pipe
+        pass
+    return frame_number
+
+
+# ______________________main______________________
+def main(arguments: list[str] | None = None) -> None:
+    """
+    Run the image exporter with the command line arguments.
+
+    When the images go to stdout, everything else that would be printed goes to stderr,
+    so only images are in the stream.
+
+    Args:
+        arguments (list, optional): Arguments to parse. If None, sys.argv is used.
+    """
+    arguments = parse_raster_arguments(arguments)
+    if not NUMPY_AVAILABLE:
+        sys.exit('The image exporter needs NumPy (pip install numpy)')
+    if arguments.font is not None and not PILLOW_AVAILABLE:
+        sys.exit('--font needs Pillow (pip install pillow)')
+    output = sys.stdout.buffer if arguments.output == '-' else open(arguments.output, 'wb')
+    sys.stdout = sys.stderr
+    try:
+        config = get_config(file_name=arguments.config, interactive=False)
+        started = time.time()
+        try:
+            written = run_raster_export(config, output, arguments.size, arguments.format, arguments.frames,
+                                        wait=not arguments.no_wait, font_path=arguments.font)
+        except (ValueError, FileNotFoundError, RuntimeError) as error:  # the image is too small or there is no font
+            sys.exit(str(error))
+        seconds = time.time() - started
+        print(f'{written} frames in {seconds:.1f} s ({written / max(seconds, 1e-9):.1f} frames per second)')
+    finally:
+        if output is not sys.__stdout__.buffer:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import codecs
+import atexit
+import select
+import threading
+from typing import Any
+try:
+    import termios
+    import tty
+    TERMIOS_AVAILABLE = True
+except ImportError:
+    TERMIOS_AVAILABLE = False
+
+from modules.terminal_control_funcs import hide_or_show_cursor
+from modules.prompt_panel import Flow
+from matrix_rain import run_matrix, get_config, parse_arguments, filler_func, check_allocations
+
+# the keys get the same names as in the pynput version, so its config files work here too
+# if you saved your config in a file you can load it by putting the file name here
+# if you want to use the default values, keep this variable as an emtpy string
+CONFIG_FILE = 'base_config_pynput'
+
+CONFIG_DIR_NAME = 'config_pynput'
+
+# a terminal only sends a key when it is pressed (and again when the key repeats),
+# so a key counts as pressed until this many seconds after its last press
+HOLD_TIME = 0.12
+# how long to wait for the rest of an escape sequence before "esc" is used as a key
+ESC_TIMEOUT = 0.03
+
+# keys that need shift on a US keyboard and the keys they are on
+SHIFTED_KEYS = dict(zip('~!@#$%^&*()_+{}|:"<>?', '`1234567890-=[]\\;\',./'))
+CONTROL_CHARS = {'\r': 'enter', '\n': 'enter', '\t': 'tab', '\x7f': 'backspace', '\x08': 'backspace', ' ': 'space'}
+# final characters of "ESC [ ... x" and "ESC O x" sequences
+CSI_KEYS = {'A': 'up', 'B': 'down', 'C': 'right', 'D': 'left', 'H': 'home', 'F': 'end',
+            'P': 'f1', 'Q': 'f2', 'R': 'f3', 'S': 'f4', 'Z': 'tab'}
+# numbers of "ESC [ number ~" sequences
+TILDE_KEYS = {'1': 'home', '2': 'insert', '3': 'delete', '4': 'end', '5': 'page_up', '6': 'page_down',
+              '7': 'home', '8': 'end', '11': 'f1', '12': 'f2', '13': 'f3', '14': 'f4', '15': 'f5', '17': 'f6',
+              '18': 'f7', '19': 'f8', '20': 'f9', '21': 'f10', '23': 'f11', '24': 'f12'}
+# the modifier parameter of an escape sequence is 1 + shift(1) + alt(2) + ctrl(4)
+MODIFIER_BITS = ((1, 'shift'), (2, 'alt'), (4, 'ctrl'))
+KEY_NAMES = ({'esc', 'shift', 'alt', 'ctrl'} | set(CONTROL_CHARS.values()) | set(CSI_KEYS.values())
+             | set(TILDE_KEYS.values()))
+MODIFIER_KEYS = ('shift', 'alt', 'ctrl')
+# keys whose escape sequences can have every modifier
+SEQUENCE_KEYS = (set(CSI_KEYS.values()) | set(TILDE_KEYS.values())) - {'tab'}
+# keys that are sent the same with and without shift
+UNSHIFTED_KEYS = {'enter', 'backspace', 'space', 'esc'}
+# ctrl + these letters is read as another key (tab, enter, backspace) or is caught by the terminal (ctrl+c...)
+RESERVED_CTRL_LETTERS = 'chijmqsz'
+# controls of the default config that a terminal can't send and the keys that are used for them instead
+TERMINAL_CONTROLS = {'make_space_between_columns': ['ctrl', 'space'],
+                     'disable_controls': ['ctrl', 'd'],
+                     'enable_controls': ['ctrl', 'e']}
+
+
+# ______________________get_modifiers______________________
+def get_modifiers(parameter: str) -> list[str]:
+    """
+    Get the names of the modifier keys from the modifier parameter of an escape sequence.
+
+    Args:
+        parameter (str): The parameter (for example "5" for ctrl), '' if the sequence didn't have one.
+
+    Returns:
+        list: Names of the modifier keys.
+    """
+    try:
+        bits = int(parameter) - 1
+    except ValueError:
+        return []
+    return [name for bit, name in MODIFIER_BITS if bits & bit]
+
+
+# ______________________decode_char______________________
+def decode_char(char: str) -> tuple[list[str], str]:
+    """
+    Get the keys that were pressed to type a character.
+
+    Args:
+        char (str): A character read from the terminal.
+
+    Returns:
+        tuple: (names of the pressed keys, the event for the key event queue).
+    """
+    if char in CONTROL_CHARS:
+        return [CONTROL_CHARS[char]], CONTROL_CHARS[char]
+    if char == '\x00':
+        return ['ctrl', 'space'], 'space'
+    if ord(char) < 32:  # ctrl + a letter
+        letter = chr(ord(char) + 96)
+        return ['ctrl', letter], letter
+    if char in SHIFTED_KEYS:
+        return ['shift', SHIFTED_KEYS[char]], char
+    if char != char.lower():
+        return ['shift', char.lower()], char
+    return [char], char
+
+
+# ______________________decode_escape______________________
+def decode_escape(text: str, start: int, complete: bool) -> tuple[list[str] | None, str | None, int]:
+    """
+    Decode the escape sequence that starts at text[start] (an ESC character).
+
+    Args:
+        text (str): The text read from the terminal.
+        start (int): Index of the ESC character.
+        complete (bool): True if no more characters are coming soon, so an unfinished sequence is just "esc".
+
+    Returns:
+        tuple: (names of the pressed keys, the event, index after the sequence).
+               The names are None if the sequence isn't complete yet and None is the event of unknown sequences.
+    """
+    if start + 1 >= len(text):
+        return (['esc'], 'esc', start + 1) if complete else (None, None, start)
+    kind = text[start + 1]
+    if kind not in '[O':
+        if kind == '\x1b':
+            return ['esc'], 'esc', start + 1
+        names, event = decode_char(kind)  # alt + key
+        return ['alt', *names], event, start + 2
+
+    end = start + 2
+    while end < len(text) and '\x30' <= text[end] <= '\x3f':  # parameters
+        end += 1
+    while end < len(text) and '\x20' <= text[end] <= '\x2f':  # intermediate characters
+        end += 1
+    if end >= len(text):
+        if complete:  # alt + "[" or alt + "O"
+            names, event = decode_char(kind)
+            return ['alt', *names], event, start + 2
+        return None, None, start
+
+    parameters = text[start + 2:end].split(';')
+    final = text[end]
+    if final == '~':
+        key = TILDE_KEYS.get(parameters[0])
+        modifiers = get_modifiers(parameters[1]) if len(parameters) > 1 else []
+    else:
+        key = CSI_KEYS.get(final)
+        modifiers = get_modifiers(parameters[-1]) if parameters[-1] else []
+        if final == 'Z':  # shift tab
+            modifiers = ['shift']
+    if key is None:
+        return [], None, end + 1
+    return [*modifiers, key], key, end + 1
+
+
+# ______________________decode_keys______________________
+def decode_keys(text: str, complete: bool) -> tuple[list[tuple[list[str], str]], str]:
+    """
+    Split the text read from the terminal into key presses.
+
+    Args:
+        text (str): The text read from the terminal.
+        complete (bool): True if no more characters are coming soon (see decode_escape()).
+
+    Returns:
+        tuple: (list of (names of the pressed keys, event), the text of an unfinished escape sequence).
+    """
+    keys: list[tuple[list[str], str]] = []
+    index = 0
+    while index < len(text):
+        if text[index] == '\x1b':
+            names, event, index_after = decode_escape(text, index, complete)
+            if names is None:
+                return keys, text[index:]
+            if event is not None:
+                keys.append((names, event))
+            index = index_after
+        else:
+            keys.append(decode_char(text[index]))
+            index += 1
+    return keys, ''
+
+
+# ______________________encode_keys______________________
+def encode_keys(keys: list[str]) -> str:
+    """
+    Get the text a terminal sends for a combination of keys (the opposite of decode_keys()).
+
+    Args:
+        keys (list): Names of the keys, which have to be readable (see can_be_typed()).
+
+    Returns:
+        str: The characters or the escape sequence.
+    """
+    modifiers = [key for key in keys if key in MODIFIER_KEYS]
+    key = next(key for key in keys if key not in MODIFIER_KEYS)
+    if key in SEQUENCE_KEYS:
+        parameter = 1 + sum(bit for bit, name in MODIFIER_BITS if name in modifiers)
+        tilde = next((number for number, name in TILDE_KEYS.items() if name == key), None)
+        final = next((final for final, name in CSI_KEYS.items() if name == key), None)
+        if final is None:
+            return f'\x1b[{tilde};{parameter}~' if parameter > 1 else f'\x1b[{tilde}~'
+        return f'\x1b[1;{parameter}{final}' if parameter > 1 else f'\x1b[{final}'
+    if key == 'tab' and 'shift' in modifiers:
+        return '\x1b[Z'
+    if key == 'esc':
+        char = '\x1b'
+    else:
+        char = next((char for char, name in CONTROL_CHARS.items() if name == key), key)
+    if 'ctrl' in modifiers:
+        char = '\x00' if key == 'space' else chr(ord(key) - 96)
+    elif 'shift' in modifiers:
+        shifted = {unshifted: shifted for shifted, unshifted in SHIFTED_KEYS.items()}
+        char = shifted.get(char, char.upper())
+    return '\x1b' + char if 'alt' in modifiers else char
+
+
+# ______________________press_keys______________________
+def press_keys(keys: list[tuple[list[str], str]], held: dict[str, float], currently_pressed: set[str], lock, key_events=None) -> None:
+    """
+    Add decoded key presses to the currently_pressed set and the key event queue.
+
+    Args:
+        keys (list): Key presses made by decode_keys().
+        held (dict): Time when each pressed key is released.
+        currently_pressed (set): Set to store currently pressed keys.
+        lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue of typed characters and key names for the in-frame prompts.
+    """
+    release_time = time.time() + HOLD_TIME
+    with lock:
+        for names, _ in keys:
+            for name in names:
+                held[name] = release_time
+                currently_pressed.add(name)
+    if key_events is not None:
+        for names, event in keys:
+            for name in names[:-1]:  # modifier keys
+                key_events.append(name)
+            key_events.append(event)
+
+
+# ______________________release_keys______________________
+def release_keys(held: dict[str, float], currently_pressed: set[str], lock, key_events=None) -> None:
+    """
+    Remove the keys that weren't pressed again within HOLD_TIME from the currently_pressed set.
+
+    Args:
+        held (dict): Time when each pressed key is released.
+        currently_pressed (set): Set containing keys that are currently pressed.
+        lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue of typed characters and key names for the in-frame prompts.
+    """
+    now = time.time()
+    released = [name for name, release_time in held.items() if release_time <= now]
+    if not released:
+        return
+    with lock:
+        for name in released:
+            del held[name]
+            currently_pressed.discard(name)
+    if key_events is not None:
+        key_events.notify()
+
+
+# ______________________read_keys______________________
+def read_keys(fd: int, currently_pressed: set[str], lock, key_events=None) -> None:
+    """
+    Read the keys typed in the terminal until stdin is closed (runs in its own thread).
+
+    The thread sleeps in select() until there is something to read or a held key has to be released,
+    so it doesn't use any CPU while no key is pressed.
+
+    Args:
+        fd (int): File descriptor of stdin.
+        currently_pressed (set): Set to store currently pressed keys.
+        lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue that gets the typed characters and key names.
+    """
+    decoder = codecs.getincrementaldecoder(sys.stdin.encoding or 'utf-8')(errors='replace')
+    held: dict[str, float] = {}
+    pending = ''
+    while True:
+        if pending:
+            timeout = ESC_TIMEOUT
+        elif held:
+            timeout = max(min(held.values()) - time.time(), 0)
+        else:
+            timeout = None
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if readable:
+            data = os.read(fd, 1024)
+            if not data:
+                return
+            keys, pending = decode_keys(pending + decoder.decode(data), complete=False)
+        else:
+            keys, pending = decode_keys(pending, complete=True)
+        if keys:
+            press_keys(keys, held, currently_pressed, lock, key_events)
+        release_keys(held, currently_pressed, lock, key_events)
+
+
+# ______________________update_pressed_keys______________________
+def update_pressed_keys(currently_pressed: set[str], lock, key_events=None) -> None:
+    """
+    Put the terminal into cbreak mode and start a thread that reads the pressed keys from stdin.
+
+    Unlike the pynput and keyboard versions this needs no X server or root, so it also works over SSH.
+    The terminal settings are restored when the program exits.
+
+    Args:
+        currently_pressed (set): Set to store currently pressed keys.
+        lock: A threading.Lock object for thread-safe access.
+        key_events (KeyEvents, optional): Queue that gets the typed characters and key names.
+
+    Returns:
+        None
+    """
+    if TERMIOS_AVAILABLE and sys.stdin.isatty():
+        fd = sys.stdin.fileno()
+        old_settings = termios.tcgetattr(fd)
+        tty.setcbreak(fd)  # ctrl+c still stops the rain
+        atexit.register(termios.tcsetattr, fd, termios.TCSADRAIN, old_settings)
+        threading.Thread(target=read_keys, args=(fd, currently_pressed, lock, key_events), daemon=True).start()
+    else:
+        print("stdin isn't a terminal (or termios isn't available); keyboard functionality is disabled.")
+        hide_or_show_cursor(show=True)
+        time.sleep(2)
+        hide_or_show_cursor(hide=True)
+
+
+# ______________________is_valid_key______________________
+def is_valid_key(key: str) -> bool:
+    """
+    Check if a key can be read from the terminal.
+
+    Args:
+        key (str): Name of the key.
+
+    Returns:
+        bool: True if the key can be used in the controls.
+    """
+    return key in KEY_NAMES or (len(key) == 1 and key.isprintable() and key == key.lower() and key not in SHIFTED_KEYS)
+
+
+# ______________________can_be_typed______________________
+def can_be_typed(keys: list[str]) -> bool:
+    """
+    Check if a combination of keys can be read from the terminal.
+
+    A terminal only sends characters and escape sequences, so shift doesn't change enter, backspace, space
+    and esc and ctrl only changes letters and space (for example ctrl shift enter is just enter).
+
+    Args:
+        keys (list): Names of the keys of a control.
+
+    Returns:
+        bool: True if pressing the keys together can be told apart from pressing other keys.
+    """
+    modifiers = [key for key in keys if key in MODIFIER_KEYS]
+    for key in keys:
+        if key in MODIFIER_KEYS or key in SEQUENCE_KEYS:
+            continue
+        if 'ctrl' in modifiers:
+            is_ctrl_letter = len(key) == 1 and key.isalpha() and key not in RESERVED_CTRL_LETTERS
+            if 'shift' in modifiers or not (is_ctrl_letter or key == 'space'):
+                return False
+        if 'shift' in modifiers and key in UNSHIFTED_KEYS:
+            return False
+    return True
+
+
+# ______________________remap_controls______________________
+def remap_controls(config: dict[str, Any]) -> list[str]:
+    """
+    Replace the keys of controls that can't be read from the terminal with the keys in TERMINAL_CONTROLS.
+
+    Args:
+        config (dict): Configuration dictionary, its controls are changed in place.
+
+    Returns:
+        list: A line for every control that couldn't be typed (with its new keys, if it got some).
+    """
+    lines = []
+    used_keys = [keys for keys in config['controls'].values()]
+    for control, keys in config['controls'].items():
+        if control == 'check_if_pressed' or can_be_typed(keys):
+            continue
+        new_keys = TERMINAL_CONTROLS.get(control)
+        if new_keys is None or new_keys in used_keys:
+            lines.append(f"{control}: {' '.join(keys)} (can't be used)")
+            continue
+        config['controls'][control] = list(new_keys)
+        used_keys.append(new_keys)
+        lines.append(f"{control}: {' '.join(keys)} -> {' '.join(new_keys)}")
+    return lines
+
+
+# ______________________change_controls______________________
+def change_controls(config: dict[str, Any]) -> Flow:
+    """
+    Flow (see modules/prompt_panel.py) to modify the control key mappings.
+
+    This flow allows the user to view current control mappings, modify them by entering new key combinations,
+    and optionally save the changes to the configuration.
+
+    Args:
+        config (dict): Configuration dictionary containing current control mappings.
+
+    Returns:
+        bool: False (the colors don't need to be updated).
+    """
+    new_controls: dict[str, list[str]] = {}
+    for dict_key in config['controls']:
+        try:
+            new_controls[dict_key] = config['controls'][dict_key].copy()
+        except AttributeError:
+            new_controls[dict_key] = config['controls'][dict_key]
+
+    save = False
+    text = ('You have chosen to change your controls\n\n'
+            'old/o = show controls without new changes\n'
+            'new/n = show controls with new changes\n'
+            'save/s = save changes\n'
+            'exit/e = exit without chaning controls')
+    while True:
+        control = (yield f'{text}\n\nEnter the name of the control you would like to change:').lower().strip()
+        text = ''
+        if control in ['o', 'old']:
+            text = '\n'.join(f"{key}: {' '.join(config['controls'][key])}" for key in config['controls'])
+            continue
+        elif control in ['new', 'n']:
+            text = '\n'.join(f"{key}: {' '.join(new_controls[key])}" for key in new_controls)
+            continue
+        elif control in ['save', 's']:
+            save = True
+            break
+        elif control in ['exit', 'e']:
+            break
+        elif control in config['controls'].keys():
+            new_keys = (yield ("\nEnter the keys you would like to use for this control.\n"
+                               "If you want this control to be activated by multiple keys, separate them by a space: a b ctrl\n"
+                               'Use the key a character is on together with shift, for example "shift =" for "+" and "shift a" for "A".\n'
+                               "A terminal can't send every combination (for example ctrl with a number or ctrl shift enter).\n"
+                               f"To keep the control the same, just enter the old keys ({' '.join(new_controls[control])})")).strip().lower()
+            if not new_keys:
+                continue
+            new_keys = list(dict.fromkeys(new_keys.split()))  # remove duplicates
+            invalid_keys = [key for key in new_keys if not is_valid_key(key)]
+            if invalid_keys:
+                text = f"""These keys can't be read from a terminal: {' '.join(f'"{key}"' for key in invalid_keys)}"""
+                continue
+            if not can_be_typed(new_keys):
+                text = (f"A terminal can't send {' '.join(new_keys)}: shift doesn't change enter, backspace, space and esc "
+                        "and ctrl only works with letters and space")
+                continue
+            new_controls[control] = new_keys
+
+            shared_keys = (yield ("""\nControls like "ctrl a" and "a" could both be accidentally used when you press "ctrl" and "a" \n"""
+                                  "If you don't want this to happen, enter at least one other key of the control that has extra keys.\n"
+                                  "Keep this empty if you don't want to add any.")).strip().lower()
+            if shared_keys:
+                shared_keys = shared_keys.split()
+                invalid_keys = [key for key in shared_keys if not is_valid_key(key)]
+                if invalid_keys:
+                    text = f"""These keys can't be read from a terminal: {' '.join(f'"{key}"' for key in invalid_keys)}"""
+                    continue
+                new_controls['check_if_pressed'] = list(dict.fromkeys(new_controls['check_if_pressed'] + shared_keys))
+        else:
+            text = "Name wasn't found."
+    if save:
+        config['controls'] = new_controls
+    return False
+
+
+# ______________________run_terminal_matrix______________________
+def run_terminal_matrix() -> None:
+    """
+    Initialize and run the Matrix rain animation, reading the keyboard input from the terminal itself.
+
+    This function loads the configuration, starts the thread that reads the keys from stdin,
+    and starts the main Matrix animation loop.
+
+    Returns:
+        None
+    """
+    arguments = parse_arguments()
+    config = get_config(file_name=CONFIG_FILE, dir_name=CONFIG_DIR_NAME, interactive=not arguments.non_interactive)
+    if arguments.check_allocations:
+        sys.exit(check_allocations(config))
+    remapped = remap_controls(config)
+    if remapped:
+        print("A terminal can't send these controls, they were changed for this run:\n" + '\n'.join(remapped))
+        hide_or_show_cursor(show=True)
+        time.sleep(2)
+        hide_or_show_cursor(hide=True)
+    # without a terminal update_pressed_keys would only print a message
+    pressed_keys_func = update_pressed_keys if sys.stdin.isatty() or not arguments.non_interactive else filler_func
+    run_matrix(pressed_keys_func, change_controls, config, startup_benchmark=arguments.startup_benchmark,
+               profile_frames=arguments.profile)
+
+
+if __name__ == '__main__':
+    run_terminal_matrix()
@@ -1,6 +1,7 @@
-import collections
 from typing import Any
 
+from modules.color_cache import get_palette_id, lookup_gradient, store_gradient
+
 
 # ______________________parse_ansi_color______________________
 def parse_ansi_color(ansi: str) -> tuple[tuple[int, int, int], bool] | None:
@@ -25,37 +26,35 @@ def parse_ansi_color(ansi: str) -> tuple[tuple[int, int, int], bool] | None:
 
 
 # ______________________extend_colors______________________
-def extend_colors(original_colors: tuple[str], new_length: int, config: dict[str, Any]) -> tuple[str]:
+def extend_colors(original_colors: tuple[str], new_length: int, config: dict[str, Any],
+                  palette_id: int | None = None) -> tuple[str]:
     """
     Generate an extended gradient of ANSI color codes by interpolating between given colors.
 
     This function interpolates between the colors provided in `original_colors` to create
     a gradient with `new_length` colors. It caches results in the configuration's
-    "extended_color_cache" to avoid redundant calculations.
+    "extended_color_cache" (see modules/color_cache.py) to avoid redundant calculations.
 
     Args:
         original_colors (tuple): A tuple of ANSI escape codes representing colors.
         new_length (int): The desired number of colors in the extended gradient.
         config (dict): Configuration dictionary that includes caching information.
+        palette_id (int, optional): Id of original_colors in the cache (looked up if None).
 
     Returns:
-        list: A tuple of ANSI escape codes representing the extended color gradient.
+        tuple: A tuple of ANSI escape codes representing the extended color gradient.
     """
-    max_cache_size = 250
     original_colors = tuple(original_colors)
-    key = (original_colors, new_length)
-    cache: collections.OrderedDict[tuple[tuple[str], int], tuple[str]] = config["extended_color_cache"]
+    cache: dict[str, Any] = config["extended_color_cache"]
+    if palette_id is None:
+        palette_id = get_palette_id(cache, original_colors)
 
-    if key in cache:
-        # Mark as recently used
-        cache.move_to_end(key)
-        return cache[key]
+    cached = lookup_gradient(cache, palette_id, new_length)
+    if cached is not None:
+        return cached
 
     if new_length <= 1:
-        cache[key] = original_colors
-        cache.move_to_end(key)
-        if len(cache) > max_cache_size:
-            cache.popitem(last=False)
+        store_gradient(cache, palette_id, new_length, original_colors)
         return original_colors
 
     extended = []
@@ -80,8 +79,33 @@ def extend_colors(original_colors: tuple[str], new_length: int, config: dict[str
         else:
             extended.append(f"\u001b[38;2;{r};{g};{b}m")
 
-    cache[key] = extended
-    cache.move_to_end(key)
-    if len(cache) > max_cache_size:
-        cache.popitem(last=False)
-    return tuple(extended)
\ No newline at end of file
+    extended = tuple(extended)
+    store_gradient(cache, palette_id, new_length, extended)
+    return extended
+
+
+# ______________________quantize_colors______________________
+def quantize_colors(original_colors: tuple[str], new_length: int, steps: int, config: dict[str, Any]) -> tuple[str]:
+    """
+    Make a gradient of `new_length` colors that only uses a few different colors.
+
+    The first color is kept for the head and the rest of the sequence is split into `steps` equally long bands,
+    each with one color of the extended gradient of the remaining colors. When a sequence like this moves,
+    only the cells at the head, the tail and the borders between the bands change color.
+
+    Args:
+        original_colors (tuple): A tuple of ANSI escape codes representing colors.
+        new_length (int): The desired number of colors in the gradient (the sequence length).
+        steps (int): Number of bands after the head.
+        config (dict): Configuration dictionary that includes caching information (used by extend_colors).
+
+    Returns:
+        tuple: A tuple of `new_length` ANSI escape codes.
+    """
+    if new_length <= 1 or len(original_colors) < 2:
+        return (original_colors[0],) * max(new_length, 1)
+    bands = extend_colors(tuple(original_colors[1:]), max(steps, 1), config)
+    quantized = [original_colors[0]]
+    for display_index in range(1, new_length):
+        quantized.append(bands[(display_index - 1) * max(steps, 1) // (new_length - 1)])
+    return tuple(quantized)
@@ -0,0 +1,133 @@
+import collections
+from typing import Any
+
+# the most gradients that are kept if the config doesn't set color_cache_size
+DEFAULT_COLOR_CACHE_SIZE = 1024
+
+
+# ______________________make_color_cache______________________
+def make_color_cache(max_size: int = DEFAULT_COLOR_CACHE_SIZE) -> dict[str, Any]:
+    """
+    Create a cache for the gradients made by extend_colors().
+
+    Every palette (tuple of ANSI escape codes) gets a small integer id the first time it is seen and the
+    gradients are stored by (palette id, length), so a lookup hashes two integers instead of every escape code.
+    The gradients and the palette ids are both evicted in least recently used order when there are more than
+    max_size of them. Ids are never given out twice, so an evicted palette can't get the gradients of another one.
+
+    Args:
+        max_size (int): The most gradients that are kept.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'palette_ids': id of every palette, least recently used first,
+              - 'next_palette_id': id of the next new palette,
+              - 'gradients': the gradients by (palette id, length), least recently used first,
+              - 'max_size': the most gradients and palette ids that are kept,
+              - 'hits', 'misses', 'evictions': counters shown with the current values.
+    """
+    return {'palette_ids': collections.OrderedDict(), 'next_palette_id': 0, 'gradients': collections.OrderedDict(),
+            'max_size': max_size, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+# ______________________get_palette_id______________________
+def get_palette_id(cache: dict[str, Any], colors: tuple[str, ...]) -> int:
+    """
+    Get the id of a palette, a new palette gets the next free id and the least recently used ids are evicted.
+
+    Args:
+        cache (dict): Cache created by make_color_cache().
+        colors (tuple): ANSI escape codes of the palette.
+
+    Returns:
+        int: The id of the palette.
+    """
+    palette_ids: collections.OrderedDict = cache['palette_ids']
+    palette_id = palette_ids.get(colors)
+    if palette_id is not None:
+        palette_ids.move_to_end(colors)
+        return palette_id
+    palette_id = cache['next_palette_id']
+    cache['next_palette_id'] += 1
+    palette_ids[colors] = palette_id
+    while len(palette_ids) > cache['max_size']:
+        palette_ids.popitem(last=False)
+    return palette_id
+
+
+# ______________________lookup_gradient______________________
+def lookup_gradient(cache: dict[str, Any], palette_id: int, length: int) -> tuple[str, ...] | None:
+    """
+    Get a cached gradient and mark it as recently used.
+
+    Args:
+        cache (dict): Cache created by make_color_cache().
+        palette_id (int): Id of the palette (see get_palette_id()).
+        length (int): Length of the gradient.
+
+    Returns:
+        tuple: The gradient or None if it isn't cached.
+    """
+    key = (palette_id, length)
+    gradients: collections.OrderedDict = cache['gradients']
+    gradient = gradients.get(key)
+    if gradient is None:
+        cache['misses'] += 1
+        return None
+    cache['hits'] += 1
+    gradients.move_to_end(key)
+    return gradient
+
+
+# ______________________store_gradient______________________
+def store_gradient(cache: dict[str, Any], palette_id: int, length: int, gradient: tuple[str, ...]) -> None:
+    """
+    Add a gradient to the cache and evict the least recently used gradients if it is too big.
+
+    Args:
+        cache (dict): Cache created by make_color_cache().
+        palette_id (int): Id of the palette (see get_palette_id()).
+        length (int): Length of the gradient.
+        gradient (tuple): The gradient.
+    """
+    gradients: collections.OrderedDict = cache['gradients']
+    gradients[(palette_id, length)] = gradient
+    while len(gradients) > cache['max_size']:
+        gradients.popitem(last=False)
+        cache['evictions'] += 1
+
+
+# ______________________resize_color_cache______________________
+def resize_color_cache(cache: dict[str, Any], max_size: int) -> None:
+    """
+    Change the most gradients and palette ids that are kept, evicting the least recently used ones if there are too many.
+
+    Args:
+        cache (dict): Cache created by make_color_cache().
+        max_size (int): The most gradients that are kept.
+    """
+    cache['max_size'] = max_size
+    gradients: collections.OrderedDict = cache['gradients']
+    while len(gradients) > max_size:
+        gradients.popitem(last=False)
+        cache['evictions'] += 1
+    palette_ids: collections.OrderedDict = cache['palette_ids']
+    while len(palette_ids) > max_size:
+        palette_ids.popitem(last=False)
+
+
+# ______________________get_color_cache_text______________________
+def get_color_cache_text(cache: dict[str, Any]) -> str:
+    """
+    Describe how well the cache works.
+
+    Args:
+        cache (dict): Cache created by make_color_cache().
+
+    Returns:
+        str: The amount of gradients and palettes and the hit, miss and eviction counters.
+    """
+    lookups = cache['hits'] + cache['misses']
+    hit_rate = round(cache['hits'] / lookups * 100, 1) if lookups else 0
+    return (f"{len(cache['gradients'])}/{cache['max_size']} gradients of {len(cache['palette_ids'])} palettes, "
+            f"{cache['hits']} hits ({hit_rate}%), {cache['misses']} misses, {cache['evictions']} evictions")
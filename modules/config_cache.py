@@ -0,0 +1,128 @@
+import os
+import sys
+import pickle
+import hashlib
+from typing import Any
+
+# change this when the way config files are normalized changes, so old cache files are ignored
+CACHE_VERSION = 5
+
+# folder of the program in the user's cache directory (see get_user_cache_dir()) and its folder of the configurations
+USER_CACHE_DIR_NAME = 'matrix-rain'
+CACHE_DIR_NAME = 'config'
+
+
+# ______________________get_user_cache_dir______________________
+def get_user_cache_dir() -> str:
+    """
+    Get the folder the program keeps its cached files in (the configurations and the snapshot of the rain).
+
+    It is in the user's cache directory ($XDG_CACHE_HOME or ~/.cache, %LOCALAPPDATA% on Windows,
+    ~/Library/Caches on macOS), so the program can be installed in a folder the user can't write to.
+
+    Returns:
+        str: Path of the folder (it may not exist yet).
+    """
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, USER_CACHE_DIR_NAME)
+
+
+# ______________________get_cache_dir______________________
+def get_cache_dir() -> str:
+    """
+    Get the folder the cached configurations are kept in (in get_user_cache_dir()).
+
+    Returns:
+        str: Path of the folder (it may not exist yet).
+    """
+    return os.path.join(get_user_cache_dir(), CACHE_DIR_NAME)
+
+
+# ______________________get_cache_path______________________
+def get_cache_path(file_path: str) -> str:
+    """
+    Get the path of the cache file for a configuration file.
+
+    Args:
+        file_path (str): Absolute path of the configuration file.
+
+    Returns:
+        str: Path of the cache file (in get_cache_dir()).
+    """
+    name = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), f'{name}.pickle')
+
+
+# ______________________get_cache_key______________________
+def get_cache_key(file_path: str) -> tuple | None:
+    """
+    Get the key that a cached configuration has to match to still be valid.
+
+    Args:
+        file_path (str): Absolute path of the configuration file.
+
+    Returns:
+        tuple: (CACHE_VERSION, file_path, modification time, size) or None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return CACHE_VERSION, file_path, stat.st_mtime_ns, stat.st_size
+
+
+# ______________________load_cached_config______________________
+def load_cached_config(file_path: str) -> dict[str, Any] | None:
+    """
+    Load the normalized configuration that was cached for a configuration file.
+
+    Args:
+        file_path (str): Absolute path of the configuration file.
+
+    Returns:
+        dict: The cached configuration or None if there is no valid cache for the file's current version.
+    """
+    key = get_cache_key(file_path)
+    if key is None:
+        return None
+    try:
+        with open(get_cache_path(file_path), 'rb') as file:
+            cached = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get('key') != key:
+        return None
+    return cached['config']
+
+
+# ______________________save_cached_config______________________
+def save_cached_config(file_path: str, config: dict[str, Any]) -> None:
+    """
+    Cache the normalized configuration of a configuration file.
+
+    The cache is only an optimization, so failing to write it is ignored.
+
+    Args:
+        file_path (str): Absolute path of the configuration file.
+        config (dict): Normalized configuration loaded from the file (without runtime data like caches).
+    """
+    key = get_cache_key(file_path)
+    if key is None:
+        return
+    cache_path = get_cache_path(file_path)
+    temp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, 'wb') as file:
+            pickle.dump({'key': key, 'config': config}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)  # readers never see a half written file
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
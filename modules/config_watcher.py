@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import struct
+from typing import Any
+
+# how often the modification time is checked when inotify isn't available
+POLL_INTERVAL = 0.5
+
+# inotify flags (see "man inotify")
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (followed by the name)
+
+
+# ______________________start_inotify______________________
+def start_inotify(dir_path: str) -> int | None:
+    """
+    Start watching a directory with inotify (Linux only).
+
+    The directory is watched instead of the file because many editors save by replacing the file.
+
+    Args:
+        dir_path (str): Path of the directory that contains the watched file.
+
+    Returns:
+        int: A non-blocking inotify file descriptor or None if inotify isn't available.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(dir_path), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+# ______________________make_config_watcher______________________
+def make_config_watcher(file_path: str) -> dict[str, Any]:
+    """
+    Start watching a configuration file for changes.
+
+    Args:
+        file_path (str): Path of the configuration file.
+
+    Returns:
+        dict: Watcher state with keys:
+              - 'path': the watched file,
+              - 'mtime': last seen modification time (None if the file doesn't exist),
+              - 'inotify_fd': inotify file descriptor or None if the modification time is polled,
+              - 'last_check': time of the last poll.
+    """
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    return {'path': file_path,
+            'mtime': mtime,
+            'inotify_fd': start_inotify(os.path.dirname(file_path)),
+            'last_check': time.time()}
+
+
+# ______________________config_file_changed______________________
+def config_file_changed(watcher: dict[str, Any]) -> bool:
+    """
+    Check if the watched configuration file changed since the last call.
+
+    With inotify this only reads the pending events (no system call on the file itself),
+    otherwise the modification time is checked at most every POLL_INTERVAL seconds.
+
+    Args:
+        watcher (dict): Watcher state created by make_config_watcher().
+
+    Returns:
+        bool: True if the file was changed.
+    """
+    if watcher['inotify_fd'] is not None:
+        name = os.fsencode(os.path.basename(watcher['path']))
+        changed = False
+        while True:
+            try:
+                data = os.read(watcher['inotify_fd'], 4096)
+            except BlockingIOError:
+                break
+            except OSError:
+                return False
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                if data[offset:offset + length].rstrip(b'\0') == name:
+                    changed = True
+                offset += length
+        return changed
+
+    now = time.time()
+    if now - watcher['last_check'] < POLL_INTERVAL:
+        return False
+    watcher['last_check'] = now
+    try:
+        mtime = os.stat(watcher['path']).st_mtime_ns
+    except OSError:
+        return False
+    if mtime == watcher['mtime']:
+        return False
+    watcher['mtime'] = mtime
+    return True
+
+
+# ______________________stop_config_watcher______________________
+def stop_config_watcher(watcher: dict[str, Any] | None) -> None:
+    """
+    Stop watching a configuration file.
+
+    Args:
+        watcher (dict): Watcher state created by make_config_watcher() (None is ignored).
+    """
+    if watcher and watcher['inotify_fd'] is not None:
+        os.close(watcher['inotify_fd'])
+        watcher['inotify_fd'] = None
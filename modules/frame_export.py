@@ -0,0 +1,297 @@
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any
+
+from modules.ansi_color_funcs import parse_ansi_color
+from modules.framebuffer import NO_COLOR, HIDDEN_COLOR
+
+# Layout of the shared memory (all numbers are in the byte order of the machine, like the framebuffer's arrays):
+#   header (HEADER_SIZE bytes): see HEADER,
+#   glyph table: table_capacity uint32, the code point of every glyph id,
+#   color table: table_capacity uint32, 0xRRGGBB of every color id (or COLOR_DEFAULT / COLOR_HIDDEN),
+#   glyphs: cell_capacity uint32, the glyph id of every cell (row by row),
+#   colors: cell_capacity uint32, the color id of every cell (row by row).
+# 'sequence' is a seqlock: it is odd while a frame is written. A reader reads it, reads the frame and reads it again;
+# the frame is consistent if both values are the same even number.
+HEADER = struct.Struct('=4sIQIIIIIIdI')  # magic, version, sequence, rows, columns, cell_capacity, table_capacity,
+                                         # glyph_count, color_count, time the frame was written, pid of the writer
+HEADER_SIZE = 64
+MAGIC_VERSION = struct.Struct('=4sI')
+PID = struct.Struct('=I')
+PID_OFFSET = 48
+SEQUENCE = struct.Struct('=Q')
+SEQUENCE_OFFSET = 8
+MAGIC = b'MXRN'
+# written into the magic of a shared memory that was replaced by a bigger one with the same name
+REPLACED_MAGIC = b'GONE'
+VERSION = 2
+
+# the cell is drawn in the terminal's default color / the cell is drawn as a space
+COLOR_DEFAULT = 1 << 24
+COLOR_HIDDEN = 1 << 25
+
+DEFAULT_CELL_CAPACITY = 65536
+TABLE_CAPACITY = 65536
+
+
+# ______________________get_color_value______________________
+def get_color_value(color_id: int, color: str | None) -> int:
+    """
+    Get the number that stands for a color in the color table.
+
+    Args:
+        color_id (int): Id of the color in the framebuffer.
+        color (str): The ANSI escape code of the color.
+
+    Returns:
+        int: 0xRRGGBB, COLOR_DEFAULT or COLOR_HIDDEN.
+    """
+    if color_id == HIDDEN_COLOR:
+        return COLOR_HIDDEN
+    parsed = parse_ansi_color(color) if color_id != NO_COLOR and '[' in color else None
+    if parsed is None:
+        return COLOR_DEFAULT
+    (r, g, b), _ = parsed
+    return (r << 16) | (g << 8) | b
+
+
+# ______________________get_running_writer______________________
+def get_running_writer(buffer: memoryview) -> int | None:
+    """
+    Find out if a shared memory with the same name is still written by another process.
+
+    A shared memory whose magic is REPLACED_MAGIC or unknown, or that has another version of the layout,
+    isn't written anymore. Otherwise the pid in its header tells if its writer is still running.
+
+    Args:
+        buffer (memoryview): Buffer of the existing shared memory.
+
+    Returns:
+        int: The pid of the running writer or None if the shared memory can be replaced.
+    """
+    if len(buffer) < HEADER_SIZE:
+        return None
+    magic, version = MAGIC_VERSION.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    pid = PID.unpack_from(buffer, PID_OFFSET)[0]
+    if pid == os.getpid():
+        return None
+    if os.name == 'nt':  # a shared memory only exists on Windows while a process has it open
+        return pid
+    try:
+        os.kill(pid, 0)  # only checks if the process exists
+    except ProcessLookupError:
+        return None
+    except PermissionError:  # it exists but belongs to another user
+        pass
+    return pid
+
+
+# ______________________make_frame_export______________________
+def make_frame_export(name: str, cells: int = 0, table_capacity: int = TABLE_CAPACITY) -> dict[str, Any]:
+    """
+    Create the named shared memory that the frames are published in (see publish_frame()).
+
+    A shared memory with the same name that was left behind by a process that crashed or was replaced by a bigger
+    one is replaced, one that another running process still writes is left alone (see get_running_writer()).
+
+    Args:
+        name (str): Name of the shared memory (on Linux it is /dev/shm/<name>).
+        cells (int): Amount of cells it has to hold at least (it is made bigger when needed).
+        table_capacity (int): The most glyph and color ids it can hold.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'name', 'memory': the name and the SharedMemory,
+              - 'cell_capacity', 'table_capacity': how many cells and ids fit,
+              - 'sequence': the seqlock counter,
+              - 'glyph_table', 'glyph_count', 'color_table', 'color_count': the framebuffer tables that were
+                published and how many of their ids.
+
+    Raises:
+        FileExistsError: If another running process writes frames to a shared memory with this name.
+        OSError: If the shared memory can't be created.
+    """
+    cell_capacity = max(cells, DEFAULT_CELL_CAPACITY)
+    size = HEADER_SIZE + 8 * table_capacity + 8 * cell_capacity
+    try:
+        memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        old_memory = shared_memory.SharedMemory(name=name)
+        try:
+            writer = get_running_writer(old_memory.buf)
+        finally:
+            old_memory.close()
+        if writer is not None:
+            raise FileExistsError(f'The shared memory "{name}" is used by another matrix rain (process {writer}), '
+                                  f'change shared_memory_name')
+        old_memory.unlink()
+        memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+    HEADER.pack_into(memory.buf, 0, MAGIC, VERSION, 0, 0, 0, cell_capacity, table_capacity, 0, 0, 0.0, os.getpid())
+    return {'name': name,
+            'memory': memory,
+            'cell_capacity': cell_capacity,
+            'table_capacity': table_capacity,
+            'sequence': 0,
+            'glyph_table': None,
+            'glyph_count': 0,
+            'color_table': None,
+            'color_count': 0}
+
+
+# ______________________publish_frame______________________
+def publish_frame(export: dict[str, Any], framebuffer: dict[str, Any]) -> dict[str, Any]:
+    """
+    Copy a painted framebuffer (see modules/framebuffer.py) into the shared memory.
+
+    Only the glyph and color ids of the cells are copied every frame (two memory copies), the code points and
+    colors of the ids are only written when new ids were added. The sequence number is made odd before and
+    even again after writing, so readers can tell if they read a frame that was being written.
+    If the frame doesn't fit, the shared memory is replaced by a bigger one with the same name and the magic of
+    the old one is set to REPLACED_MAGIC, so readers know they have to open it again.
+
+    Args:
+        export (dict): Export created by make_frame_export().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+
+    Returns:
+        dict: The export (a new one if the shared memory was replaced).
+    """
+    rows, columns = framebuffer['rows'], framebuffer['columns']
+    glyph_table: list[str] = framebuffer['glyph_ids'].keys_by_id
+    color_table: list[str | None] = framebuffer['color_ids'].keys_by_id
+    if len(glyph_table) > export['table_capacity'] or len(color_table) > export['table_capacity']:
+        return export  # so many ids only happen if something went wrong, skip the frame
+    if rows * columns > export['cell_capacity']:
+        export['memory'].buf[0:4] = REPLACED_MAGIC
+        stop_frame_export(export)
+        export = make_frame_export(export['name'], rows * columns * 2, export['table_capacity'])
+
+    buffer = export['memory'].buf
+    table_capacity = export['table_capacity']
+    cells_offset = HEADER_SIZE + 8 * table_capacity
+    sequence = export['sequence'] + 1
+    SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, sequence)  # odd: the frame is being written
+
+    # the tables are replaced when the framebuffer forgets its ids (see reset_tables())
+    if export['glyph_table'] is not glyph_table:
+        export['glyph_table'] = glyph_table
+        export['glyph_count'] = 0
+    if export['color_table'] is not color_table:
+        export['color_table'] = color_table
+        export['color_count'] = 0
+    if export['glyph_count'] < len(glyph_table):
+        new_glyphs = [ord(glyph[0]) if glyph else 32 for glyph in glyph_table[export['glyph_count']:]]
+        struct.pack_into(f'={len(new_glyphs)}I', buffer, HEADER_SIZE + 4 * export['glyph_count'], *new_glyphs)
+        export['glyph_count'] = len(glyph_table)
+    if export['color_count'] < len(color_table):
+        new_colors = [get_color_value(color_id, color_table[color_id])
+                      for color_id in range(export['color_count'], len(color_table))]
+        struct.pack_into(f'={len(new_colors)}I', buffer, HEADER_SIZE + 4 * (table_capacity + export['color_count']), *new_colors)
+        export['color_count'] = len(color_table)
+
+    cell_bytes = 4 * rows * columns
+    colors_offset = cells_offset + 4 * export['cell_capacity']
+    buffer[cells_offset:cells_offset + cell_bytes] = memoryview(framebuffer['glyphs']).cast('B')
+    buffer[colors_offset:colors_offset + cell_bytes] = memoryview(framebuffer['colors']).cast('B')
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, sequence, rows, columns, export['cell_capacity'], table_capacity,
+                     export['glyph_count'], export['color_count'], time.time(), os.getpid())
+
+    export['sequence'] = sequence + 1
+    SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, sequence + 1)  # even: the frame is done
+    return export
+
+
+# ______________________read_frame______________________
+def read_frame(buffer: memoryview, attempts: int = 100) -> dict[str, Any] | None:
+    """
+    Read a consistent copy of the last published frame (an example of how other programs can read it).
+
+    Readers that don't want to copy can read the cells straight out of the buffer the same way, as long as they
+    check that the sequence number didn't change afterwards.
+
+    Args:
+        buffer (memoryview): Buffer of the shared memory (SharedMemory(name).buf).
+        attempts (int): How often to try if a frame was being written.
+
+    Returns:
+        dict: 'sequence', 'rows', 'columns', 'time', 'glyphs' (the text of every row) and 'colors'
+              (a list of color values for every row), or None if there was no consistent frame
+              or the shared memory was replaced (then open it again).
+    """
+    for _ in range(attempts):
+        magic, _, sequence, rows, columns, cell_capacity, table_capacity, glyph_count, color_count, written, _ = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            return None
+        if sequence % 2 == 1 or sequence == 0:
+            time.sleep(0.0001)
+            continue
+        cells_offset = HEADER_SIZE + 8 * table_capacity
+        glyph_codes = struct.unpack_from(f'={glyph_count}I', buffer, HEADER_SIZE)
+        color_values = struct.unpack_from(f'={color_count}I', buffer, HEADER_SIZE + 4 * table_capacity)
+        glyph_ids = struct.unpack_from(f'={rows * columns}I', buffer, cells_offset)
+        color_ids = struct.unpack_from(f'={rows * columns}I', buffer, cells_offset + 4 * cell_capacity)
+        if SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)[0] != sequence:
+            continue  # a new frame was written while reading
+        try:
+            glyphs = [''.join(chr(glyph_codes[glyph_id]) for glyph_id in glyph_ids[row * columns:(row + 1) * columns])
+                      for row in range(rows)]
+            colors = [[color_values[color_id] for color_id in color_ids[row * columns:(row + 1) * columns]]
+                      for row in range(rows)]
+        except IndexError:
+            continue
+        return {'sequence': sequence, 'rows': rows, 'columns': columns, 'time': written,
+                'glyphs': glyphs, 'colors': colors}
+    return None
+
+
+# ______________________update_frame_export______________________
+def update_frame_export(export: dict[str, Any] | None, name: str, framebuffer: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Publish a frame if the export is turned on, creating or removing the shared memory when the name changed.
+
+    If the shared memory can't be created, nothing is published until the name changes and the reason is kept
+    in 'error'.
+
+    Args:
+        export (dict): Export created by make_frame_export() or None.
+        name (str): The shared_memory_name setting ('' = off).
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+
+    Returns:
+        dict: The export or None if it is turned off.
+    """
+    if export is not None and export['name'] != name:
+        stop_frame_export(export)
+        export = None
+    if not name:
+        return None
+    if export is None:
+        try:
+            export = make_frame_export(name, framebuffer['rows'] * framebuffer['columns'])
+        except (OSError, ValueError) as error:
+            export = {'name': name, 'memory': None, 'error': str(error)}
+    if export['memory'] is None:
+        return export
+    return publish_frame(export, framebuffer)
+
+
+# ______________________stop_frame_export______________________
+def stop_frame_export(export: dict[str, Any] | None) -> None:
+    """
+    Close and remove the shared memory.
+
+    Args:
+        export (dict): Export created by make_frame_export() or None.
+    """
+    if export is None or export['memory'] is None:
+        return
+    export['memory'].close()
+    try:
+        export['memory'].unlink()
+    except FileNotFoundError:
+        pass
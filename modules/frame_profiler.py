@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import signal
+import cProfile
+import threading
+import collections
+from typing import Any
+
+# seconds between two stack samples
+SAMPLE_INTERVAL = 0.001
+
+
+# ______________________make_frame_profiler______________________
+def make_frame_profiler(dir_path: str) -> dict[str, Any]:
+    """
+    Create a profiler that can capture a number of frames while the rain keeps running (see start_frame_profile()).
+
+    Args:
+        dir_path (str): Folder the profiles are written to (created when the first profile is written).
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'dir_path': folder of the profiles,
+              - 'frames_left': frames until the running capture is written, 0 if nothing is captured,
+              - 'profile': the cProfile.Profile of the running capture or None,
+              - 'paused': True while the running capture is paused (see pause_frame_profile()),
+              - 'old_alarm_handler': the SIGALRM handler before the sampling started or None,
+              - 'sampler', 'stop': the sampling thread and the event that stops it (if no timer signal is used),
+              - 'stacks': Counter of the collapsed stacks that were sampled,
+              - 'written': paths (without extension) of the profiles that were written.
+    """
+    return {'dir_path': dir_path,
+            'frames_left': 0,
+            'profile': None,
+            'paused': False,
+            'old_alarm_handler': None,
+            'sampler': None,
+            'stop': threading.Event(),
+            'stacks': collections.Counter(),
+            'written': []}
+
+
+# ______________________get_collapsed_stack______________________
+def get_collapsed_stack(frame) -> str:
+    """
+    Make the collapsed stack of a frame, the format of flamegraph.pl and speedscope.
+
+    Args:
+        frame: Innermost stack frame.
+
+    Returns:
+        str: "file:function;file:function;..." from the outermost to the innermost function.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # co_qualname (with the class of methods) only exists since Python 3.11
+        names.append(f"{code.co_filename.rpartition(os.sep)[2]}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+# ______________________sample_stacks______________________
+def sample_stacks(profiler: dict[str, Any], thread_id: int) -> None:
+    """
+    Count the stack of a thread every SAMPLE_INTERVAL seconds until profiler['stop'] is set.
+
+    Only used where start_sampler() can't use a timer signal, with the GIL the thread only gets to sample when
+    the sampled thread lets it, so short busy stretches are missed more often.
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+        thread_id (int): Thread whose stack is sampled (the thread of run_matrix()).
+    """
+    stacks: collections.Counter = profiler['stacks']
+    while not profiler['stop'].wait(SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[get_collapsed_stack(frame)] += 1
+        del frame  # don't keep the frame (and its local variables) alive until the next sample
+
+
+# ______________________start_sampler______________________
+def start_sampler(profiler: dict[str, Any]) -> None:
+    """
+    Start counting the stacks of the calling thread every SAMPLE_INTERVAL seconds.
+
+    Where possible (Unix, main thread) the stacks are taken by a SIGALRM handler in the thread itself, so the
+    samples are spread evenly over the time and the only thing they add to the cProfile profile is the handler.
+    Otherwise a thread samples the stack (see sample_stacks()).
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+    """
+    if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+        stacks: collections.Counter = profiler['stacks']
+
+        def record_sample(signum, frame) -> None:
+            stacks[get_collapsed_stack(frame)] += 1
+
+        profiler['old_alarm_handler'] = signal.signal(signal.SIGALRM, record_sample)
+        signal.setitimer(signal.ITIMER_REAL, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+        return
+    profiler['stop'] = threading.Event()
+    profiler['sampler'] = threading.Thread(target=sample_stacks, args=(profiler, threading.get_ident()),
+                                           name='frame_profiler', daemon=True)
+    profiler['sampler'].start()
+
+
+# ______________________stop_sampler______________________
+def stop_sampler(profiler: dict[str, Any]) -> None:
+    """
+    Stop counting stacks (see start_sampler()).
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+    """
+    if profiler['old_alarm_handler'] is not None:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, profiler['old_alarm_handler'])
+        profiler['old_alarm_handler'] = None
+    if profiler['sampler'] is not None:
+        profiler['stop'].set()
+        profiler['sampler'].join()
+        profiler['sampler'] = None
+
+
+# ______________________start_frame_profile______________________
+def start_frame_profile(profiler: dict[str, Any], frames: int) -> bool:
+    """
+    Start capturing the next frames, nothing happens if a capture is already running.
+
+    Has to be called from the thread that draws the frames.
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+        frames (int): Amount of frames to capture.
+
+    Returns:
+        bool: True if the capture was started, False if one was already running or another profiler is active.
+    """
+    if profiler['profile'] is not None or frames < 1:
+        return False
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:  # another profiler (like python -m cProfile) is active
+        return False
+    profiler['profile'] = profile
+    profiler['paused'] = False
+    profiler['frames_left'] = frames
+    profiler['stacks'] = collections.Counter()
+    start_sampler(profiler)
+    return True
+
+
+# ______________________pause_frame_profile______________________
+def pause_frame_profile(profiler: dict[str, Any]) -> None:
+    """
+    Stop capturing while the rain is paused, so the timer doesn't wake the program every SAMPLE_INTERVAL seconds
+    and the waiting isn't part of the profile. Nothing happens if no capture is running.
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+    """
+    if profiler['profile'] is None or profiler['paused']:
+        return
+    stop_sampler(profiler)
+    profiler['profile'].disable()
+    profiler['paused'] = True
+
+
+# ______________________resume_frame_profile______________________
+def resume_frame_profile(profiler: dict[str, Any]) -> None:
+    """
+    Continue a capture that was paused by pause_frame_profile().
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+    """
+    if profiler['profile'] is None or not profiler['paused']:
+        return
+    profiler['paused'] = False
+    profiler['profile'].enable()
+    start_sampler(profiler)
+
+
+# ______________________update_frame_profile______________________
+def update_frame_profile(profiler: dict[str, Any]) -> str | None:
+    """
+    Count a frame of the running capture and write the profile after its last frame.
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+
+    Returns:
+        str: Path of the profile (without extension) if it was written this frame, otherwise None.
+    """
+    if profiler['profile'] is None:
+        return None
+    profiler['frames_left'] -= 1
+    if profiler['frames_left'] > 0:
+        return None
+    return stop_frame_profile(profiler)
+
+
+# ______________________stop_frame_profile______________________
+def stop_frame_profile(profiler: dict[str, Any]) -> str | None:
+    """
+    Stop the running capture and write it, even if not all frames were captured yet.
+
+    Two files are written: <path>.pstats (cProfile, for pstats or snakeviz) and <path>.collapsed
+    ("stack count" lines, for flamegraph.pl or speedscope).
+
+    Args:
+        profiler (dict): Profiler created by make_frame_profiler().
+
+    Returns:
+        str: Path of the profile (without extension) or None if nothing was captured or it couldn't be written.
+    """
+    profile: cProfile.Profile | None = profiler['profile']
+    if profile is None:
+        return None
+    stop_sampler(profiler)
+    profile.disable()
+    profiler['profile'] = None
+    profiler['paused'] = False
+    profiler['frames_left'] = 0
+
+    # the nanoseconds keep two captures that end in the same second apart
+    now = time.time_ns()
+    file_name = f"{time.strftime('profile_%Y%m%d_%H%M%S', time.localtime(now // 10**9))}_{now % 10**9:09d}"
+    path = os.path.join(profiler['dir_path'], file_name)
+    try:
+        os.makedirs(profiler['dir_path'], exist_ok=True)
+        profile.dump_stats(path + '.pstats')
+        with open(path + '.collapsed', 'w', encoding='utf-8') as file:
+            file.writelines(f'{stack} {samples}\n' for stack, samples in profiler['stacks'].most_common())
+    except OSError:
+        return None
+    profiler['written'].append(path)
+    return path
@@ -0,0 +1,192 @@
+import array
+import operator
+from typing import Any
+
+# id 0 is always a space without a color
+EMPTY_GLYPH = 0
+NO_COLOR = 0
+# cells with this color id are drawn as a space, whatever their glyph is
+HIDDEN_COLOR = 1
+RESET_COLOR = '\u001b[0m'
+
+
+# ______________________IdTable______________________
+class IdTable(dict):
+    """
+    Dictionary that gives every new key the next id and remembers the keys of the ids in a list.
+
+    Missing keys are added when they are looked up, so lookups can be done with map() without checking for them.
+    """
+    def __init__(self, *keys):
+        super().__init__()
+        self.keys_by_id: list = []
+        for key in keys:
+            self[key]
+
+    def __missing__(self, key) -> int:
+        new_id = len(self.keys_by_id)
+        self.keys_by_id.append(key)
+        self[key] = new_id
+        return new_id
+
+
+# ______________________make_framebuffer______________________
+def make_framebuffer(rows: int, columns: int) -> dict[str, Any]:
+    """
+    Create a framebuffer with one glyph id and one color id for every cell.
+
+    The cells are stored row by row in flat arrays (the cell of row r and column c is at r * columns + c).
+    Glyphs and colors are stored as ids into tables, so comparing, copying or clipping cells
+    doesn't need to touch any strings.
+
+    Args:
+        rows (int): Amount of rows.
+        columns (int): Amount of columns.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'rows', 'columns': the size,
+              - 'glyphs', 'colors': array('I') with the glyph and color id of every cell,
+              - 'glyph_ids', 'color_ids': IdTables with the ids of the glyph and color strings,
+              - 'cell_text': the text of every cell by color id and glyph id (see update_cell_text()),
+              - 'palette': the palette tables the color ids belong to (see set_palette()).
+    """
+    framebuffer = {'rows': 0,
+                   'columns': 0,
+                   'glyphs': array.array('I'),
+                   'colors': array.array('I'),
+                   'palette': None}
+    reset_tables(framebuffer)
+    resize_framebuffer(framebuffer, rows, columns)
+    return framebuffer
+
+
+# ______________________reset_tables______________________
+def reset_tables(framebuffer: dict[str, Any]) -> None:
+    """
+    Forget all glyph and color ids (the cells have to be painted again after this).
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+    """
+    framebuffer['glyph_ids'] = IdTable(' ')  # EMPTY_GLYPH
+    framebuffer['color_ids'] = IdTable('', None)  # NO_COLOR, HIDDEN_COLOR
+    framebuffer['cell_text'] = []
+
+
+# ______________________resize_framebuffer______________________
+def resize_framebuffer(framebuffer: dict[str, Any], rows: int, columns: int) -> bool:
+    """
+    Change the size of a framebuffer. The arrays are only reallocated if the size is different.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        rows (int): Amount of rows.
+        columns (int): Amount of columns.
+
+    Returns:
+        bool: True if the size changed (all cells are empty after that).
+    """
+    if framebuffer['rows'] == rows and framebuffer['columns'] == columns:
+        return False
+    framebuffer['rows'] = rows
+    framebuffer['columns'] = columns
+    framebuffer['glyphs'] = array.array('I', [EMPTY_GLYPH]) * (rows * columns)
+    framebuffer['colors'] = array.array('I', [NO_COLOR]) * (rows * columns)
+    return True
+
+
+# ______________________set_palette______________________
+def set_palette(framebuffer: dict[str, Any], palette: Any) -> None:
+    """
+    Tell the framebuffer which palette tables the colors come from.
+
+    When the palette tables are replaced, the color ids of the old ones are forgotten,
+    so the color table doesn't keep growing when the colors are changed.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        palette: Any object that is replaced when the colors change (compared with "is").
+    """
+    if framebuffer['palette'] is not palette:
+        reset_tables(framebuffer)
+        framebuffer['palette'] = palette
+
+
+# ______________________update_cell_text______________________
+def update_cell_text(framebuffer: dict[str, Any]) -> list[list[str]]:
+    """
+    Make the text of the cells with glyph or color ids that were added since the last call.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+
+    Returns:
+        list: A list for every color id with the text of the cell with every glyph id.
+    """
+    cell_text: list[list[str]] = framebuffer['cell_text']
+    glyph_table: list[str] = framebuffer['glyph_ids'].keys_by_id
+    color_table: list[str] = framebuffer['color_ids'].keys_by_id
+    if len(cell_text) == len(color_table) and (not cell_text or len(cell_text[0]) == len(glyph_table)):
+        return cell_text
+
+    for color_id, color in enumerate(color_table):
+        if color_id == len(cell_text):
+            cell_text.append([])
+        texts = cell_text[color_id]
+        for glyph in glyph_table[len(texts):]:
+            # \u001b[0m just resets the color (it isn't visible in the rain)
+            if color_id == NO_COLOR:
+                texts.append(glyph)
+            elif color_id == HIDDEN_COLOR:
+                texts.append(' ')
+            else:
+                texts.append(f"{color}{glyph}{RESET_COLOR}")
+    return cell_text
+
+
+# ______________________encode_rows______________________
+def encode_rows(framebuffer: dict[str, Any], first_row: int = 0, end_row: int | None = None) -> list[str]:
+    """
+    Turn the cells of a framebuffer into one string per row.
+
+    Only reads the framebuffer once update_cell_text() is up to date, so bands of rows can be encoded
+    by several threads at the same time.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        first_row (int): First row to encode.
+        end_row (int, optional): Row after the last row to encode (all rows if None).
+
+    Returns:
+        list: A string for every row.
+    """
+    if end_row is None:
+        end_row = framebuffer['rows']
+    columns: int = framebuffer['columns']
+    glyphs: array.array = framebuffer['glyphs']
+    colors: array.array = framebuffer['colors']
+    get_texts = update_cell_text(framebuffer).__getitem__
+    get_item = operator.getitem
+    rows: list[str] = []
+
+    for start in range(first_row * columns, end_row * columns, columns):
+        texts = map(get_texts, colors[start:start + columns])
+        rows.append(''.join(map(get_item, texts, glyphs[start:start + columns])))
+    return rows
+
+
+# ______________________encode_framebuffer______________________
+def encode_framebuffer(framebuffer: dict[str, Any], encoding: str = 'utf-8') -> bytes:
+    """
+    Serialize a framebuffer to the bytes that draw it in the terminal, starting at the top left corner.
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        encoding (str): Encoding of the terminal.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    # \u001b[H moves the cursor to row and column 0
+    return ("\u001b[H" + "\n".join(encode_rows(framebuffer)) + "\n").encode(encoding, errors='replace')
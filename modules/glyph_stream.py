@@ -0,0 +1,41 @@
+import random
+import itertools
+from typing import Iterator
+
+# how many random characters are made at once
+GLYPH_BUFFER_SIZE = 4096
+
+
+# ______________________make_glyph_stream______________________
+def make_glyph_stream(characters: tuple[str, ...] | str, buffer_size: int = GLYPH_BUFFER_SIZE) -> Iterator[str]:
+    """
+    Make an endless stream of random characters.
+
+    The characters are made buffer_size at a time with random.choices(), which is a lot faster than calling
+    random.choice() for every character. A new buffer is only made when the last one was used up.
+    Get one character with next() (or the stream's __next__ method) and many with take_glyphs().
+
+    Args:
+        characters (tuple or str): The characters to choose from.
+        buffer_size (int): How many characters are made at once.
+
+    Returns:
+        Iterator: The stream of characters.
+    """
+    while True:
+        yield from random.choices(characters, k=buffer_size)
+
+
+# ______________________take_glyphs______________________
+def take_glyphs(glyphs: Iterator[str], amount: int) -> itertools.islice:
+    """
+    Take the next characters of a glyph stream.
+
+    Args:
+        glyphs (Iterator): Stream made by make_glyph_stream().
+        amount (int): How many characters to take.
+
+    Returns:
+        Iterator: The characters (for example for list() or list.extend()).
+    """
+    return itertools.islice(glyphs, amount)
@@ -0,0 +1,26 @@
+import collections
+import threading
+
+
+# ______________________KeyEvents______________________
+class KeyEvents(collections.deque):
+    """
+    Queue of typed characters and key names filled by the keyboard backends.
+
+    Adding an event (or calling notify() when a key is released) sets the `wake` event, so code that waits
+    for keyboard input can block on it instead of checking the pressed keys in a loop.
+
+    Args:
+        maxlen (int): Maximum number of events that are kept.
+    """
+    def __init__(self, maxlen: int = 256):
+        super().__init__(maxlen=maxlen)
+        self.wake = threading.Event()
+
+    def append(self, key: str) -> None:
+        super().append(key)
+        self.wake.set()
+
+    def notify(self) -> None:
+        """Wake up the waiting code without adding an event (for example when a key is released)."""
+        self.wake.set()
@@ -0,0 +1,249 @@
+import os
+import time
+import threading
+import collections
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Any
+
+# frame times used for the percentiles and the frame rate
+FRAME_WINDOW = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+# ______________________make_metrics______________________
+def make_metrics() -> dict[str, Any]:
+    """
+    Create the counters that are served by the metrics server (see start_metrics_server()).
+
+    run_matrix() adds every frame with record_frame(), the server thread only reads the counters while holding
+    the lock, so neither of them ever waits for more than a copy of the counters.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'lock': lock for all other keys,
+              - 'frames', 'rendered', 'dropped', 'late': amount of frames, drawn frames, frames that weren't drawn
+                (skipped by the quality governor or caught up on by the time based simulation) and frames that took
+                longer than time_between_frames,
+              - 'frame_seconds': total time of all frames,
+              - 'recent': (start time, frame time) of the last FRAME_WINDOW frames,
+              - 'bytes': bytes written to the terminal,
+              - 'sequences': sequences in the rain after the last frame,
+              - 'quality_level': quality level of the last frame.
+    """
+    return {'lock': threading.Lock(),
+            'frames': 0,
+            'rendered': 0,
+            'dropped': 0,
+            'late': 0,
+            'frame_seconds': 0.0,
+            'recent': collections.deque(maxlen=FRAME_WINDOW),
+            'bytes': 0,
+            'sequences': 0,
+            'quality_level': 0}
+
+
+# ______________________record_frame______________________
+def record_frame(metrics: dict[str, Any], start_time: float, frame_time: float, budget: float, written: int | None,
+                 sequences: int, quality_level: int, skipped_steps: int = 0) -> None:
+    """
+    Add a frame to the metrics.
+
+    A frame that wasn't drawn and every simulation step that was never shown count as dropped frames.
+
+    Args:
+        metrics (dict): Metrics created by make_metrics().
+        start_time (float): time.time() at the start of the frame.
+        frame_time (float): Seconds it took to update and draw the frame (without waiting for the next one).
+        budget (float): time_between_frames.
+        written (int): Bytes written to the terminal or None if the frame wasn't drawn.
+        sequences (int): Sequences in the rain.
+        quality_level (int): Quality level the frame was made with.
+        skipped_steps (int): Simulation steps of the time based simulation that weren't shown, because several
+                             steps ran before this frame or the simulation fell too far behind.
+    """
+    with metrics['lock']:
+        metrics['frames'] += 1
+        metrics['dropped'] += skipped_steps
+        if written is None:
+            metrics['dropped'] += 1
+        else:
+            metrics['rendered'] += 1
+            metrics['bytes'] += written
+        if frame_time > budget:
+            metrics['late'] += 1
+        metrics['frame_seconds'] += frame_time
+        metrics['recent'].append((start_time, frame_time))
+        metrics['sequences'] = sequences
+        metrics['quality_level'] = quality_level
+
+
+# ______________________get_process_usage______________________
+def get_process_usage() -> tuple[int | None, float]:
+    """
+    Get the memory and CPU time used by this process.
+
+    Returns:
+        tuple: (resident memory in bytes or None if it isn't known, CPU seconds).
+    """
+    rss = None
+    try:
+        with open('/proc/self/statm') as file:
+            rss = int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+            # the highest resident memory, in kilobytes on Linux and bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss = max_rss if os.uname().sysname == 'Darwin' else max_rss * 1024
+        except (ImportError, OSError):
+            pass
+    return rss, time.process_time()
+
+
+# ______________________format_metrics______________________
+def format_metrics(metrics: dict[str, Any], color_cache: dict[str, Any] | None = None) -> str:
+    """
+    Make the Prometheus text format of the metrics.
+
+    Args:
+        metrics (dict): Metrics created by make_metrics().
+        color_cache (dict, optional): Cache created by make_color_cache(), for the cache counters.
+
+    Returns:
+        str: The metrics.
+    """
+    with metrics['lock']:
+        values = {key: value for key, value in metrics.items() if key not in ('lock', 'recent')}
+        recent = list(metrics['recent'])
+
+    lines: list[str] = []
+
+    def add(name: str, metric_type: str, help_text: str, value) -> None:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {value}')
+
+    add('matrix_rain_frames_total', 'counter', 'Frames that were updated.', values['frames'])
+    add('matrix_rain_rendered_frames_total', 'counter', 'Frames that were drawn.', values['rendered'])
+    add('matrix_rain_dropped_frames_total', 'counter',
+        "Frames that weren't drawn (skipped by the quality governor or caught up on by the time based simulation).",
+        values['dropped'])
+    add('matrix_rain_late_frames_total', 'counter', 'Frames that took longer than time_between_frames.', values['late'])
+    add('matrix_rain_written_bytes_total', 'counter', 'Bytes written to the terminal.', values['bytes'])
+
+    frame_times = sorted(frame_time for _, frame_time in recent)
+    lines.append('# HELP matrix_rain_frame_seconds Time to update and draw a frame '
+                 f'(quantiles of the last {FRAME_WINDOW} frames).')
+    lines.append('# TYPE matrix_rain_frame_seconds summary')
+    for quantile in QUANTILES:
+        value = frame_times[min(int(quantile * len(frame_times)), len(frame_times) - 1)] if frame_times else 'NaN'
+        lines.append(f'matrix_rain_frame_seconds{{quantile="{quantile}"}} {value}')
+    lines.append(f"matrix_rain_frame_seconds_sum {values['frame_seconds']}")
+    lines.append(f"matrix_rain_frame_seconds_count {values['frames']}")
+
+    # frames per second between the start of the first and the last recent frame
+    frame_rate = (len(recent) - 1) / (recent[-1][0] - recent[0][0]) if len(recent) > 1 and recent[-1][0] > recent[0][0] else 0
+    add('matrix_rain_frames_per_second', 'gauge', f'Frame rate over the last {FRAME_WINDOW} frames.', round(frame_rate, 3))
+    add('matrix_rain_sequences', 'gauge', 'Sequences in the rain.', values['sequences'])
+    add('matrix_rain_quality_level', 'gauge', 'Quality level of the quality governor (0 = full quality).',
+        values['quality_level'])
+
+    if color_cache is not None:
+        hits, misses = color_cache['hits'], color_cache['misses']
+        add('matrix_rain_color_cache_hits_total', 'counter', 'Color gradient cache hits.', hits)
+        add('matrix_rain_color_cache_misses_total', 'counter', 'Color gradient cache misses.', misses)
+        add('matrix_rain_color_cache_evictions_total', 'counter', 'Color gradients evicted from the cache.',
+            color_cache['evictions'])
+        add('matrix_rain_color_cache_hit_ratio', 'gauge', 'Share of color gradient lookups that were cache hits.',
+            round(hits / (hits + misses), 6) if hits + misses else 0)
+
+    rss, cpu_seconds = get_process_usage()
+    if rss is not None:
+        add('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.', rss)
+    add('process_cpu_seconds_total', 'counter', 'User and system CPU time in seconds.', round(cpu_seconds, 6))
+    return '\n'.join(lines) + '\n'
+
+
+# ______________________MetricsHandler______________________
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Answers GET /metrics with format_metrics() of the server's metrics."""
+
+    def do_GET(self) -> None:
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = format_metrics(self.server.metrics, self.server.config['extended_color_cache']).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # printing would draw over the rain
+
+
+# ______________________start_metrics_server______________________
+def start_metrics_server(metrics: dict[str, Any], config: dict[str, Any], port: int, address: str = '127.0.0.1') -> HTTPServer:
+    """
+    Serve the metrics on http://address:port/metrics from a background thread.
+
+    Args:
+        metrics (dict): Metrics created by make_metrics().
+        config (dict): Configuration dictionary (for the color cache counters).
+        port (int): Port to listen on.
+        address (str): Address to listen on (only this computer by default).
+
+    Returns:
+        HTTPServer: The server (stop it with stop_metrics_server()).
+
+    Raises:
+        OSError: If the port can't be used.
+    """
+    server = HTTPServer((address, port), MetricsHandler)
+    server.metrics = metrics
+    server.config = config
+    threading.Thread(target=server.serve_forever, name='metrics_server', daemon=True).start()
+    return server
+
+
+# ______________________update_metrics_server______________________
+def update_metrics_server(server: HTTPServer | None, metrics: dict[str, Any], config: dict[str, Any]) -> HTTPServer | None:
+    """
+    Start, stop or move the metrics server when the metrics_port setting changed.
+
+    If the port can't be used, it isn't tried again until the setting changes.
+
+    Args:
+        server (HTTPServer): The running server or None.
+        metrics (dict): Metrics created by make_metrics(), 'port' is set to the port that was last tried.
+        config (dict): Configuration dictionary containing metrics_port (0 = off).
+
+    Returns:
+        HTTPServer: The running server or None.
+    """
+    port = config['metrics_port']
+    if metrics.get('port') == port:
+        return server
+    stop_metrics_server(server)
+    server = None
+    metrics['port'] = port
+    if port:
+        try:
+            server = start_metrics_server(metrics, config, port)
+        except OSError:
+            pass
+    return server
+
+
+# ______________________stop_metrics_server______________________
+def stop_metrics_server(server: HTTPServer | None) -> None:
+    """
+    Stop a server started by start_metrics_server().
+
+    Args:
+        server (HTTPServer): The server or None.
+    """
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,251 @@
+import time
+from typing import Any, Callable
+
+# effects of an overlay span
+EFFECTS = ('none', 'clock', 'blink', 'reveal')
+BLINK_INTERVAL = 0.5
+
+
+# ______________________make_overlay______________________
+def make_overlay() -> dict[str, Any]:
+    """
+    Create the state of the overlay layer.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'key': what the cached cells were made from,
+              - 'cells': the cached cells {(row, column): (glyph, color)},
+              - 'revealed': the cells of "reveal" spans the rain already went through, by span index,
+              - 'spans': the spans 'revealed' belongs to,
+              - 'shown': the cells that were written by sparse_overlay_output().
+    """
+    return {'key': None,
+            'cells': {},
+            'revealed': {},
+            'spans': None,
+            'shown': {}}
+
+
+# ______________________validate_overlays______________________
+def validate_overlays(overlays: Any) -> list[dict[str, Any]]:
+    """
+    Check the "overlays" setting, so a wrong span is found when the config is loaded instead of in every frame.
+
+    Args:
+        overlays: The value of the setting.
+
+    Returns:
+        list: The same list.
+
+    Raises:
+        ValueError: If the setting isn't a list of spans or a span has a wrong value.
+    """
+    if not isinstance(overlays, list):
+        raise ValueError(f'"overlays" has to be a list, not {type(overlays).__name__}')
+    for index, span in enumerate(overlays):
+        if not isinstance(span, dict):
+            raise ValueError(f'overlay {index} has to be an object, not {type(span).__name__}')
+        for name in ('text', 'color'):
+            if name in span and not isinstance(span[name], str):
+                raise ValueError(f'"{name}" of overlay {index} has to be of type str, not {type(span[name]).__name__}')
+        for name in ('row', 'column'):
+            value = span.get(name)
+            # bool is a subclass of int, so it isn't accepted as a number
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                raise ValueError(f'"{name}" of overlay {index} has to be of type int, not {type(value).__name__}')
+        if span.get('effect', 'none') not in EFFECTS:
+            raise ValueError(f'''"effect" of overlay {index} has to be one of {', '.join(EFFECTS)}, not "{span['effect']}"''')
+        if 'interval' in span:
+            interval = span['interval']
+            if not isinstance(interval, (int, float)) or isinstance(interval, bool) or not interval > 0:
+                raise ValueError(f'"interval" of overlay {index} has to be a number greater than 0, not {interval!r}')
+    return overlays
+
+
+# ______________________get_span_text______________________
+def get_span_text(span: dict[str, Any], now: float) -> str:
+    """
+    Get the text that a span shows right now.
+
+    Args:
+        span (dict): Overlay span from the config.
+        now (float): Current time.
+
+    Returns:
+        str: The text of the span ('' if a blinking span is hidden).
+    """
+    effect = span.get('effect', 'none')
+    if effect == 'clock':
+        return time.strftime(span.get('text') or '%H:%M:%S', time.localtime(now))
+    if effect == 'blink' and int(now / span.get('interval', BLINK_INTERVAL)) % 2 == 1:
+        return ''
+    return str(span.get('text', ''))
+
+
+# ______________________get_span_cells______________________
+def get_span_cells(span: dict[str, Any], text: str, config: dict[str, Any]) -> list[tuple[int, int, str]]:
+    """
+    Find where the characters of a span's text go. Every line of the text is a row.
+
+    A missing row or column centers the text, negative values count from the bottom or right side.
+
+    Args:
+        span (dict): Overlay span from the config.
+        text (str): The text of the span.
+        config (dict): Configuration dictionary containing the size.
+
+    Returns:
+        list: (row, column, character) for every character that is on the screen (spaces included).
+    """
+    lines = text.split('\n')
+    rows: int = config['amount_of_rows']
+    columns: int = config['amount_of_columns']
+    first_row = span.get('row')
+    if first_row is None:
+        first_row = (rows - len(lines)) // 2
+    elif first_row < 0:
+        first_row += rows
+
+    cells: list[tuple[int, int, str]] = []
+    for line_index, line in enumerate(lines):
+        row = first_row + line_index
+        if not 0 <= row < rows:
+            continue
+        first_column = span.get('column')
+        if first_column is None:
+            first_column = (columns - len(line)) // 2
+        elif first_column < 0:
+            first_column += columns
+        for char_index, char in enumerate(line):
+            if 0 <= first_column + char_index < columns:
+                cells.append((row, first_column + char_index, char))
+    return cells
+
+
+# ______________________update_reveal______________________
+def update_reveal(revealed: set[tuple[int, int]], cells: list[tuple[int, int, str]], columns: list[list[dict[str, Any]]]) -> bool:
+    """
+    Mark the cells of a "reveal" span that a sequence is covering right now.
+
+    Only the columns of the span's cells are checked, so the cost depends on the size of the span.
+
+    Args:
+        revealed (set): Cells (row, column) that were already revealed.
+        cells (list): Cells of the span made by get_span_cells().
+        columns (list): List of columns, where each column is a list of sequences.
+
+    Returns:
+        bool: True if a cell was revealed.
+    """
+    changed = False
+    for row, column_index, _ in cells:
+        if (row, column_index) in revealed or column_index >= len(columns):
+            continue
+        for sequence in columns[column_index]:
+            seq_bottom = int(sequence['final_char'] + 0.5)
+            if seq_bottom - len(sequence['chars']) < row <= seq_bottom:
+                revealed.add((row, column_index))
+                changed = True
+                break
+    return changed
+
+
+# ______________________update_overlay______________________
+def update_overlay(overlay: dict[str, Any], columns: list[list[dict[str, Any]]], config: dict[str, Any], now: float) -> dict[tuple[int, int], tuple[str, str]]:
+    """
+    Get the cells of the overlay for the current frame.
+
+    The cells are only made again when the text of a span, the size or the revealed cells changed,
+    otherwise the cached cells are returned (the same dictionary).
+
+    Args:
+        overlay (dict): Overlay state created by make_overlay().
+        columns (list): List of columns, where each column is a list of sequences.
+        config (dict): Configuration dictionary containing the overlays and the size.
+        now (float): Current time.
+
+    Returns:
+        dict: {(row, column): (glyph, color)} for every cell covered by the overlay. Spaces in the text
+              are cells too, so text stays readable on top of the rain.
+    """
+    spans: list[dict[str, Any]] = config['overlays']
+    if overlay['spans'] != spans:
+        overlay['spans'] = [dict(span) for span in spans]
+        overlay['revealed'] = {}
+
+    texts = tuple(get_span_text(span, now) for span in spans)
+    revealed_changed = False
+    reveal_cells: dict[int, list[tuple[int, int, str]]] = {}
+    for index, span in enumerate(spans):
+        if span.get('effect') == 'reveal':
+            reveal_cells[index] = get_span_cells(span, texts[index], config)
+            revealed = overlay['revealed'].setdefault(index, set())
+            revealed_changed |= update_reveal(revealed, reveal_cells[index], columns)
+
+    key = (texts, config['amount_of_rows'], config['amount_of_columns'])
+    if key == overlay['key'] and not revealed_changed:
+        return overlay['cells']
+
+    cells: dict[tuple[int, int], tuple[str, str]] = {}
+    for index, span in enumerate(spans):
+        color = span.get('color') or config['colors'][0]
+        span_cells = reveal_cells.get(index) or get_span_cells(span, texts[index], config)
+        revealed = overlay['revealed'].get(index)
+        for row, column_index, char in span_cells:
+            if revealed is None or (row, column_index) in revealed:
+                cells[(row, column_index)] = (char, color)
+    overlay['key'] = key
+    overlay['cells'] = cells
+    return cells
+
+
+# ______________________paint_overlay______________________
+def paint_overlay(framebuffer: dict[str, Any], cells: dict[tuple[int, int], tuple[str, str]]) -> None:
+    """
+    Draw the overlay cells on top of a painted framebuffer (see modules/framebuffer.py).
+
+    Args:
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        cells (dict): Cells made by update_overlay().
+    """
+    columns: int = framebuffer['columns']
+    glyphs = framebuffer['glyphs']
+    colors = framebuffer['colors']
+    glyph_ids = framebuffer['glyph_ids']
+    color_ids = framebuffer['color_ids']
+    for (row, column_index), (glyph, color) in cells.items():
+        if row < framebuffer['rows'] and column_index < columns:
+            glyphs[row * columns + column_index] = glyph_ids[glyph]
+            colors[row * columns + column_index] = color_ids[color]
+
+
+# ______________________sparse_overlay_output______________________
+def sparse_overlay_output(overlay: dict[str, Any], cells: dict[tuple[int, int], tuple[str, str]], redraw: bool, rain_cell: Callable[[int, int], str]) -> str:
+    """
+    Make the output that updates the overlay for the sparse render mode.
+
+    Only the cells that changed since the last call are written. Cells that aren't covered by the
+    overlay anymore get the rain back.
+
+    Args:
+        overlay (dict): Overlay state created by make_overlay().
+        cells (dict): Cells made by update_overlay().
+        redraw (bool): If True, all cells are written (the screen was drawn again).
+        rain_cell (Callable): Function that returns what the rain shows in a cell (row, column).
+
+    Returns:
+        str: Text to write to the terminal after the rain.
+    """
+    shown: dict[tuple[int, int], tuple[str, str]] = overlay['shown']
+    if shown is cells and not redraw:
+        return ''
+
+    output: list[str] = []
+    for position in shown:
+        if position not in cells:
+            output.append(f"\u001b[{position[0] + 1};{position[1] + 1}H{rain_cell(*position)}")
+    for position, cell in cells.items():
+        if redraw or shown.get(position) != cell:
+            output.append(f"\u001b[{position[0] + 1};{position[1] + 1}H{cell[1]}{cell[0]}\u001b[0m")
+    overlay['shown'] = cells
+    return ''.join(output)
@@ -0,0 +1,257 @@
+from typing import Any, Generator
+
+# A flow is a generator that yields the text to show before each answer it needs (like print() followed by
+# input()) and gets the answer back from send(). When it returns, its return value is kept in the panel.
+# If it yields a KeyRequest instead of a string, the answer is the next pressed key.
+Flow = Generator['str | KeyRequest', str, Any]
+
+PANEL_COLOR = "\u001b[38;2;255;255;255m"
+PROMPT = '> '
+CURSOR = '_'
+# names of keys that type a character (the backends use single characters for all other typed keys)
+TYPED_KEYS = {'space': ' ', 'tab': ' '}
+SUBMIT_KEYS = ('enter', 'return')
+DELETE_KEYS = ('backspace',)
+CANCEL_KEYS = ('esc', 'escape')
+SCROLL_UP_KEYS = ('up', 'page up', 'page_up')
+SCROLL_DOWN_KEYS = ('down', 'page down', 'page_down')
+MAX_LINES = 500
+
+
+# ______________________KeyRequest______________________
+class KeyRequest:
+    """
+    Yielded by a flow that wants the next pressed key (its name, as used in the controls) instead of a line.
+
+    Args:
+        text (str): The text to show before waiting for the key.
+    """
+    def __init__(self, text: str):
+        self.text = text
+
+
+# ______________________make_prompt_panel______________________
+def make_prompt_panel() -> dict[str, Any]:
+    """
+    Create the state of the in-frame prompt panel.
+
+    The panel runs one flow at a time. It is drawn on top of the rain (as overlay cells) and gets the typed
+    keys from the key event queue, so the rain keeps running while the user answers.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'flow': the running flow or None,
+              - 'lines': the text shown so far (the yielded text and the answers),
+              - 'input': the answer being typed,
+              - 'wants_key': True if the flow waits for a single key (see KeyRequest),
+              - 'scroll': how many lines the view is moved up from the bottom,
+              - 'result': the return value of the last finished flow,
+              - 'finished': True if a flow finished since the last call of take_result(),
+              - 'version': changes whenever 'lines' changes,
+              - 'key', 'cells': the cached cells and what they were made from.
+    """
+    return {'flow': None,
+            'lines': [],
+            'input': '',
+            'wants_key': False,
+            'scroll': 0,
+            'result': None,
+            'finished': False,
+            'version': 0,
+            'key': None,
+            'cells': {}}
+
+
+# ______________________start_flow______________________
+def start_flow(panel: dict[str, Any], flow: Flow) -> None:
+    """
+    Open the panel with a new flow (a running flow is closed first).
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+        flow (generator): The flow to run.
+    """
+    if panel['flow'] is not None:
+        panel['flow'].close()
+    panel['flow'] = flow
+    panel['lines'] = []
+    panel['input'] = ''
+    panel['scroll'] = 0
+    send_answer(panel, None)
+
+
+# ______________________send_answer______________________
+def send_answer(panel: dict[str, Any], answer: str | None) -> None:
+    """
+    Give an answer to the running flow and show the text it yields next.
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+        answer (str): The typed answer (None starts the flow).
+    """
+    try:
+        text = panel['flow'].send(answer)
+    except StopIteration as stop:
+        panel['flow'] = None
+        panel['result'] = stop.value
+        panel['finished'] = True
+        return
+    panel['wants_key'] = isinstance(text, KeyRequest)
+    if panel['wants_key']:
+        text = text.text
+    panel['lines'].extend(str(text).split('\n'))
+    del panel['lines'][:-MAX_LINES]
+    panel['version'] += 1
+    panel['scroll'] = 0
+
+
+# ______________________panel_is_open______________________
+def panel_is_open(panel: dict[str, Any]) -> bool:
+    """
+    Check if a flow is running.
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+
+    Returns:
+        bool: True if the panel is shown and takes the keyboard input.
+    """
+    return panel['flow'] is not None
+
+
+# ______________________take_result______________________
+def take_result(panel: dict[str, Any]) -> tuple[bool, Any]:
+    """
+    Get the return value of the flow that finished since the last call.
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+
+    Returns:
+        tuple: (finished, result) where finished is False if no flow finished.
+    """
+    finished = panel['finished']
+    panel['finished'] = False
+    return finished, panel['result'] if finished else None
+
+
+# ______________________handle_key_event______________________
+def handle_key_event(panel: dict[str, Any], key: str) -> None:
+    """
+    Edit the answer being typed based on a key event.
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+        key (str): A typed character or the name of a key (enter, backspace, esc, up, down...).
+    """
+    if panel['flow'] is None:
+        return
+    if panel['wants_key']:
+        send_answer(panel, key.lower() if len(key) == 1 else key)
+    elif key in SUBMIT_KEYS:
+        answer = panel['input']
+        panel['input'] = ''
+        panel['lines'].append(PROMPT + answer)
+        panel['version'] += 1
+        send_answer(panel, answer)
+    elif key in DELETE_KEYS:
+        panel['input'] = panel['input'][:-1]
+    elif key in CANCEL_KEYS:
+        panel['flow'].close()
+        panel['flow'] = None
+        panel['result'] = None
+        panel['finished'] = True
+    elif key in SCROLL_UP_KEYS:
+        panel['scroll'] += 1
+    elif key in SCROLL_DOWN_KEYS:
+        panel['scroll'] = max(panel['scroll'] - 1, 0)
+    elif key in TYPED_KEYS:
+        panel['input'] += TYPED_KEYS[key]
+    elif len(key) == 1 and key.isprintable():
+        panel['input'] += key
+
+
+# ______________________wrap_line______________________
+def wrap_line(line: str, width: int) -> list[str]:
+    """
+    Split a line into parts that fit the panel.
+
+    Args:
+        line (str): The line.
+        width (int): Width of the panel.
+
+    Returns:
+        list: The parts of the line (at least one).
+    """
+    if width <= 0:
+        return []
+    return [line[start:start + width] for start in range(0, len(line), width)] or ['']
+
+
+# ______________________get_panel_cells______________________
+def get_panel_cells(panel: dict[str, Any], config: dict[str, Any]) -> dict[tuple[int, int], tuple[str, str]]:
+    """
+    Get the cells of the panel in the same format as the overlay cells (see modules/overlay.py).
+
+    The panel covers the rows at the bottom of the rain that are needed for its text (up to all rows),
+    with every cell of these rows, so the rain doesn't make the text hard to read. The cells are only
+    made again when the text, the typed answer, the scroll position or the size changed.
+
+    Args:
+        panel (dict): Panel state created by make_prompt_panel().
+        config (dict): Configuration dictionary containing the size.
+
+    Returns:
+        dict: {(row, column): (glyph, color)} ({} if the panel is closed).
+    """
+    if panel['flow'] is None:
+        return {}
+    rows: int = config['amount_of_rows']
+    width: int = config['amount_of_columns']
+    key = (panel['version'], panel['input'], panel['scroll'], rows, width)
+    if key == panel['key']:
+        return panel['cells']
+
+    wrapped: list[str] = []
+    for line in panel['lines']:
+        wrapped.extend(wrap_line(line, width))
+    if not panel['wants_key']:
+        wrapped.extend(wrap_line(PROMPT + panel['input'] + CURSOR, width))
+    panel['scroll'] = min(panel['scroll'], max(len(wrapped) - rows, 0))
+    visible = wrapped[max(len(wrapped) - rows - panel['scroll'], 0):len(wrapped) - panel['scroll']]
+
+    cells: dict[tuple[int, int], tuple[str, str]] = {}
+    first_row = rows - len(visible)
+    for line_index, line in enumerate(visible):
+        for column_index in range(width):
+            glyph = line[column_index] if column_index < len(line) else ' '
+            cells[(first_row + line_index, column_index)] = (glyph, PANEL_COLOR)
+    panel['key'] = key
+    panel['cells'] = cells
+    return cells
+
+
+# ______________________run_flow_blocking______________________
+def run_flow_blocking(flow: Flow) -> Any:
+    """
+    Run a flow in the terminal with print() and input(), for places where the rain isn't running.
+
+    Args:
+        flow (generator): The flow to run.
+
+    Returns:
+        The return value of the flow.
+    """
+    answer = None
+    while True:
+        try:
+            text = flow.send(answer)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(text, KeyRequest):
+            # without a key listener the key is entered as text
+            print(text.text)
+            answer = input(PROMPT).strip()
+        else:
+            print(text)
+            answer = input(PROMPT)
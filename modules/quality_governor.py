@@ -0,0 +1,138 @@
+from typing import Any
+
+# each level keeps the reductions of the levels before it
+QUALITY_LEVELS = (
+    "full quality",
+    "fewer random character changes",
+    "no random character changes",
+    "fewer new background sequences",
+    "space between columns",
+    "rendering every other frame",
+)
+
+# the frame cost is compared to time_between_frames (the frame budget)
+DEGRADE_THRESHOLD = 0.9
+RESTORE_THRESHOLD = 0.45
+FRAMES_TO_DEGRADE = 10
+FRAMES_TO_RESTORE = 60
+SMOOTHING = 0.2
+# share of the background sequences that are still made at the "fewer new background sequences" level
+BACKGROUND_SHARE = 0.5
+# the level that only renders every other frame: its average cost is about half of the cost one level lower, so
+# it is only left when the cost stays below a smaller share of the budget for longer (or it is left and entered
+# again all the time)
+RENDER_SKIP_LEVEL = 5
+RENDER_SKIP_RESTORE_THRESHOLD = RESTORE_THRESHOLD / 2
+FRAMES_TO_RESTORE_RENDERING = 3 * FRAMES_TO_RESTORE
+
+
+# ______________________make_governor______________________
+def make_governor() -> dict[str, Any]:
+    """
+    Create the state used by the quality governor.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'level': current degradation level (index into QUALITY_LEVELS),
+              - 'average_cost': smoothed frame cost in seconds,
+              - 'over_budget': consecutive frames above the degrade threshold,
+              - 'under_budget': consecutive frames below the restore threshold.
+    """
+    return {'level': 0,
+            'average_cost': 0.0,
+            'over_budget': 0,
+            'under_budget': 0}
+
+
+# ______________________update_governor______________________
+def update_governor(governor: dict[str, Any], frame_cost: float, frame_budget: float) -> bool:
+    """
+    Feed the measured cost of a frame to the governor and change the degradation level if necessary.
+
+    The level only goes up after the smoothed cost stays above the budget for FRAMES_TO_DEGRADE frames
+    and only goes down after it stays well below the budget for FRAMES_TO_RESTORE frames,
+    so the quality doesn't flicker between two levels. RENDER_SKIP_LEVEL needs a lower cost for longer.
+
+    Args:
+        governor (dict): Governor state created by make_governor().
+        frame_cost (float): Time in seconds spent updating and rendering the last frame (without sleeping).
+        frame_budget (float): Time in seconds a frame is allowed to take (time_between_frames).
+
+    Returns:
+        bool: True if the degradation level changed.
+    """
+    governor['average_cost'] += (frame_cost - governor['average_cost']) * SMOOTHING
+    skips_renders = governor['level'] >= RENDER_SKIP_LEVEL
+    restore_threshold = RENDER_SKIP_RESTORE_THRESHOLD if skips_renders else RESTORE_THRESHOLD
+    frames_to_restore = FRAMES_TO_RESTORE_RENDERING if skips_renders else FRAMES_TO_RESTORE
+
+    if governor['average_cost'] > frame_budget * DEGRADE_THRESHOLD:
+        governor['over_budget'] += 1
+        governor['under_budget'] = 0
+    elif governor['average_cost'] < frame_budget * restore_threshold:
+        governor['under_budget'] += 1
+        governor['over_budget'] = 0
+    else:
+        governor['over_budget'] = 0
+        governor['under_budget'] = 0
+
+    if governor['over_budget'] >= FRAMES_TO_DEGRADE and governor['level'] < len(QUALITY_LEVELS) - 1:
+        governor['level'] += 1
+    elif governor['under_budget'] >= frames_to_restore and governor['level'] > 0:
+        governor['level'] -= 1
+    else:
+        return False
+
+    governor['over_budget'] = 0
+    governor['under_budget'] = 0
+    return True
+
+
+# ______________________apply_quality_level______________________
+def apply_quality_level(config: dict[str, Any], level: int) -> dict[str, Any]:
+    """
+    Return the configuration that should be used for a frame at the given degradation level.
+
+    The original configuration is never changed, so the reductions are undone as soon as the level drops
+    and saving the config doesn't store the reduced values.
+
+    Args:
+        config (dict): Configuration dictionary.
+        level (int): Degradation level (index into QUALITY_LEVELS).
+
+    Returns:
+        dict: The original config for level 0, otherwise a shallow copy with the reduced values.
+    """
+    if level <= 0:
+        return config
+
+    frame_config = dict(config)
+    if level >= 1:
+        frame_config['random_char_change_chance'] = config['random_char_change_chance'] / 2
+    if level >= 2:
+        frame_config['random_char_change_chance'] = 0
+    if level >= 3:
+        # keep the amount of bright sequences the same and only make BACKGROUND_SHARE of the background ones
+        # (so a rain that only has background sequences doesn't stop)
+        background_chance = config['background_chance']
+        kept_share = 1 - background_chance + background_chance * BACKGROUND_SHARE
+        frame_config['new_sequence_chance'] = config['new_sequence_chance'] * kept_share
+        frame_config['background_chance'] = background_chance * BACKGROUND_SHARE / kept_share if kept_share else 0
+    if level >= 4:
+        frame_config['space_between_columns'] = True
+    return frame_config
+
+
+# ______________________should_render______________________
+def should_render(level: int, frame_number: int) -> bool:
+    """
+    Check if a frame should be written to the terminal at the given degradation level.
+
+    Args:
+        level (int): Degradation level (index into QUALITY_LEVELS).
+        frame_number (int): Number of the current frame.
+
+    Returns:
+        bool: False if the frame should only be simulated.
+    """
+    return level < RENDER_SKIP_LEVEL or frame_number % 2 == 0
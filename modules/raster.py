@@ -0,0 +1,379 @@
+import os
+import random
+from typing import Any, BinaryIO
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+from modules.ansi_color_funcs import parse_ansi_color
+
+# font files that are looked for after the given font, in this order; a character is drawn with the first of them
+# that has it (most monospace fonts don't have the katakana of the default characters, the CJK fonts do)
+FONT_FILES = ('DejaVuSansMono.ttf', 'LiberationMono-Regular.ttf', 'NotoSansMono-Regular.ttf', 'consola.ttf',
+              'Menlo.ttc', 'NotoSansCJK-Regular.ttc', 'NotoSansMonoCJKjp-Regular.otf', 'NotoSansJP-Regular.otf',
+              'msgothic.ttc', 'YuGothR.ttc', 'ヒラギノ角ゴシック W3.ttc', 'Osaka.ttf', 'unifont.ttf')
+FONT_DIRS = ('/usr/share/fonts', '/usr/local/share/fonts', '~/.local/share/fonts', '~/.fonts', '/Library/Fonts',
+             '/System/Library/Fonts', '~/Library/Fonts', os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'))
+# a private use character that no font has, drawn to find out how a font draws characters it doesn't have
+MISSING_CHAR = '\U0010FFFD'
+
+# 5x7 glyphs, used when there is no font or no font has a character; every pair of hex digits is a row and bit 4
+# is the leftmost pixel (lowercase letters use the uppercase glyphs, other characters get a glyph made by
+# make_glyph_bitmap())
+FONT_5X7 = {
+    ' ': '00000000000000', '0': '0E11131519110E', '1': '040C040404040E', '2': '0E11010204081F',
+    '3': '1F02040201110E', '4': '02060A121F0202', '5': '1F101E0101110E', '6': '0608101E11110E',
+    '7': '1F010204080808', '8': '0E11110E11110E', '9': '0E11110F01020C', 'A': '0E1111111F1111',
+    'B': '1E11111E11111E', 'C': '0E11101010110E', 'D': '1C12111111121C', 'E': '1F10101E10101F',
+    'F': '1F10101E101010', 'G': '0E11101711110F', 'H': '1111111F111111', 'I': '0E04040404040E',
+    'J': '0702020202120C', 'K': '11121418141211', 'L': '1010101010101F', 'M': '111B1515111111',
+    'N': '11111915131111', 'O': '0E11111111110E', 'P': '1E11111E101010', 'Q': '0E11111115120D',
+    'R': '1E11111E141211', 'S': '0F10100E01011E', 'T': '1F040404040404', 'U': '1111111111110E',
+    'V': '11111111110A04', 'W': '1111111515150A', 'X': '11110A040A1111', 'Y': '1111110A040404',
+    'Z': '1F01020408101F', '.': '00000000000C0C', ',': '000000000C0408', ':': '000C0C000C0C00',
+    ';': '000C0C000C0408', '!': '04040404040004', '?': '0E110102040004', '-': '0000001F000000',
+    '+': '0004041F040400', '=': '00001F001F0000', '*': '0004150E150400', '/': '00010204081000',
+    '\\': '00100804020100', '<': '02040810080402', '>': '08040201020408', '(': '02040808080402',
+    ')': '08040202020408', '[': '0E08080808080E', ']': '0E02020202020E', '{': '02040408040402',
+    '}': '08040402040408', '"': '0A0A0A00000000', "'": '04040800000000', '`': '08040200000000',
+    '_': '0000000000001F', '#': '0A0A1F0A1F0A0A', '$': '040F140E051E04', '%': '18190204081303',
+    '&': '0C12140815120D', '|': '04040404040404', '^': '040A1100000000', '~': '00000815020000',
+    '@': '0E11010D15150E',
+}
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 7
+# one empty column and row around the glyph keep the characters apart
+BOX_WIDTH = GLYPH_WIDTH + 1
+BOX_HEIGHT = GLYPH_HEIGHT + 1
+
+# color of cells without a color (NO_COLOR) and of colors that aren't "\u001b[38;2;R;G;Bm" codes
+DEFAULT_RGB = (255, 255, 255)
+
+
+# ______________________make_glyph_bitmap______________________
+def make_glyph_bitmap(char: str) -> list[int]:
+    """
+    Get the 5x7 bitmap of a character.
+
+    Characters that aren't in FONT_5X7 (like the katakana of the default characters) get a random but always
+    the same pattern made from their code point, which looks like an unknown symbol.
+
+    Args:
+        char (str): The character.
+
+    Returns:
+        list: 7 rows, bit 4 of each row is the leftmost pixel.
+    """
+    if char in FONT_5X7 or char.upper() in FONT_5X7:
+        return list(bytes.fromhex(FONT_5X7.get(char) or FONT_5X7[char.upper()]))
+    if char.isspace() or not char.isprintable():
+        return [0] * GLYPH_HEIGHT
+    # a separate generator, so the rain's random numbers don't change
+    generator = random.Random(ord(char[0]))
+    rows = [generator.getrandbits(GLYPH_WIDTH) | generator.getrandbits(GLYPH_WIDTH) for _ in range(GLYPH_HEIGHT)]
+    rows[0] |= 1 << generator.randrange(GLYPH_WIDTH)  # the glyph always reaches the top
+    return rows
+
+
+# ______________________find_fonts______________________
+def find_fonts(font_path: str | None = None) -> list[str]:
+    """
+    Find the font files the glyphs are drawn with.
+
+    Without font_path no font is used, so the glyphs come from the built-in 5x7 font and the images are the
+    same on every computer (and Pillow isn't needed).
+
+    Args:
+        font_path (str, optional): Font file to use first, the fonts of FONT_FILES that are installed come after it.
+
+    Returns:
+        list: Paths of the font files, empty if font_path is None.
+
+    Raises:
+        FileNotFoundError: If font_path doesn't exist.
+        RuntimeError: If font_path is given and Pillow isn't installed.
+    """
+    if font_path is None:
+        return []
+    if not os.path.isfile(font_path):
+        raise FileNotFoundError(f'The font "{font_path}" doesn\'t exist')
+    if not PILLOW_AVAILABLE:
+        raise RuntimeError('Drawing the characters with a font needs Pillow (pip install pillow)')
+    found: dict[str, str] = {}
+    for font_dir in FONT_DIRS:
+        for dir_path, _, file_names in os.walk(os.path.expanduser(font_dir)):
+            for file_name in file_names:
+                if file_name in FONT_FILES:
+                    found.setdefault(file_name, os.path.join(dir_path, file_name))
+    return [font_path] + [found[file_name] for file_name in FONT_FILES if file_name in found]
+
+
+# ______________________load_font______________________
+def load_font(fonts: dict[str, Any], path: str, size: int) -> "ImageFont.FreeTypeFont | None":
+    """
+    Load a font in a size, every font and size is only loaded once.
+
+    Args:
+        fonts (dict): Loaded fonts by (path, size), see make_raster().
+        path (str): Path of the font file.
+        size (int): Size of the font in pixels.
+
+    Returns:
+        ImageFont.FreeTypeFont: The font or None if the file isn't a font Pillow can read.
+    """
+    key = (path, size)
+    if key not in fonts:
+        try:
+            fonts[key] = ImageFont.truetype(path, size)
+        except OSError:
+            fonts[key] = None
+    return fonts[key]
+
+
+# ______________________draw_font_glyph______________________
+def draw_font_glyph(font: "ImageFont.FreeTypeFont", char: str, width: int, height: int) -> "np.ndarray":
+    """
+    Draw a character in the middle of a box.
+
+    Args:
+        font (ImageFont.FreeTypeFont): The font.
+        char (str): The character.
+        width (int): Width of the box in pixels.
+        height (int): Height of the box in pixels.
+
+    Returns:
+        np.ndarray: uint8 array of shape (height, width), 1 where the glyph covers at least half of a pixel.
+    """
+    image = Image.new('L', (width, height))
+    ImageDraw.Draw(image).text((width / 2, height / 2), char, fill=255, font=font, anchor='mm')
+    return (np.asarray(image) >= 128).astype(np.uint8)
+
+
+# ______________________make_font_glyph_mask______________________
+def make_font_glyph_mask(char: str, cell_width: int, cell_height: int, font_paths: list[str],
+                         fonts: dict[str, Any]) -> "np.ndarray | None":
+    """
+    Draw a character with the first font that has it, as big as possible while it still fits into a cell.
+
+    Args:
+        char (str): The character.
+        cell_width (int): Width of a cell in pixels.
+        cell_height (int): Height of a cell in pixels.
+        font_paths (list): Font files made by find_fonts().
+        fonts (dict): Loaded fonts by (path, size), see make_raster().
+
+    Returns:
+        np.ndarray: uint8 array of shape (cell_height, cell_width), 1 where the glyph is,
+                    or None if no font has the character.
+    """
+    # one empty pixel around the glyph keeps the characters apart, like the empty row and column of the 5x7 font
+    width = max(cell_width - 1, 1)
+    height = max(cell_height - 1, 1)
+    for path in font_paths:
+        font = load_font(fonts, path, height)
+        if font is None:
+            continue
+        left, top, right, bottom = font.getbbox(char, anchor='mm')
+        if right - left > width or bottom - top > height:  # wider than the cell (like full width characters)
+            scale = min(width / max(right - left, 1), height / max(bottom - top, 1))
+            font = load_font(fonts, path, max(int(height * scale), 1))
+        mask = draw_font_glyph(font, char, width, height)
+        if not mask.any() or np.array_equal(mask, draw_font_glyph(font, MISSING_CHAR, width, height)):
+            continue  # the font doesn't have the character
+        cell = np.zeros((cell_height, cell_width), dtype=np.uint8)
+        cell[:height, :width] = mask
+        return cell
+    return None
+
+
+# ______________________make_glyph_mask______________________
+def make_glyph_mask(char: str, cell_width: int, cell_height: int, font_paths: list[str] | None = None,
+                    fonts: dict[str, Any] | None = None) -> "np.ndarray":
+    """
+    Make the mask of a character in the size of a cell.
+
+    The character is drawn with a font if there are fonts and one of them has it, otherwise the 5x7 bitmap of
+    the character is scaled to the cell (nearest neighbor).
+
+    Args:
+        char (str): The character.
+        cell_width (int): Width of a cell in pixels.
+        cell_height (int): Height of a cell in pixels.
+        font_paths (list, optional): Font files made by find_fonts().
+        fonts (dict, optional): Loaded fonts by (path, size), see make_raster().
+
+    Returns:
+        np.ndarray: uint8 array of shape (cell_height, cell_width), 1 where the glyph is.
+    """
+    if font_paths:
+        mask = make_font_glyph_mask(char, cell_width, cell_height, font_paths, {} if fonts is None else fonts)
+        if mask is not None:
+            return mask
+    box = np.zeros((BOX_HEIGHT, BOX_WIDTH), dtype=np.uint8)
+    for row, bits in enumerate(make_glyph_bitmap(char)):
+        for column in range(GLYPH_WIDTH):
+            box[row, column] = (bits >> (GLYPH_WIDTH - 1 - column)) & 1
+    ys = np.arange(cell_height) * BOX_HEIGHT // cell_height
+    xs = np.arange(cell_width) * BOX_WIDTH // cell_width
+    return box[ys][:, xs]
+
+
+# ______________________make_raster______________________
+def make_raster(width: int, height: int, font_path: str | None = None) -> dict[str, Any]:
+    """
+    Create a raster, which draws framebuffers (see modules/framebuffer.py) as RGB images.
+
+    The glyph masks and the RGB values of the colors are made once for every glyph and color id of the
+    framebuffer, so drawing a frame only needs NumPy operations on whole arrays.
+    The built-in 5x7 font is the reference: without font_path every glyph uses it, so the images don't depend
+    on the installed fonts. With font_path the glyphs are drawn with the fonts of find_fonts() and only the
+    characters that no font has use the 5x7 font.
+
+    Args:
+        width (int): Width of the image in pixels.
+        height (int): Height of the image in pixels.
+        font_path (str, optional): Font file that is used before the installed fonts (needs Pillow).
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'width', 'height': size of the image,
+              - 'image': uint8 array of shape (height, width, 3) that every frame is drawn into,
+              - 'cell_size': (cell width, cell height) the masks were made for,
+              - 'glyphs', 'glyph_masks': glyph table of the framebuffer and the mask of every glyph id,
+              - 'colors', 'color_rgb': color table of the framebuffer and the RGB values of every color id,
+              - 'font_paths': the font files of find_fonts() (empty if the 5x7 font is used for everything),
+              - 'fonts': the loaded fonts by (path, size).
+
+    Raises:
+        RuntimeError: If NumPy isn't installed or font_path is given without Pillow.
+        FileNotFoundError: If font_path doesn't exist.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError('Drawing frames as images needs NumPy (pip install numpy)')
+    return {'width': width,
+            'height': height,
+            'image': np.zeros((height, width, 3), dtype=np.uint8),
+            'cell_size': None,
+            'glyphs': None,
+            'glyph_masks': np.zeros((0, 0, 0), dtype=np.uint8),
+            'colors': None,
+            'color_rgb': np.zeros((0, 3), dtype=np.uint8),
+            'font_paths': find_fonts(font_path),
+            'fonts': {}}
+
+
+# ______________________update_raster_tables______________________
+def update_raster_tables(raster: dict[str, Any], framebuffer: dict[str, Any], cell_width: int, cell_height: int) -> None:
+    """
+    Make the masks and RGB values of glyph and color ids that were added to the framebuffer since the last frame.
+
+    Args:
+        raster (dict): Raster created by make_raster().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        cell_width (int): Width of a cell in pixels.
+        cell_height (int): Height of a cell in pixels.
+    """
+    glyph_table: list[str] = framebuffer['glyph_ids'].keys_by_id
+    color_table: list[str | None] = framebuffer['color_ids'].keys_by_id
+    # the tables are replaced when the framebuffer forgets its ids (see reset_tables())
+    if raster['glyphs'] is not glyph_table or raster['cell_size'] != (cell_width, cell_height):
+        raster['glyphs'] = glyph_table
+        raster['cell_size'] = (cell_width, cell_height)
+        raster['glyph_masks'] = np.zeros((0, cell_height, cell_width), dtype=np.uint8)
+    if raster['colors'] is not color_table:
+        raster['colors'] = color_table
+        raster['color_rgb'] = np.zeros((0, 3), dtype=np.uint8)
+
+    known_glyphs = len(raster['glyph_masks'])
+    if known_glyphs < len(glyph_table):
+        new_masks = [make_glyph_mask(glyph, cell_width, cell_height, raster['font_paths'], raster['fonts'])
+                     for glyph in glyph_table[known_glyphs:]]
+        raster['glyph_masks'] = np.concatenate([raster['glyph_masks'], np.stack(new_masks)])
+
+    known_colors = len(raster['color_rgb'])
+    if known_colors < len(color_table):
+        new_rgb = []
+        for color in color_table[known_colors:]:
+            if color is None:  # HIDDEN_COLOR
+                new_rgb.append((0, 0, 0))
+                continue
+            parsed = parse_ansi_color(color) if '[' in color else None
+            new_rgb.append(parsed[0] if parsed else DEFAULT_RGB)
+        raster['color_rgb'] = np.concatenate([raster['color_rgb'], np.array(new_rgb, dtype=np.uint8)])
+
+
+# ______________________render_raster______________________
+def render_raster(raster: dict[str, Any], framebuffer: dict[str, Any]) -> "np.ndarray":
+    """
+    Draw a framebuffer into the raster's image.
+
+    The cells are as big as possible while still fitting into the image and are centered, the rest is black.
+    The glyph mask of every (glyph, color) pair in the frame is colored once, then every row of pixels of all
+    cells is copied out of these colored glyphs with one np.take() straight into the image.
+
+    Args:
+        raster (dict): Raster created by make_raster().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+
+    Returns:
+        np.ndarray: The image, uint8 array of shape (height, width, 3) (it is reused by the next frame).
+
+    Raises:
+        ValueError: If the image is smaller than one pixel per cell.
+    """
+    rows, columns = framebuffer['rows'], framebuffer['columns']
+    image: np.ndarray = raster['image']
+    if not rows or not columns:
+        image.fill(0)
+        return image
+    cell_width = raster['width'] // columns
+    cell_height = raster['height'] // rows
+    if not cell_width or not cell_height:
+        raise ValueError(f"{raster['width']}x{raster['height']} pixels are too small for {columns}x{rows} cells")
+    if raster['cell_size'] != (cell_width, cell_height):
+        image.fill(0)  # the border around the cells
+    update_raster_tables(raster, framebuffer, cell_width, cell_height)
+    color_rgb: np.ndarray = raster['color_rgb']
+
+    glyphs = np.frombuffer(framebuffer['glyphs'], dtype=np.uint32).astype(np.int64)
+    colors = np.frombuffer(framebuffer['colors'], dtype=np.uint32)
+    pairs, cell_pairs = np.unique(glyphs * len(color_rgb) + colors, return_inverse=True)
+    pair_glyphs, pair_colors = np.divmod(pairs, len(color_rgb))
+    # (pairs, cell height, cell width, 3), with the pixel rows first so every row can be taken at once
+    colored = raster['glyph_masks'][pair_glyphs][..., np.newaxis] * color_rgb[pair_colors][:, np.newaxis, np.newaxis, :]
+    colored_rows = colored.reshape(len(pairs), cell_height, cell_width * 3).transpose(1, 0, 2)
+
+    top = (raster['height'] - rows * cell_height) // 2
+    left = (raster['width'] - columns * cell_width) // 2
+    # a view of the image with the pixel rows of every cell in their own axis (splitting axes never copies)
+    cells = image[top:top + rows * cell_height, left:left + columns * cell_width]
+    cells = cells.reshape(rows, cell_height, columns, cell_width * 3)
+    cell_pairs = cell_pairs.reshape(rows, columns)
+    for pixel_row in range(cell_height):
+        np.take(colored_rows[pixel_row], cell_pairs, axis=0, out=cells[:, pixel_row])
+    return image
+
+
+# ______________________write_raster______________________
+def write_raster(image: "np.ndarray", file: BinaryIO, image_format: str = 'ppm') -> None:
+    """
+    Write an image made by render_raster() to a file or pipe.
+
+    'ppm' writes a binary PPM (P6) for every frame; a file with several frames can be read by ffmpeg with
+    "-f image2pipe -c:v ppm -i -". 'raw' only writes the pixels, for "-f rawvideo -pix_fmt rgb24 -s WxH -i -".
+
+    Args:
+        image (np.ndarray): uint8 array of shape (height, width, 3).
+        file (BinaryIO): File opened in binary mode.
+        image_format (str): 'ppm' or 'raw'.
+    """
+    if image_format == 'ppm':
+        file.write(f'P6\n{image.shape[1]} {image.shape[0]}\n255\n'.encode('ascii'))
+    file.write(memoryview(image).cast('B'))
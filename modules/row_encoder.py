@@ -0,0 +1,129 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from modules.framebuffer import update_cell_text, encode_rows, encode_framebuffer
+
+# frames with fewer cells are encoded on one thread even if render_threads allows more, starting the threads costs
+# more than it saves (python matrix_benchmark.py row-encoder measures where the threads start to be faster)
+MIN_PARALLEL_CELLS = 12000
+
+
+# ______________________gil_is_enabled______________________
+def gil_is_enabled() -> bool:
+    """
+    Check if the GIL is enabled (it can only be disabled on free-threaded builds of Python 3.13 and newer).
+
+    Returns:
+        bool: True if only one thread can run Python code at a time.
+    """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+# ______________________make_row_encoder______________________
+def make_row_encoder(min_cells: int = MIN_PARALLEL_CELLS) -> dict[str, Any]:
+    """
+    Create a row encoder, which encodes bands of rows of a framebuffer on several threads.
+
+    The threads are only started the first time a frame is big enough, the GIL is disabled and the render_threads
+    setting isn't 1 (the default), so nothing changes on normal Python builds.
+
+    Args:
+        min_cells (int): Frames with fewer cells are encoded on one thread.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'executor': the ThreadPoolExecutor or None if it wasn't needed yet,
+              - 'workers': amount of threads of the executor,
+              - 'min_cells': frames with fewer cells are encoded on one thread,
+              - 'parallel': True if the GIL is disabled.
+    """
+    return {'executor': None, 'workers': 0, 'min_cells': min_cells, 'parallel': not gil_is_enabled()}
+
+
+# ______________________get_thread_count______________________
+def get_thread_count(encoder: dict[str, Any], framebuffer: dict[str, Any], render_threads: int) -> int:
+    """
+    Get how many threads should encode a frame.
+
+    Args:
+        encoder (dict): Row encoder created by make_row_encoder().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        render_threads (int): The render_threads setting (0 = one thread per CPU core).
+
+    Returns:
+        int: Amount of threads (1 = encode on the calling thread).
+    """
+    if not encoder['parallel'] or framebuffer['rows'] * framebuffer['columns'] < encoder['min_cells']:
+        return 1
+    threads = render_threads or os.cpu_count() or 1
+    return max(min(threads, framebuffer['rows']), 1)
+
+
+# ______________________encode_bands______________________
+def encode_bands(encoder: dict[str, Any], framebuffer: dict[str, Any], threads: int, encoding: str = 'utf-8') -> bytes:
+    """
+    Encode a framebuffer by splitting its rows into bands that are encoded at the same time.
+
+    The framebuffer isn't changed while the threads read it, because this only returns when every band is done.
+    Gives the same bytes as encode_framebuffer().
+
+    Args:
+        encoder (dict): Row encoder created by make_row_encoder().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        threads (int): Amount of bands.
+        encoding (str): Encoding of the terminal.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    if encoder['executor'] is None or encoder['workers'] < threads:
+        stop_row_encoder(encoder)
+        encoder['executor'] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='row_encoder')
+        encoder['workers'] = threads
+    update_cell_text(framebuffer)  # the only part that changes the framebuffer, so it runs before the threads
+
+    rows = framebuffer['rows']
+    bounds = [rows * band // threads for band in range(threads + 1)]
+
+    def encode_band(band: int) -> bytes:
+        return "\n".join(encode_rows(framebuffer, bounds[band], bounds[band + 1])).encode(encoding, errors='replace')
+
+    # \x1b[H (\u001b[H) moves the cursor to row and column 0
+    return b"\x1b[H" + b"\n".join(encoder['executor'].map(encode_band, range(threads))) + b"\n"
+
+
+# ______________________encode_frame______________________
+def encode_frame(encoder: dict[str, Any], framebuffer: dict[str, Any], render_threads: int, encoding: str = 'utf-8') -> bytes:
+    """
+    Encode a framebuffer on several threads if that is faster, otherwise with encode_framebuffer().
+
+    Args:
+        encoder (dict): Row encoder created by make_row_encoder().
+        framebuffer (dict): Framebuffer created by make_framebuffer().
+        render_threads (int): The render_threads setting (0 = one thread per CPU core, 1 = never use threads).
+        encoding (str): Encoding of the terminal.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    threads = get_thread_count(encoder, framebuffer, render_threads)
+    if threads <= 1:
+        return encode_framebuffer(framebuffer, encoding)
+    return encode_bands(encoder, framebuffer, threads, encoding)
+
+
+# ______________________stop_row_encoder______________________
+def stop_row_encoder(encoder: dict[str, Any] | None) -> None:
+    """
+    Stop the threads of a row encoder (it starts them again when it's used).
+
+    Args:
+        encoder (dict): Row encoder created by make_row_encoder() or None.
+    """
+    if encoder is not None and encoder['executor'] is not None:
+        encoder['executor'].shutdown(wait=False)
+        encoder['executor'] = None
+        encoder['workers'] = 0
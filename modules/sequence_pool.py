@@ -0,0 +1,71 @@
+from typing import Any
+
+# the most sequences that are kept for reuse
+MAX_POOL_SIZE = 4096
+
+
+# ______________________make_sequence_pool______________________
+def make_sequence_pool(max_size: int = MAX_POOL_SIZE) -> dict[str, Any]:
+    """
+    Create a pool of sequences that were removed from the rain and can be reused by make_sequence().
+
+    Reusing the sequence dictionaries and their 'chars' lists means the rain doesn't allocate new objects once
+    it has been running for a while, which keeps the garbage collector from pausing the animation.
+    Removed sequences are released into 'released' and only become reusable after recycle_sequences() is called
+    (after a frame was rendered), because the sparse renderer still reads the sequences it drew last time.
+
+    Args:
+        max_size (int): The most sequences that are kept.
+
+    Returns:
+        dict: A dictionary with keys:
+              - 'free': sequences that can be reused,
+              - 'released': sequences removed since the last recycle_sequences(),
+              - 'max_size': the most sequences that are kept.
+    """
+    return {'free': [], 'released': [], 'max_size': max_size}
+
+
+# ______________________take_sequence______________________
+def take_sequence(pool: dict[str, Any] | None) -> dict[str, Any] | None:
+    """
+    Take a sequence that can be reused out of the pool.
+
+    Args:
+        pool (dict): Pool created by make_sequence_pool() or None.
+
+    Returns:
+        dict: A sequence (all of its values still have to be set) or None if there is none.
+    """
+    if pool and pool['free']:
+        return pool['free'].pop()
+    return None
+
+
+# ______________________release_sequence______________________
+def release_sequence(pool: dict[str, Any] | None, sequence: dict[str, Any]) -> None:
+    """
+    Give a sequence that was removed from its column to the pool.
+
+    Args:
+        pool (dict): Pool created by make_sequence_pool() or None (then nothing happens).
+        sequence (dict): The removed sequence.
+    """
+    if pool is not None and len(pool['released']) < pool['max_size']:
+        pool['released'].append(sequence)
+
+
+# ______________________recycle_sequences______________________
+def recycle_sequences(pool: dict[str, Any]) -> None:
+    """
+    Make the released sequences reusable (call this when nothing reads the removed sequences anymore).
+
+    Args:
+        pool (dict): Pool created by make_sequence_pool().
+    """
+    free: list[dict[str, Any]] = pool['free']
+    released: list[dict[str, Any]] = pool['released']
+    if released:
+        free.extend(released)
+        del free[pool['max_size']:]
+        released.clear()
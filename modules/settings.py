@@ -0,0 +1,284 @@
+from typing import Any, NamedTuple
+
+from modules.glyph_stream import make_glyph_stream
+from modules.overlay import validate_overlays
+
+
+# ______________________GreaterThan______________________
+class GreaterThan(NamedTuple):
+    """
+    Smallest value of a setting that isn't allowed itself (values that aren't bigger raise a ValueError).
+    """
+    value: float
+
+
+# ______________________ListOf______________________
+class ListOf(NamedTuple):
+    """
+    Rule of a list setting: type, smallest and largest value of its elements like in SETTINGS_SCHEMA
+    and the allowed amount of elements.
+    """
+    types: type | tuple[type, ...]
+    minimum: Any = None
+    maximum: Any = None
+    min_length: int = 0
+    max_length: int | None = None
+
+
+# a speed range: [smallest speed, biggest speed], both in rows per update
+SPEED_RANGE = ListOf((int, float), GreaterThan(0), None, 2, 2)
+
+# type, smallest and largest value (None = no limit) or the allowed values of every checked setting.
+# Numbers outside of the limits are changed to the closest limit, other invalid values raise a ValueError.
+# List settings have a ListOf as smallest value, which is used to check the list and each of its elements.
+SETTINGS_SCHEMA: dict[str, tuple[type | tuple[type, ...], Any, Any]] = {
+    'time_between_frames': ((int, float), 0.001, None),
+    'amount_of_rows': (int, 0, None),
+    'amount_of_columns': (int, 0, None),
+    'new_sequence_chance': ((int, float), 0, 1),
+    'random_char_change_chance': ((int, float), 0, 1),
+    'background_chance': ((int, float), 0, 1),
+    'min_sequence_length': (int, 1, None),
+    'max_sequence_length': (int, 1, None),
+    'min_sequence_speed': ((int, float), GreaterThan(0), None),
+    'max_sequence_speed': ((int, float), GreaterThan(0), None),
+    'simulation_step': ((int, float), 0.001, None),
+    'simulation_speed': ((int, float), 0.01, 100),
+    'prewarm_seconds': ((int, float), 0, None),
+    'sparse_color_steps': (int, 1, None),
+    'trail_length': (int, 0, None),
+    'color_cache_size': (int, 1, None),
+    'render_threads': (int, 0, None),
+    'metrics_port': (int, 0, 65535),
+    'profile_frames': (int, 1, None),
+    'mode': (bool, None, None),
+    'space_between_columns': (bool, None, None),
+    'auto_size': (bool, None, None),
+    'time_based_simulation': (bool, None, None),
+    'characters': (str, None, None),
+    'visibility_priority': (str, ('higher', 'lower'), None),
+    'render_mode': (str, ('full', 'sparse'), None),
+    'colors': ((list, tuple), ListOf(str, min_length=1), None),
+    'background_brightness_reduction': ((list, tuple), ListOf((int, float), GreaterThan(0), 1), None),
+    'background_layer_speeds': ((list, tuple), ListOf((list, tuple), SPEED_RANGE), None),
+    'background_layer_densities': ((list, tuple), ListOf((int, float), GreaterThan(0)), None),
+}
+
+# settings with one value per background layer, they are either empty or as long as background_brightness_reduction
+LAYER_SETTINGS = ('background_layer_speeds', 'background_layer_densities')
+
+# settings that Settings is made from (if one of them changes, the Settings are made again)
+SOURCE_SETTINGS = ('amount_of_rows', 'amount_of_columns', 'space_between_columns', 'mode', 'random_char_change_chance',
+                   'visibility_priority', 'new_sequence_chance', 'characters', 'min_sequence_length', 'max_sequence_length',
+                   'min_sequence_speed', 'max_sequence_speed', 'background_chance', 'background_brightness_reduction',
+                   'background_layer_speeds', 'background_layer_densities', 'time_based_simulation', 'simulation_step',
+                   'render_mode', 'sparse_color_steps', 'trail_length', 'simulation_speed')
+
+
+# ______________________validate_setting______________________
+def validate_setting(name: str, value: Any) -> Any:
+    """
+    Check a setting against SETTINGS_SCHEMA.
+
+    Args:
+        name (str): Name of the setting (settings that aren't in the schema are returned unchanged).
+        value: The value to check.
+
+    Returns:
+        The value, changed to the closest limit if it is a number outside of the limits.
+
+    Raises:
+        ValueError: If the value has the wrong type, isn't one of the allowed values or isn't bigger than
+                    a GreaterThan limit.
+    """
+    if name not in SETTINGS_SCHEMA:
+        return value
+    return validate_value(f'"{name}"', value, *SETTINGS_SCHEMA[name])
+
+
+# ______________________validate_value______________________
+def validate_value(label: str, value: Any, types: type | tuple[type, ...], minimum: Any, maximum: Any) -> Any:
+    """
+    Check a value against a rule of SETTINGS_SCHEMA (the elements of lists are checked with their ListOf).
+
+    Args:
+        label (str): Name of the value used in the error messages.
+        value: The value to check.
+        types (type or tuple): Allowed types.
+        minimum: Smallest value, GreaterThan, allowed values (tuple) or ListOf of the elements (lists).
+        maximum: Largest value (None = no limit).
+
+    Returns:
+        The value, with numbers outside of the limits changed to the closest limit.
+
+    Raises:
+        ValueError: If the value or one of its elements is invalid.
+    """
+    # bool is a subclass of int, so it isn't accepted as a number
+    if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+        type_name = types.__name__ if isinstance(types, type) else 'list' if list in types else 'number'
+        raise ValueError(f'{label} has to be of type {type_name}, not {type(value).__name__}')
+    if isinstance(minimum, ListOf):
+        if len(value) < minimum.min_length or (minimum.max_length is not None and len(value) > minimum.max_length):
+            if minimum.min_length == minimum.max_length:
+                raise ValueError(f'{label} has to have {minimum.min_length} elements, not {len(value)}')
+            raise ValueError(f'{label} can\'t be empty')
+        elements = [validate_value(f'{label}[{index}]', element, *minimum[:3]) for index, element in enumerate(value)]
+        # lists of the same values are kept, so colors stay the same tuple
+        return value if elements == list(value) else type(value)(elements)
+    if isinstance(minimum, tuple) and not isinstance(minimum, GreaterThan):
+        if value not in minimum:
+            raise ValueError(f'''{label} has to be one of {', '.join(minimum)}, not "{value}"''')
+        return value
+    if types is str:
+        if not value:
+            raise ValueError(f'{label} can\'t be empty')
+        return value
+    if isinstance(minimum, GreaterThan):
+        if value <= minimum.value:
+            raise ValueError(f'{label} has to be bigger than {minimum.value}, not {value}')
+    elif minimum is not None and value < minimum:
+        return minimum
+    if maximum is not None and value > maximum:
+        return maximum
+    return value
+
+
+# ______________________validate_config______________________
+def validate_config(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Check all settings of a configuration that are in SETTINGS_SCHEMA (see validate_setting()).
+
+    Args:
+        config (dict): Configuration dictionary, numbers outside of their limits are changed in place.
+
+    Returns:
+        dict: The same configuration dictionary.
+
+    Raises:
+        ValueError: If a setting is invalid (see validate_setting()) or a list of LAYER_SETTINGS isn't empty
+                    and has another length than background_brightness_reduction.
+    """
+    for name in SETTINGS_SCHEMA:
+        if name in config:
+            config[name] = validate_setting(name, config[name])
+    if 'overlays' in config:
+        validate_overlays(config['overlays'])
+    if 'min_sequence_length' in config and 'max_sequence_length' in config:
+        config['max_sequence_length'] = max(config['max_sequence_length'], config['min_sequence_length'])
+    background_layers = len(config.get('background_brightness_reduction', ()))
+    for name in LAYER_SETTINGS:
+        if config.get(name) and len(config[name]) != background_layers:
+            raise ValueError(f'"{name}" has to be empty or have one value for each of the {background_layers} '
+                             f'values of "background_brightness_reduction", not {len(config[name])}')
+    return config
+
+
+# ______________________Settings______________________
+class Settings:
+    """
+    Read-only copy of the settings used by the update and render loops, with values derived from them.
+
+    Reading an attribute is faster than looking up a key in the config dictionary and the derived values
+    (like the characters as a tuple) are only made once. Use get_settings() to get the Settings of a config.
+    'glyphs' is a stream of random characters (see modules/glyph_stream.py), so it is made again with the
+    Settings when the characters change.
+    """
+    __slots__ = ('key', 'amount_of_rows', 'amount_of_columns', 'space_between_columns', 'mode', 'random_char_change_chance',
+                 'visibility_priority', 'new_first', 'new_sequence_chance', 'characters', 'glyphs', 'min_sequence_length',
+                 'max_sequence_length', 'min_sequence_speed', 'max_sequence_speed', 'background_chance', 'background_layers',
+                 'layer_levels', 'layer_cum_weights', 'layer_speeds', 'speed_scale', 'render_mode', 'sparse_color_steps',
+                 'trail_length')
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Settings can't be changed, change the config instead")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Settings can't be changed, change the config instead")
+
+
+# ______________________make_settings______________________
+def make_settings(config: dict[str, Any], key: tuple | None = None) -> Settings:
+    """
+    Make the Settings of a configuration.
+
+    Args:
+        config (dict): Configuration dictionary.
+        key (tuple, optional): The values of SOURCE_SETTINGS (made from config if None).
+
+    Returns:
+        Settings: The settings.
+    """
+    if key is None:
+        key = tuple(config[name] for name in SOURCE_SETTINGS)
+    background_layers = len(config['background_brightness_reduction'])
+    # speeds are rows per update: per frame or per simulation_step, where speed_up/slow_down change simulation_speed
+    speed_scale = config['simulation_speed'] if config['time_based_simulation'] else 1
+    layer_cum_weights = None
+    if config['background_layer_densities'] and background_layers:
+        # layers without a density get a density of 1
+        densities = list(config['background_layer_densities'][:background_layers])
+        densities += [1] * (background_layers - len(densities))
+        layer_cum_weights = []
+        total = 0
+        for density in densities:
+            total += density
+            layer_cum_weights.append(total)
+        layer_cum_weights = tuple(layer_cum_weights)
+    return Settings(
+        # lists in the key are copied, so changing them in the config makes the Settings outdated
+        key=tuple(list(value) if isinstance(value, list) else value for value in key),
+        amount_of_rows=config['amount_of_rows'],
+        amount_of_columns=config['amount_of_columns'],
+        space_between_columns=config['space_between_columns'],
+        mode=config['mode'],
+        random_char_change_chance=config['random_char_change_chance'],
+        visibility_priority=config['visibility_priority'],
+        new_first=config['visibility_priority'] == 'higher',
+        # in time based simulation an update stands for simulation_speed updates, so the chance that at least one
+        # of them starts a sequence is used and the rain keeps the same density when its speed changes
+        new_sequence_chance=(1 - (1 - config['new_sequence_chance']) ** speed_scale if speed_scale != 1
+                             else config['new_sequence_chance']),
+        characters=tuple(config['characters']),
+        glyphs=make_glyph_stream(tuple(config['characters'])),
+        min_sequence_length=config['min_sequence_length'],
+        max_sequence_length=config['max_sequence_length'],
+        min_sequence_speed=config['min_sequence_speed'],
+        max_sequence_speed=config['max_sequence_speed'],
+        background_chance=config['background_chance'],
+        background_layers=background_layers,
+        layer_levels=tuple(range(1, background_layers + 1)),
+        layer_cum_weights=layer_cum_weights,
+        layer_speeds=tuple(tuple(speeds) for speeds in config['background_layer_speeds']),
+        speed_scale=speed_scale,
+        render_mode=config['render_mode'],
+        sparse_color_steps=config['sparse_color_steps'],
+        # the trail intensities are stored in bytes, so the trail can't be longer than 255 frames
+        trail_length=min(config['trail_length'], 255) if config['render_mode'] == 'full' else 0)
+
+
+# ______________________get_settings______________________
+def get_settings(config: dict[str, Any]) -> Settings:
+    """
+    Get the Settings of a configuration, which are only made again when one of SOURCE_SETTINGS changed.
+
+    The last Settings are kept in config['settings_cache'] (a dictionary that is shared with the shallow
+    copies made by apply_quality_level(), so switching quality levels doesn't lose it).
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Returns:
+        Settings: The settings.
+    """
+    key = tuple(config[name] for name in SOURCE_SETTINGS)
+    cache: dict[str, Settings] = config['settings_cache']
+    settings = cache.get('settings')
+    if settings is None or settings.key != key:
+        settings = make_settings(config, key)
+        cache['settings'] = settings
+    return settings
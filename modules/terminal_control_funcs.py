@@ -33,6 +33,6 @@ def flush_stdin() -> None:
         import msvcrt
         while msvcrt.kbhit():
             msvcrt.getch()
-    else:
+    elif sys.stdin.isatty():  # there is nothing to flush if the input isn't a terminal
         import termios
         termios.tcflush(sys.stdin, termios.TCIFLUSH)
\ No newline at end of file
@@ -0,0 +1,38 @@
+import random
+import unittest
+
+from modules.sequence_pool import make_sequence_pool
+from matrix_rain import MAX_BLOCKS_PER_FRAME, get_config, measure_allocations
+
+WARMUP_FRAMES = 1500  # until the sequence pool is full enough
+FRAMES = 500  # traced frames
+
+
+class AllocationTest(unittest.TestCase):
+    def measure(self, **settings) -> dict:
+        # the same rain every time: with other random numbers more sequences than ever before can be on the
+        # screen at once after the warm-up, which needs new ones
+        random.seed(1)
+        config = get_config(interactive=False)
+        config.update(auto_size=False, **settings)
+        return measure_allocations(config, WARMUP_FRAMES, FRAMES)
+
+    def test_frames_keep_few_blocks(self):
+        result = self.measure()
+        self.assertLessEqual(result['blocks_per_frame'], MAX_BLOCKS_PER_FRAME)
+        self.assertEqual(result['new_chars'], 0)
+        self.assertEqual(result['new_sequences'], 0)
+
+    def test_sparse_frames_keep_few_blocks(self):
+        result = self.measure(render_mode='sparse', background_brightness_reduction=[0.6, 0.3])
+        self.assertLessEqual(result['blocks_per_frame'], MAX_BLOCKS_PER_FRAME)
+        self.assertEqual(result['new_chars'], 0)
+
+    def test_sequences_without_pool_are_found(self):
+        # a pool that keeps nothing, so every sequence is made again
+        result = self.measure(sequence_pool=make_sequence_pool(0))
+        self.assertGreater(result['new_chars'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import sys
+import time
+import socket
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from typing import Any, Callable
+
+from modules.key_events import KeyEvents
+from matrix_rain import get_config, run_matrix, filler_func
+
+RUN_SECONDS = 1.5  # how long the rain runs before the metrics are read
+
+
+# ______________________get_free_port______________________
+def get_free_port() -> int:
+    """
+    Get a port on 127.0.0.1 that nothing listens on.
+
+    Returns:
+        int: The port.
+    """
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+# ______________________make_scraper______________________
+def make_scraper(port: int, result: dict[str, Any]) -> Callable:
+    """
+    Make an update_pressed_keys function for run_matrix() that reads the metrics and then stops the rain.
+
+    Args:
+        port (int): Port of the metrics server.
+        result (dict): Gets 'text' and 'content_type' of /metrics and 'missing_status' of a path that doesn't exist.
+
+    Returns:
+        callable: The update_pressed_keys function (takes currently_pressed, lock, key_events).
+    """
+    def scrape(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents) -> None:
+        time.sleep(RUN_SECONDS)
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+                result['text'] = response.read().decode('utf-8')
+                result['content_type'] = response.headers['Content-Type']
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/missing', timeout=5)
+            except urllib.error.HTTPError as error:
+                result['missing_status'] = error.code
+        finally:
+            with lock:
+                currently_pressed.update(['ctrl', 'c'])  # stops run_matrix()
+            key_events.notify()
+
+    def update_pressed_keys(currently_pressed: set[str], lock: threading.Lock, key_events: KeyEvents) -> None:
+        threading.Thread(target=scrape, args=(currently_pressed, lock, key_events), daemon=True).start()
+
+    return update_pressed_keys
+
+
+# ______________________run_headless______________________
+def run_headless(**settings) -> dict[str, Any]:
+    """
+    Run the rain without a terminal or keyboard with the metrics server turned on and read its metrics.
+
+    Args:
+        **settings: Settings that replace the ones of the default config.
+
+    Returns:
+        dict: 'text', 'content_type' and 'missing_status' (see make_scraper()) and 'values', the value of every
+              sample line by its name (with the labels).
+    """
+    config = get_config(interactive=False)
+    config.update(auto_size=False, metrics_port=get_free_port(), **settings)
+    result: dict[str, Any] = {}
+    terminal = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', write_through=True)
+    try:
+        run_matrix(make_scraper(config['metrics_port'], result), filler_func, config)
+    finally:
+        sys.stdout = terminal
+    result['values'] = {line.split()[0]: float(line.split()[1]) for line in result.get('text', '').splitlines()
+                        if line and not line.startswith('#')}
+    return result
+
+
+class MetricsEndpointTest(unittest.TestCase):
+    def test_frame_counters(self):
+        result = run_headless()
+        values = result['values']
+        self.assertTrue(result['content_type'].startswith('text/plain; version=0.0.4'))
+        self.assertEqual(result['missing_status'], 404)
+        self.assertGreater(values['matrix_rain_frames_total'], 0)
+        self.assertEqual(values['matrix_rain_rendered_frames_total'], values['matrix_rain_frames_total'])
+        self.assertEqual(values['matrix_rain_dropped_frames_total'], 0)
+        self.assertGreater(values['matrix_rain_written_bytes_total'], 0)
+        self.assertGreater(values['matrix_rain_frames_per_second'], 0)
+        self.assertGreaterEqual(values['matrix_rain_frame_seconds{quantile="0.99"}'],
+                                values['matrix_rain_frame_seconds{quantile="0.5"}'])
+        self.assertIn('process_cpu_seconds_total', values)
+
+    def test_caught_up_steps_are_dropped_frames(self):
+        # every frame runs about 4 simulation steps, 3 of them are never shown
+        result = run_headless(time_based_simulation=True, time_between_frames=0.04, simulation_step=0.01)
+        values = result['values']
+        self.assertGreaterEqual(values['matrix_rain_dropped_frames_total'], values['matrix_rain_frames_total'])
+
+    def test_skipped_renders_are_dropped_frames(self):
+        # a frame takes longer than this, so the governor soon only draws every other frame
+        result = run_headless(quality_governor=True, time_between_frames=0.001)
+        values = result['values']
+        self.assertGreater(values['matrix_rain_quality_level'], 0)
+        self.assertEqual(values['matrix_rain_dropped_frames_total'],
+                         values['matrix_rain_frames_total'] - values['matrix_rain_rendered_frames_total'])
+        self.assertGreater(values['matrix_rain_dropped_frames_total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()